@@ -15,8 +15,8 @@ from sqlalchemy.orm import Session
 import uuid
 
 # Importações dos módulos da aplicação
-from app.models.user import User as UserModel
 from app.core.dependencies import get_current_active_user
+from app.core.user_cache import AuthenticatedUser
 from app.services.ai_generation_service import ai_generation_service
 from app.services import crud
 from app.core.database import get_db
@@ -53,7 +53,7 @@ class PlanResponse(BaseModel):
 @router.get("/tips/daily", response_model=TipResponse, status_code=status.HTTP_200_OK)
 def get_daily_tip(
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
 ):
     """Fornece uma dica de fitness diária gerada pela IA.
 
@@ -61,7 +61,7 @@ def get_daily_tip(
     salva a interação na base de dados e retorna a dica.
 
     :param (Session) db: A sessão da base de dados.
-    :param (UserModel) current_user: O utilizador autenticado.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
     :raises HTTPException: Se o serviço de IA não estiver disponível.
     :return (TipResponse): Um objeto JSON com a dica do dia.
     """
@@ -82,7 +82,7 @@ def get_daily_tip(
 def generate_plan(
     request: PlanRequest,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
 ):
     """Gera um plano de treino personalizado com base no prompt do utilizador.
 
@@ -91,7 +91,7 @@ def generate_plan(
 
     :param (PlanRequest) request: O corpo da requisição com o prompt do utilizador.
     :param (Session) db: A sessão da base de dados.
-    :param (UserModel) current_user: O utilizador autenticado.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
     :raises HTTPException: Se o prompt for muito curto ou se o serviço de IA falhar.
     :return (PlanResponse): Um objeto JSON com o plano de treino gerado.
     """
@@ -118,7 +118,7 @@ def read_ia_interaction_history(
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
 ):
     """Obtém o histórico de interações do utilizador com a IA.
 
@@ -128,7 +128,7 @@ def read_ia_interaction_history(
     :param (Session) db: A sessão da base de dados.
     :param (int) skip: O número de registos a pular (para paginação).
     :param (int) limit: O número máximo de registos a retornar.
-    :param (UserModel) current_user: O utilizador autenticado.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
     :return (List[RegistroInteracaoIA]): Uma lista de registos de interação.
     """
     interactions = crud.get_ia_interactions_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
@@ -8,7 +8,8 @@
 @author Wesley dos Santos Gatinho
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
@@ -18,52 +19,86 @@ from google.auth.transport import requests as google_requests
 # Importações de módulos da aplicação
 from app.schemas.token import Token
 from app.schemas.user import User, UserCreate
-from app.services import crud
+from app.services import crud, password_service
 from app.core.database import get_db
-from app.core.security import create_access_token, verify_password
+from app.core.security import create_access_token
 from app.core.config import settings
 
 # Cria uma nova instância de roteador para os endpoints de autenticação.
 router = APIRouter()
 
+async def _run_password_service(operation, *args):
+    """Executa uma operação do `password_service`, convertendo a saturação do pool num erro HTTP.
+
+    :param (callable) operation: `password_service.hash_password` ou `password_service.verify_password`.
+    :raises HTTPException: 503 (com Retry-After) se o pool de hashing estiver saturado.
+    :return (object): O valor retornado pela operação.
+    """
+    try:
+        return await operation(*args)
+    except password_service.PasswordHasherBusy as e:
+        # Um pico de logins: o cliente deve tentar novamente mais tarde.
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(settings.PASSWORD_RETRY_AFTER_SECONDS)},
+        )
+
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """Regista um novo utilizador com e-mail e senha.
 
     Verifica se o e-mail já existe na base de dados antes de criar um novo registo.
+    O hash da senha é calculado no `password_service`, fora do event loop, e as
+    consultas à base de dados correm no threadpool.
 
     :param (UserCreate) user: Os dados do novo utilizador a serem criados.
     :param (Session) db: A sessão da base de dados.
-    :raises HTTPException: Se o e-mail fornecido já estiver registado.
+    :raises HTTPException: Se o e-mail fornecido já estiver registado, ou 503 se o pool de hashing estiver saturado.
     :return (User): Os dados do utilizador recém-criado (sem a senha).
     """
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email já registrado",
         )
-    return crud.create_user(db=db, user=user)
+    hashed_password = await _run_password_service(password_service.hash_password, user.password)
+    return await run_in_threadpool(crud.create_user, db=db, user=user, hashed_password=hashed_password)
 
 @router.post("/login", response_model=Token)
-def login_for_access_token(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+async def login_for_access_token(
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """Autentica um utilizador com e-mail e senha, retornando um token de acesso JWT.
 
+    A senha é verificada no `password_service`, fora do event loop. Se o hash
+    guardado tiver um custo diferente do configurado, é recalculado numa tarefa
+    em segundo plano, depois de a resposta ser enviada.
+
+    :param (BackgroundTasks) background_tasks: As tarefas a executar após a resposta.
     :param (Session) db: A sessão da base de dados.
     :param (OAuth2PasswordRequestForm) form_data: Dados do formulário com 'username' (e-mail) e 'password'.
-    :raises HTTPException: Se o e-mail ou a senha estiverem incorretos.
+    :raises HTTPException: Se o e-mail ou a senha estiverem incorretos, ou 503 se o pool de hashing estiver saturado.
     :return (Token): O token de acesso e o seu tipo ("bearer").
     """
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_in_threadpool(crud.get_user_by_email, db, email=form_data.username)
+    if not user or not await _run_password_service(
+        password_service.verify_password, form_data.password, user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    if password_service.needs_rehash(user.hashed_password):
+        background_tasks.add_task(
+            password_service.rehash_password, user.id, user.hashed_password, form_data.password
+        )
+
     access_token = create_access_token(data={"sub": user.email})
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -78,7 +113,7 @@ class GoogleToken(BaseModel):
     token: str
 
 @router.post("/google/token", response_model=Token)
-def login_with_google_token(google_token: GoogleToken, db: Session = Depends(get_db)):
+async def login_with_google_token(google_token: GoogleToken, db: Session = Depends(get_db)):
     """Autentica ou regista um utilizador usando um ID Token do Google.
 
     Valida o token do Google, verifica se o utilizador existe na base de dados local,
@@ -86,12 +121,13 @@ def login_with_google_token(google_token: GoogleToken, db: Session = Depends(get
 
     :param (GoogleToken) google_token: O corpo da requisição contendo o token do Google.
     :param (Session) db: A sessão da base de dados.
-    :raises HTTPException: Se o token do Google for inválido.
+    :raises HTTPException: Se o token do Google for inválido, ou 503 se o pool de hashing estiver saturado.
     :return (Token): O token de acesso da nossa API e o seu tipo ("bearer").
     """
     try:
-        # Valida o token recebido junto aos servidores do Google.
-        idinfo = id_token.verify_oauth2_token(
+        # Valida o token recebido junto aos servidores do Google (pedido de rede, no threadpool).
+        idinfo = await run_in_threadpool(
+            id_token.verify_oauth2_token,
             google_token.token, 
             google_requests.Request(), 
             settings.GOOGLE_CLIENT_ID
@@ -101,7 +137,7 @@ def login_with_google_token(google_token: GoogleToken, db: Session = Depends(get
         nome = idinfo.get('name', 'Usuário Google')
 
         # Verifica se o utilizador já existe no nosso sistema.
-        db_user = crud.get_user_by_email(db, email=email)
+        db_user = await run_in_threadpool(crud.get_user_by_email, db, email=email)
 
         # Se não existir, cria um novo utilizador.
         if not db_user:
@@ -112,7 +148,8 @@ def login_with_google_token(google_token: GoogleToken, db: Session = Depends(get
                 # Esta senha não é usada para login direto.
                 password=idinfo.get('sub')
             )
-            db_user = crud.create_user(db=db, user=new_user_data)
+            hashed_password = await _run_password_service(password_service.hash_password, new_user_data.password)
+            db_user = await run_in_threadpool(crud.create_user, db=db, user=new_user_data, hashed_password=hashed_password)
 
         # Gera o nosso próprio token de acesso (JWT) para o utilizador.
         access_token = create_access_token(data={"sub": db_user.email})
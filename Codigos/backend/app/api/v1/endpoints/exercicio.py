@@ -17,7 +17,7 @@ from app.schemas import exercicio as exercicio_schema
 from app.core.database import get_db
 from app.services import crud
 from app.core.dependencies import get_current_active_user
-from app.models.user import User as UserModel
+from app.core.user_cache import AuthenticatedUser
 
 # Cria uma nova instância de roteador para os endpoints de gestão de exercícios.
 router = APIRouter()
@@ -27,7 +27,7 @@ def read_exercicios(
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
 ):
     """Recupera uma lista paginada de todos os exercícios disponíveis.
 
@@ -36,7 +36,7 @@ def read_exercicios(
     :param (Session) db: A sessão da base de dados.
     :param (int) skip: O número de exercícios a pular (para paginação).
     :param (int) limit: O número máximo de exercícios a retornar.
-    :param (UserModel) current_user: O utilizador autenticado.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
     :return (List[exercicio_schema.Exercicio]): Uma lista de objetos de exercício.
     """
     exercicios = crud.get_exercicios(db, skip=skip, limit=limit)
@@ -46,13 +46,13 @@ def read_exercicios(
 def get_exercise_instructions(
     exercise_name: str,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
 ):
     """Retorna as instruções de execução para um exercício específico, procurando-o pelo nome.
 
     :param (str) exercise_name: O nome do exercício (ex: "squat") passado no URL.
     :param (Session) db: A sessão da base de dados.
-    :param (UserModel) current_user: O utilizador autenticado.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
     :raises HTTPException: Se o exercício ou as suas instruções não forem encontrados.
     :return (Dict[str, str]): Um dicionário contendo as instruções do exercício.
     """
@@ -8,32 +8,119 @@
 @author Wesley dos Santos Gatinho
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
-from typing import Dict, Any
+import asyncio
+import os
+import tempfile
+import time
 
-from app.models.user import User
-from app.core.dependencies import get_current_active_user
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional
+
+from app.core.database import SessionLocal
+from app.core.user_cache import AuthenticatedUser
+from app.core.dependencies import get_current_active_user, get_user_from_token
 # O nome do serviço foi inferido a partir do uso no código.
 from app.services import pose_estimation_service
+from app.services.frame_mailbox import FrameMailbox
+from app.services.result_encoding import BINARY_MEDIA_TYPE, FORMATS, ResultEncoder, negotiate_format
+from app.services.video_analysis_service import VideoQueueFull, video_analysis_service
+from app.core.config import settings
+from exercises.estimation import PoseEstimatorPoolFull
+from exercises.landmarks import NUM_LANDMARKS
 
 # Cria uma nova instância de roteador para os endpoints de análise de exercícios.
 router = APIRouter()
 
+# Documenta no OpenAPI o formato binário que os endpoints de análise podem devolver.
+_ANALYSIS_RESPONSES = {200: {"content": {BINARY_MEDIA_TYPE: {}}}}
+
 class ExerciseRequest(BaseModel):
     """Schema para a requisição de análise de exercício.
 
     Attributes:
         exercise_type (str): O tipo de exercício a ser analisado (ex: "squat").
         image_b64 (str): O frame do vídeo codificado como uma string base64.
+        session_id (str): Identificador da sessão de análise; cada sessão mantém a sua própria contagem.
+        profile (Optional[str]): Perfil do modelo de pose ('lite', 'full', 'heavy' ou a variante '_static');
+            por omissão, o perfil configurado no servidor. Os frames avulsos são sempre analisados
+            em modo de imagem estática, no pool partilhado.
+        seq (Optional[int]): Número de sequência do frame na sessão; um pedido repetido com o mesmo
+            'seq' recebe o resultado original, sem contar o frame duas vezes.
     """
     exercise_type: str
     image_b64: str
+    session_id: str = Field("default", max_length=64)
+    profile: Optional[str] = Field(None, max_length=16)
+    seq: Optional[int] = Field(None, ge=0)
+
+class LandmarkFrameRequest(BaseModel):
+    """Schema para a análise de um frame cujos marcos foram detetados no dispositivo do cliente.
+
+    Attributes:
+        exercise_type (str): O tipo de exercício a ser analisado (ex: "squat").
+        landmarks (List[List[float]]): Os 33 marcos da pose, na ordem do MediaPipe, cada um
+            como [x, y, z, visibility] normalizados (z e visibility são opcionais).
+        session_id (str): Identificador da sessão de análise; cada sessão mantém a sua própria contagem.
+        seq (Optional[int]): Número de sequência do frame na sessão; um pedido repetido com o mesmo
+            'seq' recebe o resultado original, sem contar o frame duas vezes.
+    """
+    exercise_type: str
+    landmarks: List[List[float]] = Field(..., min_length=NUM_LANDMARKS, max_length=NUM_LANDMARKS)
+    session_id: str = Field("default", max_length=64)
+    seq: Optional[int] = Field(None, ge=0)
+
+def _analysis_http_exception(error: Exception) -> HTTPException:
+    """Converte uma exceção da análise de frames na resposta HTTP adequada.
+
+    Cada erro conta como um frame com o resultado 'error' nas métricas do pipeline.
+
+    :param (Exception) error: A exceção levantada pelo serviço de estimativa de pose.
+    :return (HTTPException): 400 para entradas inválidas, 503 (com Retry-After) quando
+        o serviço está sobrecarregado e 500 para erros inesperados.
+    """
+    pose_estimation_service.frames_failed.inc()
+    if isinstance(error, ValueError):
+        # Erros de validação, como tipo de exercício não suportado ou imagem inválida.
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error),
+        )
+    if isinstance(error, PoseEstimatorPoolFull):
+        # O pool de estimadores está saturado: o cliente deve tentar novamente mais tarde.
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(error),
+            headers={"Retry-After": str(settings.POSE_RETRY_AFTER_SECONDS)},
+        )
+    # Captura outras exceções inesperadas durante a análise.
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f"Ocorreu um erro interno durante a análise: {error}",
+    )
+
+def _analysis_response(result: dict, exercise_type: str, accept: Optional[str]) -> Response:
+    """Codifica o resultado de uma análise no formato pedido no cabeçalho Accept.
+
+    O modo delta só existe no WebSocket: as respostas HTTP podem chegar fora de
+    ordem ou perder-se, por isso levam sempre todos os campos.
+
+    :param (dict) result: O resultado devolvido pelo serviço de estimativa de pose.
+    :param (str) exercise_type: O tipo de exercício analisado.
+    :param (str) accept: O cabeçalho Accept da requisição.
+    :return (Response): A resposta em JSON ou no formato binário compacto.
+    """
+    media_type = negotiate_format(accept)
+    started = time.perf_counter()
+    content = ResultEncoder(exercise_type, media_type).encode(result)
+    pose_estimation_service.observe_stage("serialization", time.perf_counter() - started)
+    return Response(content=content, media_type=media_type)
 
 @router.get("/{exercise_id}/instructions", response_model=Dict[str, str])
 def get_exercise_instructions(
     exercise_id: str,
-    current_user: User = Depends(get_current_active_user)
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
 ):
     """Retorna as instruções de execução para um exercício específico.
 
@@ -41,7 +128,7 @@ def get_exercise_instructions(
     Requer um utilizador autenticado e ativo.
 
     :param (str) exercise_id: O identificador do exercício (ex: "squat", "push_up").
-    :param (User) current_user: O utilizador autenticado.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
     :raises HTTPException: Se o 'exercise_id' não corresponder a nenhum exercício conhecido.
     :return (Dict[str, str]): Um dicionário contendo as instruções formatadas.
     """
@@ -83,36 +170,370 @@ def get_exercise_instructions(
     return {"instructions": instructions[exercise_id]}
 
 
-@router.post("/analyze", response_model=Dict[str, Any])
-def analyze_exercise(
+@router.post("/analyze", response_model=Dict[str, Any], responses=_ANALYSIS_RESPONSES)
+async def analyze_exercise(
     request: ExerciseRequest,
-    current_user: User = Depends(get_current_active_user)
+    accept: Optional[str] = Header(None),
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
 ):
     """Recebe um frame de vídeo e o tipo de exercício para análise.
 
     Delega a análise para o serviço de estimativa de pose, que retorna a
-    contagem de repetições, estágio do movimento e feedback de postura.
+    contagem de repetições, estágio do movimento e feedback de postura. O
+    trabalho pesado de CPU corre no executor dedicado do serviço de pose, para
+    não competir com os endpoints da base de dados pelo threadpool padrão.
+
+    Com `Accept: application/vnd.fitai.pose` o resultado é devolvido no formato
+    binário compacto descrito em `app/services/result_encoding.py`.
 
     :param (ExerciseRequest) request: O corpo da requisição com o tipo de exercício e a imagem em base64.
-    :param (User) current_user: O utilizador autenticado.
+    :param (str) accept: O cabeçalho Accept, que escolhe entre JSON e o formato binário.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
     :raises HTTPException: Se a requisição for inválida ou se ocorrer um erro interno.
-    :return (Dict[str, Any]): Um dicionário com os resultados da análise.
+    :return (Response): Os resultados da análise, em JSON ou no formato binário.
     """
     try:
-        analysis_result = pose_estimation_service.analyze_exercise_frame(
+        analysis_result = await pose_estimation_service.run_in_pose_executor(
+            pose_estimation_service.analyze_exercise_frame,
             exercise_type=request.exercise_type,
-            image_b64=request.image_b64
+            image_b64=request.image_b64,
+            user_id=current_user.id,
+            session_id=request.session_id,
+            profile=request.profile,
+            seq=request.seq,
         )
-        return analysis_result
-    except ValueError as e:
-        # Erros de validação, como tipo de exercício não suportado ou imagem inválida.
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e),
+    except Exception as e:
+        raise _analysis_http_exception(e)
+    return _analysis_response(analysis_result, request.exercise_type, accept)
+
+
+@router.post(
+    "/analyze/raw",
+    response_model=Dict[str, Any],
+    responses=_ANALYSIS_RESPONSES,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+)
+async def analyze_exercise_raw(
+    request: Request,
+    exercise_type: str,
+    session_id: str = Query("default", max_length=64),
+    profile: Optional[str] = Query(None, max_length=16),
+    seq: Optional[int] = Query(None, ge=0),
+    accept: Optional[str] = Header(None),
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
+):
+    """Recebe um frame de vídeo como bytes brutos (application/octet-stream) para análise.
+
+    Evita o aumento de ~33% do payload e a cópia extra da codificação base64:
+    o corpo da requisição é entregue diretamente ao decodificador de imagem,
+    que corre no executor dedicado do serviço de pose.
+
+    :param (Request) request: A requisição cujo corpo contém a imagem (JPEG, PNG, ...).
+    :param (str) exercise_type: O tipo de exercício a ser analisado (ex: "squat").
+    :param (str) session_id: O identificador da sessão de análise.
+    :param (str) profile: O perfil do modelo de pose (ex.: 'lite'); por omissão, o do servidor.
+    :param (int) seq: O número de sequência do frame; as repetições de um 'seq' não contam o frame outra vez.
+    :param (str) accept: O cabeçalho Accept, que escolhe entre JSON e o formato binário.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
+    :raises HTTPException: Se a requisição for inválida ou se ocorrer um erro interno.
+    :return (Response): Os resultados da análise, em JSON ou no formato binário.
+    """
+    image_bytes = await request.body()
+    try:
+        analysis_result = await pose_estimation_service.run_in_pose_executor(
+            pose_estimation_service.analyze_exercise_bytes,
+            exercise_type=exercise_type,
+            image_bytes=image_bytes,
+            user_id=current_user.id,
+            session_id=session_id,
+            profile=profile,
+            seq=seq,
+        )
+    except Exception as e:
+        raise _analysis_http_exception(e)
+    return _analysis_response(analysis_result, exercise_type, accept)
+
+
+@router.post("/analyze/landmarks", response_model=Dict[str, Any], responses=_ANALYSIS_RESPONSES)
+def analyze_exercise_landmarks(
+    request: LandmarkFrameRequest,
+    accept: Optional[str] = Header(None),
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
+):
+    """Recebe os marcos de pose já detetados no cliente e o tipo de exercício para análise.
+
+    Para clientes que executam a deteção de pose no próprio dispositivo: o payload
+    tem apenas algumas centenas de bytes e o servidor salta a decodificação da
+    imagem e a inferência do MediaPipe, executando só o rastreamento.
+
+    :param (LandmarkFrameRequest) request: O corpo da requisição com o tipo de exercício e os marcos.
+    :param (str) accept: O cabeçalho Accept, que escolhe entre JSON e o formato binário.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
+    :raises HTTPException: Se a requisição for inválida ou se ocorrer um erro interno.
+    :return (Response): Os resultados da análise, em JSON ou no formato binário.
+    """
+    try:
+        analysis_result = pose_estimation_service.analyze_exercise_landmarks(
+            exercise_type=request.exercise_type,
+            landmarks=request.landmarks,
+            user_id=current_user.id,
+            session_id=request.session_id,
+            seq=request.seq,
         )
     except Exception as e:
-        # Captura outras exceções inesperadas durante a análise.
+        raise _analysis_http_exception(e)
+    return _analysis_response(analysis_result, request.exercise_type, accept)
+
+
+@router.post(
+    "/videos",
+    response_model=Dict[str, Any],
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+)
+async def submit_video_analysis(
+    request: Request,
+    exercise_type: str,
+    stride: int = Query(1, ge=1, le=30),
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
+):
+    """Recebe um vídeo gravado de um treino e agenda a sua análise em segundo plano.
+
+    O corpo da requisição é gravado em disco à medida que chega, sem ser mantido
+    em memória, e a análise corre num worker próprio. O lugar na fila é
+    reservado antes de gravar o vídeo, para que uma fila cheia não ocupe o
+    disco. O progresso e o resultado são consultados em `GET /videos/{job_id}`.
+
+    :param (Request) request: A requisição cujo corpo contém o ficheiro de vídeo.
+    :param (str) exercise_type: O tipo de exercício a ser analisado (ex: "squat").
+    :param (int) stride: Analisa apenas um em cada `stride` frames.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
+    :raises HTTPException: Se o exercício não for suportado, o vídeo estiver vazio ou exceder o tamanho
+        máximo, 429 se o utilizador já tiver o máximo de vídeos por analisar e 503 se a fila estiver cheia.
+    :return (Dict[str, Any]): O estado inicial do trabalho, incluindo o 'job_id'.
+    """
+    if not pose_estimation_service.tracker_registry.supports(exercise_type):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Exercício não suportado")
+
+    try:
+        video_analysis_service.reserve(current_user.id)
+    except VideoQueueFull as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ocorreu um erro interno durante a análise: {e}",
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS if e.per_user else status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(settings.POSE_VIDEO_RETRY_AFTER_SECONDS)},
         )
+
+    try:
+        fd, path = tempfile.mkstemp(prefix="fitai-video-")
+    except BaseException:
+        video_analysis_service.release(current_user.id)
+        raise
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as video_file:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > settings.POSE_VIDEO_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="O vídeo excede o tamanho máximo permitido.",
+                    )
+                # A escrita em disco bloqueia: corre no threadpool, fora do event loop.
+                await run_in_threadpool(video_file.write, chunk)
+        if size == 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="O corpo da requisição não contém nenhum vídeo.")
+    except BaseException:
+        video_analysis_service.release(current_user.id)
+        os.remove(path)
+        raise
+
+    job = video_analysis_service.submit(current_user.id, exercise_type, path, stride, reserved=True)
+    return job.to_dict()
+
+
+@router.get("/videos/{job_id}", response_model=Dict[str, Any])
+def get_video_analysis(
+    job_id: str,
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
+):
+    """Consulta o progresso e o resultado de uma análise de vídeo.
+
+    :param (str) job_id: O identificador devolvido ao submeter o vídeo.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
+    :raises HTTPException: Se o trabalho não existir, tiver expirado ou pertencer a outro utilizador.
+    :return (Dict[str, Any]): O estado, o progresso, o total de repetições, a linha do tempo de cada repetição
+        e a amplitude de cada articulação.
+    """
+    job = video_analysis_service.get_job(current_user.id, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Análise de vídeo não encontrada")
+    return job.to_dict()
+
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+def end_analysis_session(
+    session_id: str,
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
+):
+    """Encerra uma sessão de análise, libertando os seus rastreadores.
+
+    Sessões não encerradas explicitamente expiram após o tempo de inatividade configurado.
+
+    :param (str) session_id: O identificador da sessão de análise a encerrar.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
+    :return: None
+    """
+    pose_estimation_service.tracker_registry.discard(current_user.id, session_id)
+
+
+def _authenticate_websocket(token: str) -> AuthenticatedUser:
+    """Valida o token de uma ligação WebSocket e obtém o utilizador ativo.
+
+    Os navegadores não permitem definir o cabeçalho 'Authorization' em WebSockets,
+    por isso o token chega como parâmetro de consulta e é validado uma única vez.
+
+    :param (str) token: O token JWT enviado pelo cliente.
+    :raises HTTPException: Se o token for inválido ou o utilizador estiver inativo.
+    :return (AuthenticatedUser): O utilizador autenticado.
+    """
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(db, token)
+    finally:
+        db.close()
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Utilizador inativo")
+    return user
+
+
+async def _receive_frames(websocket: WebSocket, mailbox: FrameMailbox):
+    """Recebe as mensagens de uma ligação WebSocket e coloca-as na caixa de frames.
+
+    Corre em paralelo com a análise, para que os frames que chegam durante a
+    análise de outro substituam os pendentes em vez de se acumularem no socket.
+
+    :param (WebSocket) websocket: A ligação WebSocket.
+    :param (FrameMailbox) mailbox: A caixa de frames da ligação.
+    :return: None
+    """
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is None:
+                data = message.get("text", "")
+            mailbox.put(data, coalesce=pose_estimation_service.coalesce_frames())
+    finally:
+        mailbox.close()
+
+
+@router.websocket("/ws")
+async def analyze_exercise_stream(
+    websocket: WebSocket,
+    exercise_type: str,
+    token: str,
+    session_id: str = "default",
+    profile: Optional[str] = None,
+    response_format: str = Query("json", alias="format"),
+    delta: bool = False
+):
+    """Analisa um fluxo contínuo de frames através de uma ligação WebSocket.
+
+    O utilizador é autenticado uma única vez na abertura da ligação, que mantém
+    um estimador de pose próprio durante toda a sua duração. Com POSE_MAX_STREAMS
+    ligações em análise, as novas são fechadas com o código 1013. Cada mensagem (bytes
+    da imagem, texto em base64 ou JSON {"landmarks": [...]} com os marcos detetados
+    no cliente) recebe como resposta o resultado da análise em JSON.
+
+    Com `POSE_COALESCE_FRAMES` (ou no degrau de descarte do controlador de carga),
+    os frames que chegam enquanto outro é analisado substituem-se uns aos outros e
+    só o mais recente é analisado; sem coalescência ficam pendentes no máximo
+    `POSE_STREAM_MAX_PENDING` frames. Cada resposta indica em 'dropped_frames'
+    quantos frames da ligação foram descartados.
+
+    Com `format=binary` as respostas são mensagens binárias no formato compacto
+    de `app/services/result_encoding.py`; com `delta=true` cada resposta leva só
+    os campos que mudaram desde a anterior.
+
+    :param (WebSocket) websocket: A ligação WebSocket.
+    :param (str) exercise_type: O tipo de exercício a ser analisado (ex: "squat").
+    :param (str) token: O token JWT do utilizador, enviado como parâmetro de consulta.
+    :param (str) session_id: O identificador da sessão de análise.
+    :param (str) profile: O perfil do modelo de pose da ligação (ex.: 'lite'); por omissão, o do servidor.
+    :param (str) response_format: O formato das respostas, 'json' ou 'binary' (parâmetro 'format').
+    :param (bool) delta: Omite das respostas os campos que não mudaram.
+    :return: None
+    """
+    try:
+        user = await run_in_threadpool(_authenticate_websocket, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not pose_estimation_service.tracker_registry.supports(exercise_type):
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason="Exercício não suportado")
+        return
+    try:
+        profile = pose_estimation_service.select_profile(profile, dedicated=True)
+    except ValueError as e:
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason=str(e))
+        return
+    if response_format not in FORMATS:
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason="Formato de resposta não suportado")
+        return
+    encoder = ResultEncoder(exercise_type, FORMATS[response_format], delta=delta)
+
+    await websocket.accept()
+    if not pose_estimation_service.acquire_stream_slot():
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Número máximo de ligações de análise atingido.")
+        return
+    try:
+        estimator = await pose_estimation_service.run_in_pose_executor(pose_estimation_service.create_pose_estimator, profile)
+    except BaseException as e:
+        pose_estimation_service.release_stream_slot()
+        if not isinstance(e, PoseEstimatorPoolFull):
+            raise
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=str(e))
+        return
+    mailbox = FrameMailbox(coalesce=settings.POSE_COALESCE_FRAMES, maxlen=settings.POSE_STREAM_MAX_PENDING)
+    receiver = asyncio.create_task(_receive_frames(websocket, mailbox))
+    try:
+        while True:
+            data = await mailbox.get()
+            if data is None:
+                break
+            try:
+                result = await pose_estimation_service.run_in_pose_executor(
+                    pose_estimation_service.analyze_stream_frame,
+                    exercise_type, data, user.id, session_id, estimator
+                )
+            except (ValueError, PoseEstimatorPoolFull) as e:
+                pose_estimation_service.frames_failed.inc()
+                result = {"error": str(e)}
+            except Exception as e:
+                pose_estimation_service.frames_failed.inc()
+                result = {"error": f"Ocorreu um erro interno durante a análise: {e}"}
+            result["dropped_frames"] = mailbox.dropped
+            started = time.perf_counter()
+            message = encoder.encode(result)
+            pose_estimation_service.observe_stage("serialization", time.perf_counter() - started)
+            if encoder.binary:
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_text(message)
+    finally:
+        receiver.cancel()
+        estimator.close()
+        pose_estimation_service.release_stream_slot()
@@ -12,10 +12,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.models.user import User as UserModel
 from app.schemas.exercise_session import SessaoDeTreino, SessaoDeTreinoCreate
 from app.core.database import get_db
 from app.core.dependencies import get_current_active_user
+from app.core.user_cache import AuthenticatedUser
 from app.services import crud
 
 # Cria uma nova instância de roteador para os endpoints de sessão de treino.
@@ -26,14 +26,14 @@ def read_workout_sessions(
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 25,
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
 ):
     """Recupera o histórico paginado de sessões de treino para o utilizador autenticado.
 
     :param (Session) db: A sessão da base de dados.
     :param (int) skip: O número de sessões a pular (para paginação).
     :param (int) limit: O número máximo de sessões a retornar.
-    :param (UserModel) current_user: O utilizador autenticado.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
     :return (List[SessaoDeTreino]): Uma lista de objetos de sessão de treino.
     """
     sessions = crud.get_sessions_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
@@ -45,7 +45,7 @@ def create_workout_session(
     *,
     db: Session = Depends(get_db),
     session_in: SessaoDeTreinoCreate,
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
 ):
     """Cria uma nova sessão de treino para o utilizador autenticado.
 
@@ -53,7 +53,7 @@ def create_workout_session(
 
     :param (Session) db: A sessão da base de dados.
     :param (SessaoDeTreinoCreate) session_in: Os dados da sessão a ser criada, incluindo seus itens.
-    :param (UserModel) current_user: O utilizador autenticado.
+    :param (AuthenticatedUser) current_user: O utilizador autenticado.
     :raises HTTPException: Se a sessão de treino não contiver nenhum item.
     :return (SessaoDeTreino): A sessão de treino recém-criada.
     """
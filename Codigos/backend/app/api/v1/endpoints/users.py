@@ -13,7 +13,7 @@ from sqlalchemy.orm import Session
 
 from app.models.user import User as UserModel
 from app.schemas.user import User, UserUpdate
-from app.core.dependencies import get_current_active_user
+from app.core.dependencies import get_current_db_user
 from app.services import crud
 from app.core.database import get_db
 
@@ -21,7 +21,7 @@ from app.core.database import get_db
 router = APIRouter()
 
 @router.get("/me", response_model=User)
-def read_user_me(current_user: UserModel = Depends(get_current_active_user)):
+def read_user_me(current_user: UserModel = Depends(get_current_db_user)):
     """Recupera os dados do perfil do utilizador atualmente autenticado.
 
     :param (UserModel) current_user: O utilizador autenticado, injetado pela dependência.
@@ -34,7 +34,7 @@ def update_user_me(
     *,
     db: Session = Depends(get_db),
     user_in: UserUpdate,
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(get_current_db_user)
 ):
     """Atualiza os dados do perfil do utilizador atualmente autenticado.
 
@@ -8,17 +8,77 @@
 @author Wesley dos Santos Gatinho
 """
 
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from .config import settings
+from .metrics import registry as metrics_registry
+
+checkout_seconds = metrics_registry.histogram(
+    "fitai_db_pool_checkout_seconds",
+    "Tempo, em segundos, para obter uma conexão do pool, incluindo a espera, a criação e o pre-ping.",
+)
+checkout_timeouts_total = metrics_registry.counter(
+    "fitai_db_pool_checkout_timeouts_total", "Pedidos de conexão que excederam DB_POOL_TIMEOUT."
+)
+connections_total = metrics_registry.counter(
+    "fitai_db_pool_connections_total", "Conexões abertas com a base de dados (novas, recicladas ou após falhas)."
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que regista a duração de cada checkout e os timeouts nas métricas da aplicação."""
+
+    def connect(self):
+        """Obtém uma conexão do pool, medindo o tempo até ela estar disponível.
+
+        :raises sqlalchemy.exc.TimeoutError: Se nenhuma conexão ficar livre em DB_POOL_TIMEOUT segundos.
+        :return (PoolProxiedConnection): A conexão.
+        """
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            checkout_timeouts_total.inc()
+            raise
+        finally:
+            checkout_seconds.observe(time.perf_counter() - started)
+
 
 # Cria o "motor" (engine) do SQLAlchemy que se conectará à base de dados.
-# A URL é lida a partir das configurações da aplicação.
-# O argumento 'pool_pre_ping=True' verifica as conexões antes de usá-las,
-# o que previne erros com conexões que foram fechadas pelo servidor da base de dados.
+# A URL é lida a partir das configurações da aplicação, e o pool é dimensionado
+# pelas configurações DB_POOL_*: cada worker tem o seu pool, por isso o número
+# máximo de conexões no servidor é workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+# O 'pool_pre_ping' verifica cada conexão antes de a usar, o que custa uma ida e
+# volta ao servidor por checkout; com DB_POOL_RECYCLE abaixo do tempo de
+# inatividade do servidor, as conexões fechadas por ele raramente chegam a ser
+# usadas e o pre-ping pode ser desativado.
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_use_lifo=settings.DB_POOL_USE_LIFO,
+)
+event.listen(engine, "connect", lambda dbapi_connection, connection_record: connections_total.inc())
+
+metrics_registry.gauge_callback(
+    "fitai_db_pool_size", "Tamanho configurado do pool de conexões.", lambda: engine.pool.size()
+)
+metrics_registry.gauge_callback(
+    "fitai_db_pool_checked_out", "Conexões em uso.", lambda: engine.pool.checkedout()
+)
+metrics_registry.gauge_callback(
+    "fitai_db_pool_checked_in", "Conexões livres no pool.", lambda: engine.pool.checkedin()
+)
+metrics_registry.gauge_callback(
+    "fitai_db_pool_overflow", "Conexões abertas além de DB_POOL_SIZE (negativo enquanto o pool não está cheio).",
+    lambda: engine.pool.overflow(),
 )
 
 # Cria uma classe SessionLocal, que funcionará como uma fábrica para novas sessões de base de dados.
@@ -18,31 +18,51 @@ from app.schemas.token import TokenData
 from app.models.user import User
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.metrics import registry as metrics_registry
+from app.core.user_cache import AuthenticatedUser, user_cache
 
 # Cria uma instância do esquema de autenticação OAuth2.
 # 'tokenUrl' aponta para o endpoint de login onde o token é obtido.
 # FastAPI usará isso para extrair o token do cabeçalho 'Authorization'.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
-    """Decodifica o token JWT para obter o utilizador atual da base de dados.
+metrics_registry.counter_callback(
+    "fitai_auth_user_cache_hits_total", "Utilizadores autenticados encontrados na cache.", lambda: user_cache.hits
+)
+metrics_registry.counter_callback(
+    "fitai_auth_user_cache_misses_total", "Utilizadores autenticados lidos da base de dados.", lambda: user_cache.misses
+)
 
-    Esta função é uma dependência que:
-    1. Extrai o token JWT da requisição.
-    2. Decodifica e valida o token.
-    3. Extrai o e-mail (subject) do payload do token.
-    4. Busca o utilizador na base de dados com base no e-mail.
-
-    :param (Session) db: A sessão da base de dados, injetada por `get_db`.
-    :param (str) token: O token JWT, injetado por `oauth2_scheme`.
-    :raises HTTPException: Se o token for inválido, malformado ou o utilizador não existir.
-    :return (User): O modelo SQLAlchemy do utilizador autenticado.
-    """
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    """Cria a exceção devolvida quando as credenciais não são válidas."""
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def get_user_from_token(db: Session, token: str) -> AuthenticatedUser:
+    """Decodifica um token JWT e obtém o utilizador correspondente.
+
+    Esta função:
+    1. Decodifica e valida o token.
+    2. Extrai o e-mail (subject) do payload do token.
+    3. Procura o utilizador na cache (`user_cache`) e, se não estiver lá, na base
+       de dados, guardando-o na cache.
+
+    Com a cache, os pedidos frequentes do mesmo utilizador (ex.: os frames de
+    vídeo) não fazem nenhuma consulta à base de dados para a autenticação. O token
+    continua a ser validado (assinatura e expiração) em todos os pedidos.
+
+    É usada diretamente quando o token não chega pelo cabeçalho 'Authorization',
+    como na autenticação de ligações WebSocket.
+
+    :param (Session) db: A sessão da base de dados, usada apenas se o utilizador não estiver em cache.
+    :param (str) token: O token JWT a validar.
+    :raises HTTPException: Se o token for inválido, malformado ou o utilizador não existir.
+    :return (AuthenticatedUser): A identidade do utilizador autenticado.
+    """
+    credentials_exception = _credentials_exception()
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
@@ -51,22 +71,61 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    
-    user = crud.get_user_by_email(db, email=token_data.email)
-    if user is None:
+
+    user = user_cache.get(token_data.email)
+    if user is not None:
+        return user
+    generation = user_cache.generation
+    db_user = crud.get_user_by_email(db, email=token_data.email)
+    if db_user is None:
         raise credentials_exception
+    user = AuthenticatedUser(id=db_user.id, email=db_user.email, is_active=db_user.is_active)
+    user_cache.put(token_data.email, user, generation)
     return user
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> AuthenticatedUser:
+    """Decodifica o token JWT para obter o utilizador atual.
+
+    Esta função é uma dependência que extrai o token JWT do cabeçalho
+    'Authorization' e delega a validação a `get_user_from_token`.
+
+    :param (Session) db: A sessão da base de dados, injetada por `get_db`.
+    :param (str) token: O token JWT, injetado por `oauth2_scheme`.
+    :raises HTTPException: Se o token for inválido, malformado ou o utilizador não existir.
+    :return (AuthenticatedUser): A identidade do utilizador autenticado.
+    """
+    return get_user_from_token(db, token)
+
+def get_current_active_user(current_user: AuthenticatedUser = Depends(get_current_user)) -> AuthenticatedUser:
     """Obtém o utilizador autenticado e verifica se ele está ativo.
 
     Esta é a dependência principal para proteger endpoints. Ela primeiro obtém
     o utilizador com `get_current_user` e depois verifica a flag `is_active`.
 
-    :param (User) current_user: O utilizador, injetado pela dependência `get_current_user`.
+    :param (AuthenticatedUser) current_user: O utilizador, injetado pela dependência `get_current_user`.
     :raises HTTPException: Se a conta do utilizador estiver inativa.
-    :return (User): O modelo SQLAlchemy do utilizador ativo e autenticado.
+    :return (AuthenticatedUser): A identidade do utilizador ativo e autenticado.
     """
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Utilizador inativo")
     return current_user
+
+def get_current_db_user(
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
+) -> User:
+    """Obtém o modelo completo do utilizador ativo e autenticado da base de dados.
+
+    Para os endpoints que leem ou alteram o perfil: o modelo devolvido está
+    associado à sessão `db` e pode ser passado às funções CRUD.
+
+    :param (Session) db: A sessão da base de dados, injetada por `get_db`.
+    :param (AuthenticatedUser) current_user: O utilizador, injetado pela dependência `get_current_active_user`.
+    :raises HTTPException: Se o utilizador já não existir.
+    :return (User): O modelo SQLAlchemy do utilizador.
+    """
+    user = crud.get_user_by_email(db, email=current_user.email)
+    if user is None:
+        user_cache.invalidate(current_user.email)
+        raise _credentials_exception()
+    return user
@@ -0,0 +1,111 @@
+"""
+@file lru_cache.py
+@brief Dicionário LRU com expiração (TTL), base das caches e registos em memória da aplicação.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """Dicionário limitado em número de entradas e em tempo de vida.
+
+    As entradas ficam num OrderedDict pela ordem de uso, cada uma com o instante
+    em que foi guardada. O descarte das expiradas (TTL) e das excedentes (limite
+    de memória) começa pela menos usada e pára na primeira entrada válida, em
+    tempo constante amortizado, sem varrer o dicionário a cada acesso; uma
+    entrada expirada mais à frente nunca é devolvida por `get` e é descartada
+    quando chegar ao início.
+
+    A classe não é thread-safe: quem a usa deve serializar os acessos com o seu
+    próprio lock, o que lhe permite combinar várias operações numa só.
+
+    Attributes:
+        max_entries (int): Número máximo de entradas.
+        ttl_seconds (float): Tempo, em segundos, durante o qual uma entrada é válida.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float, clock=time.monotonic):
+        """Inicializa o dicionário vazio.
+
+        :param (int) max_entries: Número máximo de entradas.
+        :param (float) ttl_seconds: Validade de cada entrada, em segundos.
+        :param (callable) clock: Relógio monotónico usado na expiração.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None, now: Optional[float] = None) -> Any:
+        """Procura uma entrada válida, marcando-a como a usada mais recentemente.
+
+        A leitura não renova a validade da entrada; para isso, use `put`.
+
+        :param (Hashable) key: A chave da entrada.
+        :param (object) default: O valor retornado se a entrada não existir ou tiver expirado.
+        :param (float) now: O instante atual; por omissão, o do relógio.
+        :return (object): O valor guardado, ou `default`.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if (self.clock() if now is None else now) - entry[0] >= self.ttl_seconds:
+            return default
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any, now: Optional[float] = None) -> int:
+        """Guarda (ou renova) uma entrada e descarta as expiradas ou excedentes.
+
+        :param (Hashable) key: A chave da entrada.
+        :param (object) value: O valor a guardar.
+        :param (float) now: O instante atual; por omissão, o do relógio.
+        :return (int): O número de entradas descartadas.
+        """
+        now = self.clock() if now is None else now
+        self._entries[key] = (now, value)
+        self._entries.move_to_end(key)
+        return self.evict(now)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove uma entrada, válida ou não.
+
+        :param (Hashable) key: A chave da entrada.
+        :param (object) default: O valor retornado se a entrada não existir.
+        :return (object): O valor removido, ou `default`.
+        """
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Remove as entradas mais antigas enquanto estiverem expiradas ou acima do limite.
+
+        :param (float) now: O instante atual; por omissão, o do relógio.
+        :return (int): O número de entradas removidas.
+        """
+        now = self.clock() if now is None else now
+        removed = 0
+        while self._entries:
+            stored_at = next(iter(self._entries.values()))[0]
+            if len(self._entries) <= self.max_entries and now - stored_at < self.ttl_seconds:
+                break
+            self._entries.popitem(last=False)
+            removed += 1
+        return removed
+
+    def clear(self):
+        """Remove todas as entradas.
+
+        :return: None
+        """
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """Retorna o número de entradas guardadas, incluindo as expiradas ainda não descartadas."""
+        return len(self._entries)
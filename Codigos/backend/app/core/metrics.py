@@ -0,0 +1,305 @@
+"""
+@file metrics.py
+@brief Métricas da aplicação (contadores, histogramas e gauges) expostas no formato de texto do Prometheus.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+# Limites, em segundos, dos histogramas de duração: de 50 us (rastreamento,
+# serialização) a 2,5 s (inferência com o serviço saturado).
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names, values) -> str:
+    """Formata as etiquetas de uma série, ex.: '{stage="decode"}'."""
+    if not names:
+        return ""
+    pairs = (
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value) -> str:
+    """Formata um valor de uma amostra."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base das métricas com etiquetas: cada combinação de valores tem a sua série."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        """Inicializa a métrica; sem etiquetas, a sua única série é criada já.
+
+        :param (str) name: O nome da métrica.
+        :param (str) documentation: A descrição da métrica.
+        :param (tuple) labelnames: Os nomes das etiquetas.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, *values):
+        """Obtém a série de uma combinação de etiquetas, criando-a no primeiro uso.
+
+        No caminho crítico, guarde a série devolvida em vez de a procurar a cada frame.
+
+        :param (tuple) values: Os valores das etiquetas, pela ordem de `labelnames`.
+        :raises ValueError: Se o número de valores não corresponder ao das etiquetas.
+        :return (object): A série da combinação.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"A métrica {self.name} espera as etiquetas {self.labelnames}.")
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self):
+        """Produz as linhas de texto da métrica no formato do Prometheus."""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in list(self._children.items()):
+            yield from self._samples(_format_labels(self.labelnames, values), child)
+
+    def _samples(self, labels, child):
+        raise NotImplementedError
+
+
+class _CounterChild:
+    """Série de um contador."""
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Incrementa o contador.
+
+        :param (int | float) amount: O incremento, não negativo.
+        :return: None
+        """
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Contador monotónico (ex.: frames analisados)."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        """Incrementa o contador sem etiquetas."""
+        self._children[()].inc(amount)
+
+    def _samples(self, labels, child):
+        yield f"{self.name}{labels} {_format_value(child.value)}"
+
+
+class _HistogramChild:
+    """Série de um histograma: contagem por intervalo, soma e total."""
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Regista uma observação.
+
+        :param (float) value: O valor observado (ex.: uma duração em segundos).
+        :return: None
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Devolve um gestor de contexto que regista a duração do bloco.
+
+        :return (_Timer): O cronómetro do bloco.
+        """
+        return _Timer(self)
+
+
+class _Timer:
+    """Gestor de contexto que regista a duração de um bloco num histograma."""
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._started)
+        return False
+
+
+class Histogram(_Metric):
+    """Histograma com intervalos fixos (ex.: duração de cada etapa do pipeline)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Inicializa o histograma.
+
+        :param (str) name: O nome da métrica.
+        :param (str) documentation: A descrição da métrica.
+        :param (tuple) labelnames: Os nomes das etiquetas.
+        :param (tuple) buckets: Os limites superiores dos intervalos (o +Inf é acrescentado).
+        """
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        """Regista uma observação no histograma sem etiquetas."""
+        self._children[()].observe(value)
+
+    def _samples(self, labels, child):
+        with child._lock:
+            counts = list(child.counts)
+            total_sum = child.sum
+        prefix = labels[1:-1] + "," if labels else ""
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{{prefix}le="{_format_value(float(bound))}"}} {cumulative}'
+        yield f"{self.name}_sum{labels} {_format_value(total_sum)}"
+        yield f"{self.name}_count{labels} {cumulative}"
+
+
+class CallbackMetric:
+    """Métrica sem etiquetas cujo valor é lido no momento da recolha.
+
+    Útil para estados que já existem noutro objeto (ex.: a profundidade da fila do
+    pool), que assim não têm nenhum custo no caminho crítico.
+
+    Attributes:
+        name (str): O nome da métrica.
+        documentation (str): A descrição da métrica.
+        kind (str): 'gauge' ou 'counter'.
+    """
+    def __init__(self, name: str, documentation: str, callback, kind: str = "gauge"):
+        """Inicializa a métrica.
+
+        :param (str) name: O nome da métrica.
+        :param (str) documentation: A descrição da métrica.
+        :param (callable) callback: Função sem argumentos que devolve o valor atual.
+        :param (str) kind: 'gauge' ou 'counter'.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self._callback = callback
+
+    def collect(self):
+        """Produz as linhas de texto da métrica no formato do Prometheus."""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield f"{self.name} {_format_value(self._callback())}"
+
+
+class MetricsRegistry:
+    """Registo das métricas da aplicação."""
+    def __init__(self):
+        """Inicializa o registo vazio."""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        """Regista uma métrica, garantindo que o nome é único."""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"A métrica {metric.name} já está registada.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        """Cria e regista um contador.
+
+        :param (str) name: O nome da métrica (ex.: 'fitai_pose_frames_total').
+        :param (str) documentation: A descrição da métrica.
+        :param (tuple) labelnames: Os nomes das etiquetas.
+        :return (Counter): O contador.
+        """
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        """Cria e regista um histograma.
+
+        :param (str) name: O nome da métrica (ex.: 'fitai_pose_stage_seconds').
+        :param (str) documentation: A descrição da métrica.
+        :param (tuple) labelnames: Os nomes das etiquetas.
+        :param (tuple) buckets: Os limites superiores dos intervalos.
+        :return (Histogram): O histograma.
+        """
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, callback) -> CallbackMetric:
+        """Regista um gauge lido no momento da recolha.
+
+        :param (str) name: O nome da métrica.
+        :param (str) documentation: A descrição da métrica.
+        :param (callable) callback: Função sem argumentos que devolve o valor atual.
+        :return (CallbackMetric): O gauge.
+        """
+        return self._register(CallbackMetric(name, documentation, callback, "gauge"))
+
+    def counter_callback(self, name: str, documentation: str, callback) -> CallbackMetric:
+        """Regista um contador mantido noutro objeto e lido no momento da recolha.
+
+        :param (str) name: O nome da métrica.
+        :param (str) documentation: A descrição da métrica.
+        :param (callable) callback: Função sem argumentos que devolve o valor atual.
+        :return (CallbackMetric): O contador.
+        """
+        return self._register(CallbackMetric(name, documentation, callback, "counter"))
+
+    def render(self) -> str:
+        """Gera a exposição de todas as métricas no formato de texto do Prometheus.
+
+        :return (str): O texto a devolver no endpoint /metrics.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+# Registo global, exposto em /metrics.
+registry = MetricsRegistry()
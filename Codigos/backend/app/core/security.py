@@ -8,15 +8,64 @@
 @author Wesley dos Santos Gatinho
 """
 
+import math
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from passlib.hash import bcrypt
 from .config import settings
 
+# Custo máximo aceite pelo bcrypt (2^31 iterações).
+BCRYPT_MAX_ROUNDS = 31
+
 # Contexto do Passlib para hashing e verificação de senhas.
-# 'bcrypt' é o algoritmo recomendado pela sua robustez.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 'bcrypt' é o algoritmo recomendado pela sua robustez. O custo (rounds) é uma
+# configuração operacional: os hashes com outro custo continuam válidos, mas
+# `password_needs_rehash` assinala-os para serem recalculados no próximo login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
+
+def configure_password_hashing(rounds: int, max_rounds: Optional[int] = None):
+    """Define o custo do bcrypt dos novos hashes e o intervalo aceite sem recálculo.
+
+    É chamada também em cada processo do pool de hashing (ver `password_service`),
+    para que os processos usem o mesmo custo que o processo principal.
+
+    :param (int) rounds: O custo dos novos hashes (log2 do número de iterações).
+    :param (Optional[int]) max_rounds: O maior custo aceite sem recálculo; por omissão, `rounds`.
+    :return: None
+    """
+    pwd_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=max_rounds if max_rounds is not None else rounds,
+    )
+
+def calibrate_bcrypt_rounds(target_seconds: float, min_rounds: int, samples: int = 3) -> int:
+    """Escolhe o custo do bcrypt cuja verificação demora cerca de `target_seconds` neste hardware.
+
+    Mede o hashing com o custo `min_rounds` e extrapola: cada ronda a mais duplica o tempo.
+
+    :param (float) target_seconds: O tempo de verificação pretendido, em segundos.
+    :param (int) min_rounds: O custo mínimo, usado também na medição.
+    :param (int) samples: O número de medições; conta a mais rápida, a menos afetada por outras tarefas.
+    :return (int): O custo calibrado, entre `min_rounds` e BCRYPT_MAX_ROUNDS.
+    """
+    handler = bcrypt.using(rounds=min_rounds)
+    elapsed = float("inf")
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.hash("calibration")
+        elapsed = min(elapsed, time.perf_counter() - started)
+    rounds = min_rounds + round(math.log2(target_seconds / elapsed))
+    return max(min_rounds, min(rounds, BCRYPT_MAX_ROUNDS))
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se uma senha em texto plano corresponde a um hash existente.
@@ -35,6 +84,14 @@ def get_password_hash(password: str) -> str:
     """
     return pwd_context.hash(password)
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Verifica se um hash foi gerado com um custo fora do configurado (não executa o bcrypt).
+
+    :param (str) hashed_password: O hash da senha armazenado na base de dados.
+    :return (bool): True se o hash deve ser recalculado com o custo atual.
+    """
+    return pwd_context.needs_update(hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Cria um novo token de acesso JWT.
 
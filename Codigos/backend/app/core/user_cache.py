@@ -0,0 +1,127 @@
+"""
+@file user_cache.py
+@brief Cache LRU com expiração dos utilizadores autenticados, indexada pelo 'subject' do token.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import threading
+import time
+import uuid
+from typing import NamedTuple
+
+from app.core.config import settings
+from app.core.lru_cache import LRUCache
+
+
+class AuthenticatedUser(NamedTuple):
+    """Identidade do utilizador autenticado, sem ligação à sessão da base de dados.
+
+    Contém apenas o que os endpoints precisam para autorizar um pedido; os dados
+    do perfil devem ser lidos da base de dados (ver `get_current_db_user`).
+
+    Attributes:
+        id (uuid.UUID): ID único do utilizador.
+        email (str): E-mail do utilizador, o 'subject' dos seus tokens.
+        is_active (bool): Flag que indica se a conta do utilizador está ativa.
+    """
+    id: uuid.UUID
+    email: str
+    is_active: bool
+
+
+class UserCache:
+    """Cache dos utilizadores resolvidos a partir dos tokens JWT.
+
+    Sem a cache, cada pedido autenticado (incluindo cada frame de vídeo) faz uma
+    consulta à base de dados para obter o utilizador do token. As entradas ficam
+    num `LRUCache`, limitado a `max_entries` utilizadores válidos durante
+    `ttl_seconds`.
+
+    A cache é local a cada worker: `crud.update_user` invalida a entrada do
+    utilizador neste worker e, nos restantes, a entrada antiga expira ao fim de
+    `ttl_seconds`. Uma invalidação durante a leitura da base de dados impede que
+    o valor lido antes dela seja guardado (ver `generation`).
+
+    Attributes:
+        max_entries (int): Número máximo de utilizadores em cache; 0 desativa a cache.
+        ttl_seconds (float): Tempo, em segundos, durante o qual uma entrada é válida.
+        generation (int): Número de invalidações até ao momento.
+        hits (int): Número de consultas encontradas na cache.
+        misses (int): Número de consultas não encontradas na cache.
+    """
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0, clock=time.monotonic):
+        """Inicializa a cache vazia.
+
+        :param (int) max_entries: Número máximo de entradas; 0 desativa a cache.
+        :param (float) ttl_seconds: Validade de cada entrada, em segundos.
+        :param (callable) clock: Relógio monotónico usado na expiração.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = LRUCache(max_entries, ttl_seconds, clock)
+        self._lock = threading.Lock()
+
+    def get(self, subject: str):
+        """Procura o utilizador de um 'subject'.
+
+        :param (str) subject: O 'subject' do token (o e-mail do utilizador).
+        :return (AuthenticatedUser | None): O utilizador, ou None se não estiver em cache ou tiver expirado.
+        """
+        with self._lock:
+            user = self._entries.get(subject)
+            if user is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return user
+
+    def put(self, subject: str, user: AuthenticatedUser, generation: int):
+        """Guarda o utilizador de um 'subject', descartando as entradas antigas ou em excesso.
+
+        :param (str) subject: O 'subject' do token.
+        :param (AuthenticatedUser) user: O utilizador lido da base de dados.
+        :param (int) generation: O valor de `generation` antes da leitura; se tiver
+            havido uma invalidação entretanto, o utilizador não é guardado.
+        :return: None
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries.put(subject, user)
+
+    def invalidate(self, *subjects: str):
+        """Remove os utilizadores de um ou mais 'subjects' (ex.: o e-mail antigo e o novo).
+
+        :param (tuple) subjects: Os 'subjects' a remover.
+        :return: None
+        """
+        with self._lock:
+            self.generation += 1
+            for subject in subjects:
+                self._entries.pop(subject, None)
+
+    def clear(self):
+        """Remove todas as entradas.
+
+        :return: None
+        """
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Retorna o número de entradas em cache."""
+        return len(self._entries)
+
+
+# Instância única, partilhada pela autenticação e pelas funções CRUD que a invalidam.
+user_cache = UserCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL_SECONDS)
@@ -14,14 +14,16 @@ from sqlalchemy.orm import Session
 # Adiciona o diretório raiz do projeto ao caminho de pesquisa do Python para permitir importações absolutas.
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.database import engine, SessionLocal
 from app.api.v1.api import api_router
+from app.core import metrics
 # Importar todos os modelos para que o SQLAlchemy os possa criar.
 from app.models import user, progress_record, exercise_session, exercicio
-from app.services import crud
+from app.services import crud, password_service, pose_estimation_service
+from app.services.video_analysis_service import video_analysis_service
 from app.schemas.exercicio import ExercicioCreate
 
 # Cria todas as tabelas na base de dados, caso ainda não existam, com base nos modelos importados.
@@ -89,6 +91,35 @@ app.add_middleware(
 # Inclui o roteador da API v1, prefixando todas as rotas com /api/v1.
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+def calibrate_password_hashing():
+    """Calibra o custo do bcrypt ao tempo de verificação configurado, se PASSWORD_HASH_TARGET_MS estiver definido.
+
+    :return: None
+    """
+    password_service.calibrate()
+
+@app.on_event("shutdown")
+def shutdown_pose_service():
+    """Liberta os executores e os estimadores dos serviços de pose, e os processos de hashing, ao encerrar a aplicação.
+
+    :return: None
+    """
+    pose_estimation_service.shutdown()
+    video_analysis_service.shutdown()
+    password_service.shutdown()
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Expõe as métricas da aplicação no formato de texto do Prometheus.
+
+    Inclui os histogramas de duração de cada etapa da análise de frames, os
+    contadores de frames por resultado e o estado do pool de estimadores.
+
+    :return (Response): As métricas em texto, prontas a recolher pelo Prometheus.
+    """
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/", tags=["Root"])
 def read_root():
     """Endpoint principal (raiz) da API.
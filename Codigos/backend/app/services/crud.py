@@ -9,7 +9,7 @@
 """
 
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from sqlalchemy import desc
 import uuid
 
@@ -24,6 +24,7 @@ from app.schemas import exercicio as exercicio_schema
 from app.schemas import exercise_session as session_schema
 from app.schemas import ia_interaction as ia_interaction_schema
 from app.core.security import get_password_hash
+from app.core.user_cache import user_cache
 
 # --- Funções CRUD de Utilizador ---
 
@@ -36,14 +37,17 @@ def get_user_by_email(db: Session, email: str) -> user_model.User:
     """
     return db.query(user_model.User).filter(user_model.User.email == email).first()
 
-def create_user(db: Session, user: user_schema.UserCreate) -> user_model.User:
+def create_user(db: Session, user: user_schema.UserCreate, hashed_password: Optional[str] = None) -> user_model.User:
     """Cria um novo utilizador na base de dados.
 
     :param (Session) db: A sessão da base de dados.
     :param (user_schema.UserCreate) user: O objeto com os dados do utilizador a ser criado.
+    :param (Optional[str]) hashed_password: O hash da senha, se já tiver sido calculado
+        (ex.: por `password_service`); caso contrário, é calculado aqui.
     :return (user_model.User): O objeto do utilizador recém-criado.
     """
-    hashed_password = get_password_hash(user.password)
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = user_model.User(email=user.email, hashed_password=hashed_password, nome=user.nome)
     db.add(db_user)
     db.commit()
@@ -58,14 +62,37 @@ def update_user(db: Session, db_user: user_model.User, user_in: user_schema.User
     :param (user_schema.UserUpdate) user_in: Os novos dados para o utilizador.
     :return (user_model.User): O objeto do utilizador atualizado.
     """
+    previous_email = db_user.email
     user_data = user_in.dict(exclude_unset=True)
     for key, value in user_data.items():
         setattr(db_user, key, value)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    # O utilizador em cache na autenticação deixou de corresponder à base de dados.
+    user_cache.invalidate(previous_email, db_user.email)
     return db_user
 
+def update_password_hash(db: Session, user_id: uuid.UUID, old_hash: str, new_hash: str) -> bool:
+    """Substitui o hash da senha de um utilizador, se ainda for o mesmo que foi verificado.
+
+    A condição sobre o hash antigo evita que um recálculo em segundo plano
+    sobrescreva uma senha alterada entretanto.
+
+    :param (Session) db: A sessão da base de dados.
+    :param (uuid.UUID) user_id: O ID do utilizador.
+    :param (str) old_hash: O hash verificado no login.
+    :param (str) new_hash: O novo hash da mesma senha.
+    :return (bool): True se o hash foi substituído.
+    """
+    updated = (
+        db.query(user_model.User)
+        .filter(user_model.User.id == user_id, user_model.User.hashed_password == old_hash)
+        .update({user_model.User.hashed_password: new_hash}, synchronize_session=False)
+    )
+    db.commit()
+    return updated > 0
+
 # --- Funções CRUD de Progresso ---
 
 def create_weight_record(db: Session, record: progress_schema.WeightRecordCreate, user_id: uuid.UUID) -> progress_model.WeightRecord:
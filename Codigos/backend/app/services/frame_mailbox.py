@@ -0,0 +1,82 @@
+"""
+@file frame_mailbox.py
+@brief Caixa de frames de uma ligação de streaming, em que o frame mais recente substitui os pendentes.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import asyncio
+from collections import deque
+
+
+class FrameMailbox:
+    """Caixa de frames entre a receção e a análise de uma ligação WebSocket.
+
+    A receção coloca cada mensagem na caixa sem esperar pela análise. Com a
+    coalescência ativa a caixa guarda no máximo um frame: um frame novo substitui
+    o que ainda não foi analisado, que é contado como descartado. Assim, quando o
+    cliente envia frames mais depressa do que o servidor os analisa, o atraso do
+    feedback fica limitado a um frame em vez de crescer sem limite. Sem ela, a
+    caixa guarda no máximo `maxlen` frames e descarta os mais antigos: como a
+    receção não espera pela análise, o socket deixa de travar o cliente e só
+    este limite impede a memória de crescer.
+
+    Attributes:
+        coalesce (bool): Indica se um frame novo substitui o pendente, quando `put` não o decide.
+        maxlen (int): Número máximo de frames pendentes sem coalescência.
+        dropped (int): Número de frames substituídos ou descartados antes de serem analisados.
+    """
+    def __init__(self, coalesce: bool = True, maxlen: int = 4):
+        """Inicializa a caixa vazia.
+
+        :param (bool) coalesce: Ativa a substituição do frame pendente pelo mais recente.
+        :param (int) maxlen: Número máximo de frames pendentes sem coalescência.
+        """
+        self.coalesce = coalesce
+        self.maxlen = max(1, maxlen)
+        self.dropped = 0
+        self._frames = deque()
+        self._arrived = asyncio.Event()
+        self._closed = False
+
+    def put(self, data, coalesce=None):
+        """Coloca um frame na caixa, substituindo o pendente se a coalescência estiver ativa.
+
+        Sem coalescência, com a caixa cheia o frame pendente mais antigo é descartado.
+
+        :param (bytes | str) data: A mensagem recebida do cliente.
+        :param (bool | None) coalesce: Decide a coalescência deste frame (ex.: pelo nível
+            do controlador de carga); None usa o atributo `coalesce`.
+        :return: None
+        """
+        if coalesce is None:
+            coalesce = self.coalesce
+        limit = 1 if coalesce else self.maxlen
+        while len(self._frames) >= limit:
+            self._frames.popleft()
+            self.dropped += 1
+        self._frames.append(data)
+        self._arrived.set()
+
+    def close(self):
+        """Fecha a caixa; `get` devolve None depois de esgotados os frames pendentes.
+
+        :return: None
+        """
+        self._closed = True
+        self._arrived.set()
+
+    async def get(self):
+        """Espera pelo próximo frame a analisar.
+
+        :return (bytes | str | None): O frame pendente mais antigo, ou None se a caixa foi fechada.
+        """
+        while not self._frames:
+            if self._closed:
+                return None
+            self._arrived.clear()
+            await self._arrived.wait()
+        return self._frames.popleft()
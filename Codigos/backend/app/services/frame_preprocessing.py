@@ -0,0 +1,112 @@
+"""
+@file frame_preprocessing.py
+@brief Reduz e recorta os frames antes da estimativa de pose, para manter o custo da inferência constante.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import cv2
+
+from exercises.landmarks import VISIBILITY, X, Z
+
+
+class FramePreprocessor:
+    """Prepara os frames para a estimativa de pose.
+
+    Recorta o frame à região de interesse (ROI) em torno do corpo detetado no frame
+    anterior da sessão e reduz o resultado para que o maior lado não ultrapasse
+    `max_side`. Assim, o custo da conversão de cores e da inferência deixa de
+    depender da resolução da câmara do cliente. As janelas e ROIs são expressas em
+    coordenadas normalizadas (0 a 1) do frame completo, como os marcos do MediaPipe.
+
+    Attributes:
+        max_side (int): Tamanho máximo, em píxeis, do maior lado da imagem enviada ao modelo (0 desativa).
+        roi_enabled (bool): Indica se o recorte à região de interesse está ativo.
+        roi_margin (float): Margem acrescentada a cada lado da caixa do corpo, em fração do seu tamanho.
+        visibility_threshold (float): Visibilidade mínima para um marco contar para a caixa do corpo.
+    """
+    def __init__(self, max_side: int = 640, roi_enabled: bool = True, roi_margin: float = 0.25, visibility_threshold: float = 0.5):
+        """Inicializa o pré-processador.
+
+        :param (int) max_side: Tamanho máximo do maior lado da imagem, em píxeis (0 desativa a redução).
+        :param (bool) roi_enabled: Ativa o recorte à região de interesse.
+        :param (float) roi_margin: Margem em torno da caixa do corpo, em fração do seu tamanho.
+        :param (float) visibility_threshold: Visibilidade mínima de um marco para a caixa do corpo.
+        """
+        self.max_side = max_side
+        self.roi_enabled = roi_enabled
+        self.roi_margin = roi_margin
+        self.visibility_threshold = visibility_threshold
+
+    def prepare(self, frame, roi=None, max_side=None):
+        """Recorta e reduz um frame para a inferência.
+
+        :param (numpy.ndarray) frame: O frame completo no formato BGR.
+        :param (tuple | None) roi: A caixa (x0, y0, x1, y1) do corpo no frame anterior, ou None.
+        :param (int) max_side: Limite do maior lado para este frame; por omissão, `max_side` do pré-processador.
+        :return (tuple): A imagem a enviar ao modelo e a janela (x0, y0, largura, altura) que ela
+            ocupa no frame completo, ou None quando a imagem cobre o frame inteiro.
+        """
+        window = None
+        if self.roi_enabled and roi is not None:
+            height, width = frame.shape[:2]
+            x0, y0, x1, y1 = roi
+            margin_x = (x1 - x0) * self.roi_margin
+            margin_y = (y1 - y0) * self.roi_margin
+            left = max(int((x0 - margin_x) * width), 0)
+            top = max(int((y0 - margin_y) * height), 0)
+            right = min(int((x1 + margin_x) * width) + 1, width)
+            bottom = min(int((y1 + margin_y) * height) + 1, height)
+            if right - left > 1 and bottom - top > 1 and (right - left < width or bottom - top < height):
+                # O recorte é uma vista do array, sem cópia dos píxeis.
+                frame = frame[top:bottom, left:right]
+                window = (left / width, top / height, (right - left) / width, (bottom - top) / height)
+
+        return self.downscale(frame, max_side), window
+
+    def downscale(self, image, max_side=None):
+        """Reduz a imagem para que o maior lado não ultrapasse `max_side`.
+
+        :param (numpy.ndarray) image: A imagem a reduzir.
+        :param (int) max_side: Limite do maior lado; por omissão, `max_side` do pré-processador.
+        :return (numpy.ndarray): A imagem reduzida, ou a original se já for pequena o suficiente.
+        """
+        max_side = max_side or self.max_side
+        height, width = image.shape[:2]
+        largest = max(height, width)
+        if not max_side or largest <= max_side:
+            return image
+        scale = max_side / largest
+        size = (max(int(width * scale), 1), max(int(height * scale), 1))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+    def to_frame_coords(self, points, window):
+        """Converte, no próprio array, os marcos detetados num recorte para as coordenadas do frame completo.
+
+        :param (numpy.ndarray) points: O array (33, 4) de marcos normalizados em relação à imagem enviada ao modelo.
+        :param (tuple | None) window: A janela devolvida por `prepare`.
+        :return (numpy.ndarray): O mesmo array, com os marcos normalizados em relação ao frame completo.
+        """
+        if window is None:
+            return points
+        x0, y0, width, height = window
+        # z usa a mesma escala de x, como no MediaPipe.
+        points[:, X:VISIBILITY] *= (width, height, width)
+        points[:, X:Z] += (x0, y0)
+        return points
+
+    def bounding_box(self, points):
+        """Calcula a caixa que envolve os marcos visíveis, para usar como ROI no frame seguinte.
+
+        :param (numpy.ndarray) points: O array (33, 4) de marcos normalizados em relação ao frame completo.
+        :return (tuple | None): A caixa (x0, y0, x1, y1), ou None se nenhum marco estiver visível.
+        """
+        visible = points[points[:, VISIBILITY] >= self.visibility_threshold]
+        if not len(visible):
+            return None
+        x0, y0 = visible[:, :2].min(axis=0).tolist()
+        x1, y1 = visible[:, :2].max(axis=0).tolist()
+        return (x0, y0, x1, y1)
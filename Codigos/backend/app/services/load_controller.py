@@ -0,0 +1,123 @@
+"""
+@file load_controller.py
+@brief Controla a degradação da qualidade e a rejeição de frames quando o serviço de pose satura.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import threading
+import time
+
+# Níveis de degradação, aplicados de forma cumulativa.
+LEVEL_NORMAL = 0
+LEVEL_LITE_MODEL = 1
+LEVEL_LOW_RESOLUTION = 2
+LEVEL_DROP_STALE = 3
+LEVEL_REJECT = 4
+
+LEVEL_NAMES = {
+    LEVEL_NORMAL: "normal",
+    LEVEL_LITE_MODEL: "lite_model",
+    LEVEL_LOW_RESOLUTION: "low_resolution",
+    LEVEL_DROP_STALE: "drop_stale",
+    LEVEL_REJECT: "reject",
+}
+
+
+class LoadController:
+    """Controlador de carga do pipeline de pose.
+
+    Observa a profundidade da fila e a latência de cada frame e, a cada intervalo
+    de avaliação, calcula a pressão como o maior dos rácios `latência média /
+    latência alvo` e `fila máxima / fila permitida`. Com pressão igual ou superior
+    a 1 o nível de degradação sobe um degrau; abaixo de `recovery_ratio` desce um.
+    A banda entre os dois valores evita que o nível oscile a cada avaliação.
+
+    Os degraus são, por ordem: modelo lite, resolução de entrada reduzida,
+    descarte dos frames obsoletos (fica só o mais recente de cada sessão) e,
+    por fim, rejeição dos frames com 503 e Retry-After.
+
+    Attributes:
+        target_latency (float): Latência por frame, em segundos, a partir da qual o serviço está saturado.
+        max_queue (int): Profundidade da fila a partir da qual o serviço está saturado.
+        interval (float): Intervalo, em segundos, entre avaliações do nível.
+        recovery_ratio (float): Pressão abaixo da qual o nível desce um degrau.
+        enabled (bool): Indica se o controlador pode degradar o serviço.
+    """
+    def __init__(self, target_latency: float = 0.15, max_queue: int = 16, interval: float = 1.0,
+                 recovery_ratio: float = 0.5, enabled: bool = True, clock=time.monotonic):
+        """Inicializa o controlador no nível normal.
+
+        :param (float) target_latency: Latência alvo por frame, em segundos.
+        :param (int) max_queue: Profundidade de fila considerada saturada.
+        :param (float) interval: Intervalo entre avaliações, em segundos.
+        :param (float) recovery_ratio: Pressão abaixo da qual o serviço recupera um degrau.
+        :param (bool) enabled: Ativa o controlador; desativado, o nível fica sempre normal.
+        :param (callable) clock: Relógio monotónico usado nas avaliações.
+        """
+        self.target_latency = target_latency
+        self.max_queue = max(1, max_queue)
+        self.interval = interval
+        self.recovery_ratio = recovery_ratio
+        self.enabled = enabled
+        self._clock = clock
+        self._level = LEVEL_NORMAL
+        self._latency_sum = 0.0
+        self._latency_count = 0
+        self._max_depth = 0
+        self._evaluated_at = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def level(self) -> int:
+        """O nível de degradação atual, reavaliado se o intervalo tiver passado."""
+        if self.enabled and self._clock() - self._evaluated_at >= self.interval:
+            self._evaluate()
+        return self._level
+
+    def observe_latency(self, seconds: float):
+        """Regista a latência de um frame, da chegada ao resultado.
+
+        :param (float) seconds: A latência do frame, em segundos.
+        :return: None
+        """
+        with self._lock:
+            self._latency_sum += seconds
+            self._latency_count += 1
+
+    def observe_queue(self, depth: int):
+        """Regista a profundidade atual da fila de frames à espera de inferência.
+
+        :param (int) depth: O número de frames em espera.
+        :return: None
+        """
+        with self._lock:
+            self._max_depth = max(self._max_depth, depth)
+
+    def stats(self) -> dict:
+        """Resume o estado do controlador para monitorização.
+
+        :return (dict): O nível atual e o seu nome.
+        """
+        level = self.level
+        return {"level": level, "name": LEVEL_NAMES[level]}
+
+    def _evaluate(self):
+        """Fecha o intervalo de observação e ajusta o nível em um degrau, se necessário."""
+        with self._lock:
+            now = self._clock()
+            if now - self._evaluated_at < self.interval:
+                return
+            latency = self._latency_sum / self._latency_count if self._latency_count else 0.0
+            pressure = max(latency / self.target_latency, self._max_depth / self.max_queue)
+            if pressure >= 1.0 and self._level < LEVEL_REJECT:
+                self._level += 1
+            elif pressure < self.recovery_ratio and self._level > LEVEL_NORMAL:
+                self._level -= 1
+            self._latency_sum = 0.0
+            self._latency_count = 0
+            self._max_depth = 0
+            self._evaluated_at = now
@@ -0,0 +1,232 @@
+"""
+@file password_service.py
+@brief Executa o hashing e a verificação de senhas (bcrypt) num pool de processos limitado, com uma API assíncrona.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import security
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import registry as metrics_registry
+from app.services import crud
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Levantada quando o pool de hashing não aceita mais senhas em espera."""
+
+
+# O bcrypt ocupa o CPU durante dezenas a centenas de milissegundos por senha. Em
+# processos separados, um pico de logins não disputa o GIL com a análise de
+# frames, e o número de processos limita os núcleos que lhe são dedicados. Com
+# PASSWORD_HASH_WORKERS = 0 o hashing corre nas threads do event loop.
+_executor = None
+_executor_lock = threading.Lock()
+# Limita as senhas em processamento ou em espera: acima do limite, o pedido é
+# rejeitado de imediato em vez de se acumular numa fila sem limite.
+_slots = threading.BoundedSemaphore(max(settings.PASSWORD_HASH_WORKERS, 1) + settings.PASSWORD_HASH_MAX_PENDING)
+_in_flight = 0
+# Custo do bcrypt dos novos hashes e maior custo aceite sem recálculo, passados
+# aos processos do pool quando são criados.
+_rounds = settings.PASSWORD_BCRYPT_ROUNDS
+_max_rounds = settings.PASSWORD_BCRYPT_ROUNDS
+
+hash_seconds = metrics_registry.histogram(
+    "fitai_password_hash_seconds",
+    "Duração, em segundos, do hashing e da verificação de senhas, incluindo a espera por um processo.",
+    ("operation",),
+)
+_hash_series = hash_seconds.labels("hash")
+_verify_series = hash_seconds.labels("verify")
+rejected_total = metrics_registry.counter(
+    "fitai_password_hash_rejected_total", "Pedidos de hashing rejeitados por o pool estar saturado."
+)
+rehashed_total = metrics_registry.counter(
+    "fitai_password_rehashed_total", "Hashes de senhas recalculados com o custo atual após o login."
+)
+metrics_registry.gauge_callback(
+    "fitai_password_hash_in_flight", "Senhas em processamento ou à espera de um processo.", lambda: _in_flight
+)
+metrics_registry.gauge_callback(
+    "fitai_password_bcrypt_rounds", "Custo do bcrypt dos novos hashes de senhas.", lambda: _rounds
+)
+
+
+def _get_executor():
+    """Obtém o pool de processos, criando-o no primeiro uso.
+
+    Os processos são criados com 'spawn': copiar com 'fork' um processo com
+    threads (executores de pose, grafos do MediaPipe) pode deixar locks presos
+    no processo filho.
+
+    :return (ProcessPoolExecutor | None): O pool, ou None para usar as threads do event loop.
+    """
+    global _executor
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=security.configure_password_hashing,
+                initargs=(_rounds, _max_rounds),
+            )
+        return _executor
+
+
+def _discard_executor(executor):
+    """Descarta um pool cujo processo terminou inesperadamente, para que o próximo pedido crie outro."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+async def _run(series, func, *args):
+    """Executa uma função de `security` no pool, sem bloquear o event loop.
+
+    :param (object) series: A série do histograma onde a duração é registada.
+    :param (callable) func: A função a executar.
+    :raises PasswordHasherBusy: Se o pool estiver saturado.
+    :return (object): O valor retornado pela função.
+    """
+    global _in_flight
+    if not _slots.acquire(blocking=False):
+        rejected_total.inc()
+        raise PasswordHasherBusy("O serviço de autenticação está sobrecarregado.")
+    _in_flight += 1
+    started = time.perf_counter()
+    executor = _get_executor()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args))
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        raise
+    finally:
+        _in_flight -= 1
+        _slots.release()
+        series.observe(time.perf_counter() - started)
+
+
+async def hash_password(password: str) -> str:
+    """Gera o hash de uma senha num processo do pool.
+
+    :param (str) password: A senha em texto plano.
+    :raises PasswordHasherBusy: Se o pool estiver saturado.
+    :return (str): O hash da senha.
+    """
+    return await _run(_hash_series, security.get_password_hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verifica uma senha num processo do pool.
+
+    :param (str) plain_password: A senha em texto plano.
+    :param (str) hashed_password: O hash guardado na base de dados.
+    :raises PasswordHasherBusy: Se o pool estiver saturado.
+    :return (bool): True se a senha corresponder, False caso contrário.
+    """
+    return await _run(_verify_series, security.verify_password, plain_password, hashed_password)
+
+
+def configure(rounds: int, max_rounds=None):
+    """Muda o custo do bcrypt dos novos hashes, neste processo e nos do pool.
+
+    O pool atual é encerrado; o próximo pedido cria processos com o novo custo.
+
+    :param (int) rounds: O custo dos novos hashes.
+    :param (int) max_rounds: O maior custo aceite sem recálculo; por omissão, `rounds`.
+    :return: None
+    """
+    global _rounds, _max_rounds
+    _rounds = rounds
+    _max_rounds = max_rounds if max_rounds is not None else rounds
+    security.configure_password_hashing(_rounds, _max_rounds)
+    shutdown()
+
+
+def calibrate() -> int:
+    """Calibra o custo do bcrypt para PASSWORD_HASH_TARGET_MS, se estiver definido.
+
+    Chamada no arranque da aplicação. Cada worker calibra o seu custo; para que
+    uma medição no limite entre dois custos não faça os workers recalcularem os
+    hashes uns dos outros a cada login, o custo calibrado aceita sem recálculo
+    os hashes com uma ronda a mais. Para um custo fixo em todos os servidores,
+    defina PASSWORD_BCRYPT_ROUNDS com o valor registado aqui.
+
+    :return (int): O custo usado nos novos hashes.
+    """
+    if settings.PASSWORD_HASH_TARGET_MS <= 0:
+        return _rounds
+    rounds = security.calibrate_bcrypt_rounds(
+        settings.PASSWORD_HASH_TARGET_MS / 1000.0, settings.PASSWORD_BCRYPT_MIN_ROUNDS
+    )
+    configure(rounds, min(rounds + 1, security.BCRYPT_MAX_ROUNDS))
+    print(f"Custo do bcrypt calibrado para {settings.PASSWORD_HASH_TARGET_MS:g} ms: {rounds} rondas.")
+    return rounds
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Verifica se um hash deve ser recalculado com o custo atual (não executa o bcrypt).
+
+    :param (str) hashed_password: O hash guardado na base de dados.
+    :return (bool): True se o custo do hash estiver fora do configurado.
+    """
+    return security.password_needs_rehash(hashed_password)
+
+
+async def rehash_password(user_id: uuid.UUID, old_hash: str, password: str):
+    """Recalcula o hash de uma senha com o custo atual e guarda-o na base de dados.
+
+    Corre como tarefa em segundo plano depois de um login bem-sucedido, quando a
+    senha em texto plano está disponível, por isso o login não espera pelo novo
+    hash. Com o pool saturado o recálculo é adiado para um próximo login.
+
+    :param (uuid.UUID) user_id: O ID do utilizador.
+    :param (str) old_hash: O hash verificado no login.
+    :param (str) password: A senha em texto plano, já verificada.
+    :return: None
+    """
+    try:
+        new_hash = await hash_password(password)
+    except PasswordHasherBusy:
+        return
+
+    def save():
+        db = SessionLocal()
+        try:
+            return crud.update_password_hash(db, user_id, old_hash, new_hash)
+        finally:
+            db.close()
+
+    if await run_in_threadpool(save):
+        rehashed_total.inc()
+
+
+def shutdown():
+    """Encerra os processos do pool.
+
+    :return: None
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,103 @@
+"""
+@file pose_cache.py
+@brief Cache LRU com expiração dos marcos de pose, indexada pelo hash do conteúdo da imagem.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import hashlib
+import threading
+import time
+
+from app.core.lru_cache import LRUCache
+
+# Distingue uma entrada ausente de uma entrada cujo valor é None.
+_MISSING = object()
+
+
+class PoseResultCache:
+    """Cache dos marcos detetados nas imagens analisadas recentemente.
+
+    Os clientes em redes móveis instáveis repetem pedidos, e com a câmara parada
+    enviam imagens idênticas; com a cache, estas imagens saltam a decodificação
+    e a inferência. A chave é o hash BLAKE2b dos bytes da imagem e o perfil do
+    modelo. As entradas ficam num `LRUCache`, pelo que uma imagem só é reaproveitada
+    durante `ttl_seconds`.
+
+    Os valores guardados não são copiados na leitura: quem os obtém não os deve
+    alterar.
+
+    Attributes:
+        max_entries (int): Número máximo de imagens em cache; 0 desativa a cache.
+        ttl_seconds (float): Tempo, em segundos, durante o qual uma entrada é válida.
+        hits (int): Número de consultas encontradas na cache.
+        misses (int): Número de consultas não encontradas na cache.
+    """
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 2.0, clock=time.monotonic):
+        """Inicializa a cache vazia.
+
+        :param (int) max_entries: Número máximo de entradas; 0 desativa a cache.
+        :param (float) ttl_seconds: Validade de cada entrada, em segundos.
+        :param (callable) clock: Relógio monotónico usado na expiração.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = LRUCache(max_entries, ttl_seconds, clock)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Indica se a cache guarda entradas."""
+        return self.max_entries > 0
+
+    @staticmethod
+    def key(image_bytes: bytes, profile=None) -> tuple:
+        """Calcula a chave de uma imagem.
+
+        :param (bytes) image_bytes: O conteúdo binário da imagem.
+        :param (str) profile: O perfil do modelo de pose usado na inferência.
+        :return (tuple): O hash de 128 bits da imagem e o perfil.
+        """
+        return hashlib.blake2b(image_bytes, digest_size=16).digest(), profile
+
+    def get(self, key):
+        """Procura uma entrada válida na cache.
+
+        :param (tuple) key: A chave calculada com `key`.
+        :return (tuple): (True, valor) se a entrada existir e não tiver expirado, (False, None) caso contrário.
+        """
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, value
+
+    def put(self, key, value):
+        """Guarda o resultado de uma imagem, descartando as entradas antigas ou em excesso.
+
+        :param (tuple) key: A chave calculada com `key`.
+        :param (object) value: O valor a guardar (ex.: os marcos e a região de interesse).
+        :return: None
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries.put(key, value)
+
+    def stats(self) -> dict:
+        """Resume o estado da cache para monitorização.
+
+        :return (dict): O número de entradas, de acertos e de falhas.
+        """
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        """Retorna o número de entradas em cache."""
+        return len(self._entries)
@@ -8,70 +8,719 @@
 @author Wesley dos Santos Gatinho
 """
 
+import asyncio
+import base64
+import functools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
 import numpy as np
-import base64
 
-from exercises.estimation import PoseEstimator
-from exercises.squat import Squat
-from exercises.push_up import PushUp
-from exercises.hummer_curl import HammerCurl
+from app.core.config import settings
+from app.core.metrics import registry as metrics_registry
+from app.services.frame_preprocessing import FramePreprocessor
+from app.services.load_controller import (
+    LEVEL_DROP_STALE, LEVEL_LITE_MODEL, LEVEL_LOW_RESOLUTION, LEVEL_REJECT, LoadController
+)
+from app.services.pose_cache import PoseResultCache
+from app.services.pose_scheduler import PoseBatchScheduler
+from app.services.tracker_registry import AnalysisSession, TrackerRegistry
+from exercises.adaptive_sampling import AdaptiveSampler
+from exercises.definitions import EXERCISES
+from exercises.engine import ExerciseTracker
+from exercises.estimation import PoseEstimator, PoseEstimatorPool, PoseEstimatorPoolFull, limit_profile, static_profile
+from exercises.landmarks import empty_landmarks, landmarks_from_list, landmarks_to_array
+from exercises.smoothing import create_smoother
 
-# Instância global do estimador de pose, para não ser recriado a cada chamada.
-pose_estimator = PoseEstimator()
-# Dicionário que mapeia os tipos de exercício para suas classes de rastreamento.
-exercise_trackers = {"squat": Squat(), "push_up": PushUp(), "hammer_curl": HammerCurl()}
+# Etapas da análise de um frame medidas no histograma de duração.
+PIPELINE_STAGES = ("decode", "preprocess", "color_convert", "inference", "tracking", "serialization")
+# Métricas do pipeline de pose, expostas em /metrics. As séries são obtidas uma
+# única vez, para que o caminho crítico se limite a um `observe`/`inc`.
+stage_seconds = metrics_registry.histogram(
+    "fitai_pose_stage_seconds", "Duração de cada etapa da análise de um frame, em segundos.", ("stage",)
+)
+frames_total = metrics_registry.counter(
+    "fitai_pose_frames_total",
+    "Frames recebidos para análise, por resultado (tracked, no_body, dropped, replayed, error).",
+    ("outcome",),
+)
+_stage_series = {stage: stage_seconds.labels(stage) for stage in PIPELINE_STAGES}
+_frames_tracked = frames_total.labels("tracked")
+_frames_no_body = frames_total.labels("no_body")
+_frames_dropped = frames_total.labels("dropped")
+_frames_replayed = frames_total.labels("replayed")
+frames_failed = frames_total.labels("error")
 
-def analyze_exercise_frame(exercise_type: str, image_b64: str):
-    """Analisa um único frame de um exercício recebido como uma string base64.
+def observe_stage(stage: str, seconds: float):
+    """Regista a duração de uma etapa do pipeline no histograma de /metrics.
 
-    Esta função decodifica a imagem, executa a estimativa de pose para encontrar
-    os marcos corporais e, em seguida, passa esses marcos para o rastreador de
-    exercício específico para análise de movimento, contagem e feedback.
+    :param (str) stage: A etapa, uma de `PIPELINE_STAGES`.
+    :param (float) seconds: A duração, em segundos.
+    :return: None
+    """
+    _stage_series[stage].observe(seconds)
 
-    :param (str) exercise_type: O tipo de exercício a ser analisado ('squat', 'push_up', 'hammer_curl').
-    :param (str) image_b64: A imagem do frame codificada em formato base64.
-    :raises ValueError: Se o tipo de exercício não for suportado ou se a imagem for inválida.
-    :return (dict): Um dicionário contendo os dados da análise ou uma mensagem de erro.
+# Cria estimadores de pose de um perfil com as confianças mínimas configuradas,
+# que registam a duração da conversão de cores e da inferência.
+create_pose_estimator = functools.partial(
+    PoseEstimator,
+    min_detection_confidence=settings.POSE_MIN_DETECTION_CONFIDENCE,
+    min_tracking_confidence=settings.POSE_MIN_TRACKING_CONFIDENCE,
+    timer=observe_stage,
+)
+# Pool global de estimadores de pose: cada estimador tem o seu próprio grafo do
+# MediaPipe, o que permite processar vários frames em paralelo com segurança.
+pose_estimator_pool = PoseEstimatorPool(
+    size=settings.POSE_POOL_SIZE,
+    max_queue=settings.POSE_POOL_MAX_QUEUE,
+    acquire_timeout=settings.POSE_POOL_ACQUIRE_TIMEOUT,
+    factory=create_pose_estimator,
+    default_profile=static_profile(settings.POSE_MODEL_PROFILE),
+)
+# Escalonador que agrupa em micro-lotes os frames de sessões diferentes antes de
+# os enviar ao pool; com POSE_BATCH_WINDOW_MS=0 os frames vão diretamente ao pool.
+pose_scheduler = PoseBatchScheduler(
+    pose_estimator_pool,
+    window_ms=settings.POSE_BATCH_WINDOW_MS,
+    max_batch=settings.POSE_BATCH_MAX_SIZE,
+)
+# Executor dedicado ao pipeline de pose (decodificação, MediaPipe e rastreamento),
+# separado do threadpool padrão do FastAPI usado pelos endpoints da base de dados.
+# Tem uma thread por estimador mais uma por cada lugar da fila de espera do pool.
+_pose_executor_workers = settings.POSE_POOL_SIZE + settings.POSE_POOL_MAX_QUEUE
+pose_executor = ThreadPoolExecutor(max_workers=_pose_executor_workers, thread_name_prefix="pose")
+# Limita os trabalhos submetidos ao executor, cuja fila interna não tem limite.
+_pose_executor_slots = threading.BoundedSemaphore(_pose_executor_workers)
+# Cada ligação WebSocket mantém um grafo do MediaPipe próprio, fora do pool; o
+# número de ligações em análise é limitado para que a memória não cresça com os
+# clientes ligados.
+_stream_slots = threading.BoundedSemaphore(settings.POSE_MAX_STREAMS)
+_active_streams = 0
+_active_streams_lock = threading.Lock()
+# Redução e recorte dos frames antes da inferência, para que o custo não dependa
+# da resolução da câmara do cliente.
+frame_preprocessor = FramePreprocessor(
+    max_side=settings.POSE_MAX_INPUT_SIDE,
+    roi_enabled=settings.POSE_ROI_ENABLED,
+    roi_margin=settings.POSE_ROI_MARGIN,
+)
+# Array de marcos pré-alocado por thread do pipeline: a saída do MediaPipe é
+# convertida uma única vez para float32 e reutiliza sempre o mesmo buffer.
+_landmark_buffers = threading.local()
+# Controlador de carga: com o serviço saturado, troca para o modelo lite, reduz a
+# resolução, descarta os frames obsoletos e, por fim, rejeita frames com 503.
+load_controller = LoadController(
+    target_latency=settings.POSE_TARGET_LATENCY_MS / 1000.0,
+    max_queue=settings.POSE_POOL_MAX_QUEUE,
+    interval=settings.POSE_LOAD_INTERVAL_SECONDS,
+    enabled=settings.POSE_LOAD_SHEDDING,
+)
+# Cache dos marcos das imagens recentes, pelo hash do conteúdo: as repetições de
+# pedidos e os frames idênticos de uma câmara parada saltam a inferência.
+pose_result_cache = PoseResultCache(
+    max_entries=settings.POSE_CACHE_SIZE,
+    ttl_seconds=settings.POSE_CACHE_TTL_SECONDS,
+)
+# Marca um 'seq' cuja análise falhou: uma repetição volta a analisá-lo.
+_SEQUENCE_FAILED = object()
+
+# Estado do serviço lido apenas quando /metrics é consultado.
+metrics_registry.gauge_callback(
+    "fitai_pose_queue_depth", "Frames à espera de um estimador de pose (pool e micro-lotes).",
+    lambda: pose_estimator_pool.queue_depth + pose_scheduler.queue_depth,
+)
+metrics_registry.gauge_callback(
+    "fitai_pose_estimators_in_use", "Estimadores de pose do pool em uso.", lambda: pose_estimator_pool.in_use
+)
+metrics_registry.gauge_callback(
+    "fitai_pose_streams_active", "Ligações WebSocket com um estimador de pose próprio.", lambda: _active_streams
+)
+metrics_registry.gauge_callback(
+    "fitai_pose_load_level", "Nível de degradação do controlador de carga (0 = normal).", lambda: load_controller.level
+)
+metrics_registry.counter_callback(
+    "fitai_pose_cache_hits_total", "Imagens cujos marcos foram obtidos da cache.", lambda: pose_result_cache.hits
+)
+metrics_registry.counter_callback(
+    "fitai_pose_cache_misses_total", "Imagens analisadas sem resultado na cache.", lambda: pose_result_cache.misses
+)
+def create_tracker(exercise) -> ExerciseTracker:
+    """Cria o rastreador de um exercício com a suavização e a histerese configuradas.
+
+    Cada rastreador tem o seu próprio filtro, pelo que o estado da suavização é
+    isolado por sessão e por exercício.
+
+    :param (CompiledExercise) exercise: A definição compilada do exercício.
+    :return (ExerciseTracker): O rastreador do exercício.
     """
-    if exercise_type not in exercise_trackers:
-        raise ValueError("Exercício não suportado")
+    smoother = create_smoother(
+        settings.POSE_SMOOTHING,
+        min_cutoff=settings.POSE_SMOOTHING_MIN_CUTOFF,
+        beta=settings.POSE_SMOOTHING_BETA,
+        d_cutoff=settings.POSE_SMOOTHING_D_CUTOFF,
+        alpha=settings.POSE_SMOOTHING_EMA_ALPHA,
+    )
+    return ExerciseTracker(exercise, smoother=smoother, hysteresis=settings.POSE_SMOOTHING_HYSTERESIS)
 
+# Dicionário que mapeia os tipos de exercício para as fábricas dos seus rastreadores,
+# gerado a partir das definições declarativas em `exercises/definitions.py`.
+exercise_trackers = {name: functools.partial(create_tracker, exercise) for name, exercise in EXERCISES.items()}
+# Registo das sessões de análise: cada utilizador/sessão tem os seus próprios rastreadores.
+tracker_registry = TrackerRegistry(
+    exercise_trackers,
+    ttl_seconds=settings.POSE_SESSION_TTL_SECONDS,
+    max_sessions=settings.POSE_MAX_SESSIONS,
+)
+
+async def run_in_pose_executor(func, *args, **kwargs):
+    """Executa uma função do pipeline de pose no executor dedicado, sem bloquear o event loop.
+
+    Quando todas as threads do executor estão ocupadas, ou o controlador de carga
+    está no último degrau, o trabalho é rejeitado de imediato, em vez de se
+    acumular numa fila sem limite. A profundidade da fila e a latência de cada
+    trabalho alimentam o controlador de carga.
+
+    :param (callable) func: A função a executar (ex.: `analyze_exercise_frame`).
+    :raises PoseEstimatorPoolFull: Se o executor estiver saturado.
+    :return (object): O valor retornado pela função.
+    """
+    if load_controller.level >= LEVEL_REJECT:
+        raise PoseEstimatorPoolFull("O serviço de análise de pose está sobrecarregado.")
+    if not _pose_executor_slots.acquire(blocking=False):
+        load_controller.observe_queue(load_controller.max_queue)
+        raise PoseEstimatorPoolFull("O serviço de análise de pose está sobrecarregado.")
+    load_controller.observe_queue(pose_estimator_pool.queue_depth + pose_scheduler.queue_depth)
+    started = time.monotonic()
     try:
-        # Decodifica a imagem de base64 para um formato que o OpenCV entende.
-        img_bytes = base64.b64decode(image_b64)
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if frame is None: raise ValueError("Não foi possível decodificar a imagem.")
-    except Exception:
-        raise ValueError("String base64 da imagem inválida ou corrompida.")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pose_executor, functools.partial(func, *args, **kwargs))
+    finally:
+        _pose_executor_slots.release()
+        load_controller.observe_latency(time.monotonic() - started)
+
+def acquire_stream_slot() -> bool:
+    """Reserva um lugar para uma ligação WebSocket com um estimador de pose próprio.
+
+    :return (bool): True se o lugar foi reservado, False se já existem POSE_MAX_STREAMS ligações.
+    """
+    global _active_streams
+    if not _stream_slots.acquire(blocking=False):
+        return False
+    with _active_streams_lock:
+        _active_streams += 1
+    return True
+
+def release_stream_slot():
+    """Liberta o lugar reservado com `acquire_stream_slot` quando a ligação termina.
+
+    :return: None
+    """
+    global _active_streams
+    with _active_streams_lock:
+        _active_streams -= 1
+    _stream_slots.release()
+
+def shutdown():
+    """Encerra o executor dedicado e o escalonador e liberta os grafos do MediaPipe do pool.
+
+    :return: None
+    """
+    pose_executor.shutdown(wait=False)
+    pose_scheduler.close()
+    pose_estimator_pool.close()
+
+def select_profile(requested=None, dedicated: bool = False) -> str:
+    """Escolhe o perfil do modelo de pose de um pedido, segundo a política do servidor.
+
+    Sem pedido explícito usa `POSE_MODEL_PROFILE`; os perfis mais pesados do que
+    `POSE_MAX_MODEL_COMPLEXITY` são trocados pelo equivalente mais leve permitido.
+    Com o serviço saturado, o controlador de carga impõe o modelo lite. Os frames
+    analisados no pool partilhado usam sempre a variante "_static" do perfil; o
+    modo de rastreamento só é usado pelos estimadores dedicados a uma única
+    sequência de frames (uma ligação WebSocket ou um vídeo).
+
+    :param (str) requested: O perfil pedido pelo cliente, ou None.
+    :param (bool) dedicated: Indica se o perfil é de um estimador dedicado a uma sequência.
+    :raises ValueError: Se o perfil pedido não existir.
+    :return (str): O perfil a usar na inferência.
+    """
+    max_complexity = settings.POSE_MAX_MODEL_COMPLEXITY
+    if load_controller.level >= LEVEL_LITE_MODEL:
+        max_complexity = 0
+    profile = limit_profile(requested or settings.POSE_MODEL_PROFILE, max_complexity)
+    return profile if dedicated else static_profile(profile)
+
+def coalesce_frames() -> bool:
+    """Indica se os frames pendentes de uma sessão devem ser substituídos pelo mais recente.
+
+    :return (bool): True com `POSE_COALESCE_FRAMES` ou no degrau de descarte do controlador de carga.
+    """
+    return settings.POSE_COALESCE_FRAMES or load_controller.level >= LEVEL_DROP_STALE
+
+def _admit_frame(session: AnalysisSession) -> bool:
+    """Regista a chegada de um frame e decide se ele deve ser analisado.
+
+    Com `POSE_COALESCE_FRAMES` (ou no degrau de descarte do controlador de carga),
+    cada sessão tem no máximo um frame pendente: um frame espera que a sessão
+    termine o frame em curso e é descartado se entretanto chegar outro mais
+    recente da mesma sessão. Só o frame mais recente é analisado, pela ordem de
+    chegada, e a latência fica limitada mesmo com o cliente a enviar frames
+    mais depressa do que o servidor os analisa. Um frame admitido deve ser
+    concluído com `_finish_frame`.
+
+    :param (AnalysisSession) session: A sessão de análise do frame.
+    :return (bool): True se o frame deve ser analisado, False se foi descartado.
+    """
+    with session.frame_cond:
+        session.latest_frame += 1
+        sequence = session.latest_frame
+        session.frame_cond.notify_all()
+        if coalesce_frames():
+            session.frame_cond.wait_for(
+                lambda: session.frames_in_flight == 0 or session.latest_frame != sequence,
+                timeout=settings.POSE_POOL_ACQUIRE_TIMEOUT,
+            )
+            if session.latest_frame != sequence:
+                session.frames_dropped += 1
+                return False
+        session.frames_in_flight += 1
+        return True
+
+def _finish_frame(session: AnalysisSession):
+    """Marca a conclusão de um frame admitido por `_admit_frame`.
+
+    :param (AnalysisSession) session: A sessão de análise do frame.
+    :return: None
+    """
+    with session.frame_cond:
+        session.frames_in_flight -= 1
+        session.frame_cond.notify_all()
+
+def _dropped_result(session: AnalysisSession) -> dict:
+    """Constrói a resposta de um frame descartado por ter chegado outro mais recente.
+
+    :param (AnalysisSession) session: A sessão de análise do frame.
+    :return (dict): O aviso, com o total de frames descartados da sessão.
+    """
+    _frames_dropped.inc()
+    return {
+        "error": "Frame descartado: chegou um frame mais recente da sessão.",
+        "dropped": True,
+        "dropped_frames": session.frames_dropped,
+    }
+
+def _claim_sequence(session: AnalysisSession, seq: int):
+    """Reserva o número de sequência de um frame ou obtém a resposta de uma repetição.
+
+    Um 'seq' novo é reservado e o frame deve ser analisado. A repetição de um
+    'seq' recente devolve o resultado guardado, esperando que a primeira cópia
+    termine se ainda estiver em análise, sem avançar o rastreador outra vez. Um
+    'seq' antigo que nunca foi analisado é descartado; um 'seq' muito abaixo do
+    último (fora da janela) indica que o cliente recomeçou a numeração.
+
+    :param (AnalysisSession) session: A sessão de análise do frame.
+    :param (int) seq: O número de sequência enviado pelo cliente.
+    :return (dict | None): None se o frame deve ser analisado; caso contrário, a resposta a devolver.
+    """
+    window = settings.POSE_REPLAY_WINDOW
+    with session.frame_cond:
+        results = session.seq_results
+        session.frame_cond.wait_for(lambda: results.get(seq, _SEQUENCE_FAILED) is not None)
+        result = results.get(seq)
+        if result is not None and result is not _SEQUENCE_FAILED:
+            _frames_replayed.inc()
+            return dict(result, duplicate=True)
+        if result is None:
+            if session.last_seq - seq > window:
+                results.clear()
+            elif seq <= session.last_seq:
+                session.frames_dropped += 1
+                return _dropped_result(session)
+            session.last_seq = seq
+        results[seq] = None
+        while len(results) > window:
+            results.popitem(last=False)
+        return None
+
+def _complete_sequence(session: AnalysisSession, seq: int, result):
+    """Guarda o resultado de um 'seq' reservado e acorda as repetições à espera dele.
+
+    :param (AnalysisSession) session: A sessão de análise do frame.
+    :param (int) seq: O número de sequência do frame.
+    :param (dict | None) result: O resultado da análise, ou None se a análise falhou.
+    :return: None
+    """
+    with session.frame_cond:
+        if seq in session.seq_results:
+            session.seq_results[seq] = _SEQUENCE_FAILED if result is None else dict(result)
+        session.frame_cond.notify_all()
+
+def _analyze_sequenced(session: AnalysisSession, seq, analyze):
+    """Analisa um frame uma única vez por número de sequência.
+
+    Sem 'seq', o frame é sempre analisado. Com 'seq', as repetições do mesmo
+    frame (ex.: o cliente repete o pedido numa rede instável) recebem o resultado
+    da primeira análise e o rastreador avança exatamente uma vez.
+
+    :param (AnalysisSession) session: A sessão de análise do frame.
+    :param (int | None) seq: O número de sequência enviado pelo cliente.
+    :param (callable) analyze: Função sem argumentos que analisa o frame.
+    :return (dict): O resultado da análise; nas repetições, o resultado guardado com 'duplicate'.
+    """
+    if seq is None:
+        return analyze()
+    replay = _claim_sequence(session, seq)
+    if replay is not None:
+        return replay
+    result = None
+    try:
+        result = analyze()
+    finally:
+        _complete_sequence(session, seq, result)
+    return result
+
+def _analyze_admitted_frame(exercise_type: str, read, session: AnalysisSession, profile=None):
+    """Analisa a imagem de um frame, a menos que seja descartado por obsoleto.
+
+    :param (str) exercise_type: O tipo de exercício a ser analisado.
+    :param (callable) read: Função sem argumentos que devolve os bytes da imagem.
+    :param (AnalysisSession) session: A sessão de análise do frame.
+    :param (str) profile: O perfil do modelo de pose.
+    :raises ValueError: Se a imagem for inválida.
+    :return (dict): O resultado da análise ou o aviso de que o frame foi descartado, ambos com
+        o total de frames descartados da sessão em 'dropped_frames'.
+    """
+    if not _admit_frame(session):
+        return _dropped_result(session)
+    try:
+        result = analyze_image(exercise_type, read(), session, profile=profile)
+    finally:
+        _finish_frame(session)
+    result["dropped_frames"] = session.frames_dropped
+    return result
+
+def decode_frame(image_bytes) -> np.ndarray:
+    """Decodifica os bytes de uma imagem (JPEG, PNG, ...) para um frame BGR do OpenCV.
+
+    :param (bytes) image_bytes: O conteúdo binário da imagem.
+    :raises ValueError: Se os bytes não corresponderem a uma imagem válida.
+    :return (numpy.ndarray): O frame decodificado no formato BGR.
+    """
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR) if nparr.size else None
+    if frame is None:
+        raise ValueError("Não foi possível decodificar a imagem.")
+    return frame
+
+def analyze_image(exercise_type: str, image_bytes: bytes, session: AnalysisSession, estimator=None, profile=None):
+    """Executa a decodificação, a estimativa de pose e o rastreamento de uma imagem.
+
+    Se uma imagem com o mesmo conteúdo foi analisada há menos de
+    `POSE_CACHE_TTL_SECONDS`, os seus marcos são reutilizados sem decodificação
+    nem inferência. O rastreador avança na mesma, como em qualquer frame novo:
+    as repetições do mesmo pedido são tratadas à parte, pelo 'seq'.
+
+    :param (str) exercise_type: O tipo de exercício a ser analisado ('squat', 'push_up', 'hammer_curl').
+    :param (bytes) image_bytes: O conteúdo binário da imagem (JPEG, PNG, ...).
+    :param (AnalysisSession) session: A sessão de análise cujos rastreadores serão atualizados.
+    :param (PoseEstimator) estimator: Estimador dedicado (ex.: de uma ligação WebSocket); por omissão usa o escalonador global.
+    :param (str) profile: O perfil do modelo usado no escalonador global (ignorado com um estimador dedicado).
+    :raises ValueError: Se o tipo de exercício não for suportado ou a imagem for inválida.
+    :raises PoseEstimatorPoolFull: Se o pool de estimadores estiver sobrecarregado.
+    :return (dict): Um dicionário contendo os dados da análise ou uma mensagem de erro.
+    """
+    observed_at = time.monotonic()
+    key = None
+    if pose_result_cache.enabled:
+        key = pose_result_cache.key(image_bytes, profile if estimator is None else estimator.profile)
+        hit, cached = pose_result_cache.get(key)
+        if hit:
+            landmarks, session.roi = cached
+            return _track_estimated(exercise_type, landmarks, None, session, observed_at)
 
+    started = time.perf_counter()
+    frame = decode_frame(image_bytes)
+    observe_stage("decode", time.perf_counter() - started)
     # Usa o estimador de pose para encontrar os marcos corporais no frame.
-    results = pose_estimator.estimate_pose(frame)
-    if not results.pose_landmarks:
+    landmarks = estimate_landmarks(frame, session, estimator, profile)
+    if key is not None:
+        # O array da thread é reutilizado no frame seguinte: a cache guarda uma cópia.
+        pose_result_cache.put(key, (None if landmarks is None else landmarks.copy(), session.roi))
+    return _track_estimated(exercise_type, landmarks, frame.shape, session, observed_at)
+
+def _track_estimated(exercise_type: str, landmarks, frame_shape, session: AnalysisSession, observed_at: float):
+    """Atualiza o rastreador com os marcos estimados numa imagem, ou reporta que não há corpo.
+
+    :param (str) exercise_type: O tipo de exercício a ser analisado.
+    :param (numpy.ndarray | None) landmarks: O array (33, 4) de marcos, ou None se nenhum corpo foi detetado.
+    :param (tuple) frame_shape: A forma do frame, quando conhecida.
+    :param (AnalysisSession) session: A sessão de análise.
+    :param (float) observed_at: O instante em que o frame começou a ser analisado.
+    :return (dict): Um dicionário contendo os dados da análise ou uma mensagem de erro.
+    """
+    if landmarks is None:
+        _frames_no_body.inc()
+        # O amostrador é alterado sob o lock da sessão por `analyze_without_inference` e `track_landmarks`.
+        with session.lock:
+            sampler = session.samplers.get(exercise_type)
+            if sampler is not None:
+                sampler.reset()
         return {"error": "Nenhum corpo detetado na imagem."}
 
-    # Seleciona o rastreador correto com base no tipo de exercício.
-    tracker = exercise_trackers[exercise_type]
-    
-    # --- LÓGICA GENERALIZADA ---
-    # Chama o método de rastreamento apropriado. Todos os trackers devem
-    # retornar uma tupla com 6 valores para manter a consistência.
-    if exercise_type == "squat":
-        counter, angle, stage, feedback, landmarks, progress = tracker.track_squat(results.pose_landmarks.landmark, frame.shape)
-    elif exercise_type == "push_up":
-        counter, angle, stage, feedback, landmarks, progress = tracker.track_push_up(results.pose_landmarks.landmark, frame.shape)
-    elif exercise_type == "hammer_curl":
-        counter, angle, stage, feedback, landmarks, progress = tracker.track_hammer_curl(results.pose_landmarks.landmark, frame.shape)
+    return track_landmarks(exercise_type, landmarks, frame_shape, session, observed_at=observed_at)
+
+def analyze_without_inference(exercise_type: str, session: AnalysisSession):
+    """Analisa o frame com marcos extrapolados, quando a amostragem adaptativa o permite.
+
+    Com `POSE_ADAPTIVE_SAMPLING` ativo, os frames que chegam enquanto o ângulo da
+    articulação muda devagar e longe dos limiares do rastreador dispensam a
+    decodificação e a inferência: os marcos são extrapolados das últimas inferências.
+
+    :param (str) exercise_type: O tipo de exercício a ser analisado.
+    :param (AnalysisSession) session: A sessão de análise.
+    :return (dict | None): O resultado da análise, ou None se o frame precisar de inferência.
+    """
+    if not settings.POSE_ADAPTIVE_SAMPLING:
+        return None
+
+    now = time.monotonic()
+    with session.lock:
+        tracker = session.get_tracker(exercise_type)
+        sampler = _get_sampler(session, exercise_type)
+        if sampler.should_infer(now, tracker.angle_min, tracker.angle_max):
+            return None
+        landmarks = sampler.extrapolate(now)
+
+    result = track_landmarks(exercise_type, landmarks, None, session)
+    result["interpolated"] = True
+    return result
+
+def _get_sampler(session: AnalysisSession, exercise_type: str) -> AdaptiveSampler:
+    """Obtém o amostrador adaptativo de um exercício da sessão, criando-o no primeiro uso.
+
+    :param (AnalysisSession) session: A sessão de análise.
+    :param (str) exercise_type: O tipo de exercício.
+    :return (AdaptiveSampler): O amostrador do exercício nesta sessão.
+    """
+    sampler = session.samplers.get(exercise_type)
+    if sampler is None:
+        sampler = session.samplers[exercise_type] = AdaptiveSampler(
+            velocity_threshold=settings.POSE_ADAPTIVE_VELOCITY_THRESHOLD,
+            threshold_margin=settings.POSE_ADAPTIVE_THRESHOLD_MARGIN,
+            max_skip=settings.POSE_ADAPTIVE_MAX_SKIP,
+        )
+    return sampler
+
+def estimate_landmarks(frame: np.ndarray, session: AnalysisSession, estimator=None, profile=None):
+    """Estima os marcos da pose num frame, recortado à região do corpo e reduzido.
+
+    Usa a caixa do corpo detetada no frame anterior da sessão como região de
+    interesse. Se o corpo não for encontrado no recorte (rastreamento perdido),
+    repete a inferência no frame completo antes de desistir.
+
+    Os marcos são escritos no array pré-alocado da thread atual, que é
+    reutilizado na chamada seguinte da mesma thread: quem precisar de os guardar
+    para além do frame (ex.: a amostragem adaptativa) tem de os copiar.
+
+    :param (numpy.ndarray) frame: O frame completo no formato BGR.
+    :param (AnalysisSession) session: A sessão de análise, que guarda a região de interesse.
+    :param (PoseEstimator) estimator: Estimador dedicado; por omissão usa o escalonador global.
+    :param (str) profile: O perfil do modelo usado no escalonador global.
+    :raises PoseEstimatorPoolFull: Se o pool de estimadores estiver sobrecarregado.
+    :return (numpy.ndarray | None): O array float32 (33, 4) de marcos em coordenadas do frame
+        completo, ou None se nenhum corpo for detetado.
+    """
+    if estimator is None:
+        estimate_pose = functools.partial(pose_scheduler.estimate_pose, profile=profile)
     else:
-        # Este caso é redundante devido à verificação inicial, mas é uma boa prática.
-        return {"error": "Lógica de análise não implementada."}
-    
+        estimate_pose = estimator.estimate_pose
+    # Com o serviço saturado, o controlador de carga reduz a resolução de entrada.
+    max_side = None
+    if load_controller.level >= LEVEL_LOW_RESOLUTION:
+        max_side = settings.POSE_DEGRADED_INPUT_SIDE
+    started = time.perf_counter()
+    image, window = frame_preprocessor.prepare(frame, session.roi, max_side)
+    observe_stage("preprocess", time.perf_counter() - started)
+    results = estimate_pose(image)
+    if not results.pose_landmarks and window is not None:
+        image, window = frame_preprocessor.prepare(frame, None, max_side)
+        results = estimate_pose(image)
+    if not results.pose_landmarks:
+        session.roi = None
+        return None
+
+    buffer = getattr(_landmark_buffers, "points", None)
+    if buffer is None:
+        buffer = _landmark_buffers.points = empty_landmarks()
+    points = landmarks_to_array(results.pose_landmarks.landmark, out=buffer)
+    frame_preprocessor.to_frame_coords(points, window)
+    session.roi = frame_preprocessor.bounding_box(points)
+    return points
+
+def track_landmarks(exercise_type: str, landmarks, frame_shape, session: AnalysisSession, observed_at=None, timestamp=None):
+    """Atualiza o rastreador da sessão com os marcos de pose de um frame.
+
+    :param (str) exercise_type: O tipo de exercício a ser analisado ('squat', 'push_up', 'hammer_curl').
+    :param (numpy.ndarray) landmarks: O array (33, 4) de marcos (do MediaPipe ou enviados pelo cliente).
+    :param (tuple) frame_shape: A forma do frame, quando conhecida.
+    :param (AnalysisSession) session: A sessão de análise cujos rastreadores serão atualizados.
+    :param (float) observed_at: Instante de um frame inferido, registado na amostragem adaptativa.
+    :param (float) timestamp: Instante do frame para a suavização (ex.: a posição num vídeo); por
+        omissão, `observed_at` ou o relógio monotónico.
+    :raises ValueError: Se o tipo de exercício não for suportado.
+    :return (dict): Um dicionário contendo os dados da análise ou uma mensagem de erro.
+    """
+    # Seleciona o rastreador da sessão do utilizador com base no tipo de exercício.
+    with session.lock:
+        tracker = session.get_tracker(exercise_type)
+        # Todos os exercícios passam pelo mesmo motor, que retorna uma tupla com 6 valores.
+        if timestamp is None:
+            timestamp = observed_at
+        started = time.perf_counter()
+        counter, angle, stage, feedback, landmarks_to_draw, progress = tracker.track(landmarks, frame_shape, timestamp)
+        observe_stage("tracking", time.perf_counter() - started)
+
+        if observed_at is not None and settings.POSE_ADAPTIVE_SAMPLING:
+            _get_sampler(session, exercise_type).observe(observed_at, landmarks, angle)
+
+    _frames_tracked.inc()
     # Retorna uma resposta JSON consistente para a interface do utilizador.
     return {
         "counter": counter, 
         "stage": stage, 
         "feedback": feedback,
-        "landmarks": landmarks,
+        "landmarks": landmarks_to_draw,
         "progress": progress
-    }
\ No newline at end of file
+    }
+
+def _analyze_image_frame(exercise_type: str, read, session: AnalysisSession, profile=None):
+    """Analisa o frame de um pedido com imagem, com ou sem inferência.
+
+    :param (str) exercise_type: O tipo de exercício a ser analisado.
+    :param (callable) read: Função sem argumentos que devolve os bytes da imagem.
+    :param (AnalysisSession) session: A sessão de análise do frame.
+    :param (str) profile: O perfil do modelo de pose.
+    :raises ValueError: Se a imagem for inválida.
+    :return (dict): Um dicionário contendo os dados da análise ou uma mensagem de erro.
+    """
+    skipped = analyze_without_inference(exercise_type, session)
+    if skipped is not None:
+        return skipped
+    return _analyze_admitted_frame(exercise_type, read, session, profile)
+
+def analyze_exercise_frame(exercise_type: str, image_b64: str, user_id, session_id: str = "default", profile=None,
+                           seq=None):
+    """Analisa um único frame de um exercício recebido como uma string base64.
+
+    Esta função decodifica a imagem, executa a estimativa de pose para encontrar
+    os marcos corporais e, em seguida, passa esses marcos para o rastreador de
+    exercício da sessão do utilizador para análise de movimento, contagem e feedback.
+
+    :param (str) exercise_type: O tipo de exercício a ser analisado ('squat', 'push_up', 'hammer_curl').
+    :param (str) image_b64: A imagem do frame codificada em formato base64.
+    :param (uuid.UUID) user_id: O ID do utilizador autenticado, dono da sessão de análise.
+    :param (str) session_id: O identificador da sessão de análise enviado pelo cliente.
+    :param (str) profile: O perfil do modelo de pose pedido pelo cliente (ex.: 'lite').
+    :param (int) seq: Número de sequência do frame; as repetições de um 'seq' não avançam o rastreador.
+    :raises ValueError: Se o tipo de exercício ou o perfil não forem suportados ou se a imagem for inválida.
+    :return (dict): Um dicionário contendo os dados da análise ou uma mensagem de erro.
+    """
+    if not tracker_registry.supports(exercise_type):
+        raise ValueError("Exercício não suportado")
+    profile = select_profile(profile)
+
+    def read():
+        try:
+            # Decodifica a imagem de base64 para os bytes que o OpenCV entende.
+            return base64.b64decode(image_b64)
+        except Exception:
+            raise ValueError("String base64 da imagem inválida ou corrompida.")
+
+    session = tracker_registry.get_session(user_id, session_id)
+    return _analyze_sequenced(session, seq, functools.partial(_analyze_image_frame, exercise_type, read, session, profile))
+
+def analyze_exercise_bytes(exercise_type: str, image_bytes: bytes, user_id, session_id: str = "default", profile=None,
+                           seq=None):
+    """Analisa um único frame de um exercício recebido como bytes da imagem.
+
+    Variante binária de `analyze_exercise_frame`: o corpo da requisição é entregue
+    diretamente ao `np.frombuffer`/`cv2.imdecode`, sem a decodificação base64
+    nem cópias intermédias do buffer.
+
+    :param (str) exercise_type: O tipo de exercício a ser analisado ('squat', 'push_up', 'hammer_curl').
+    :param (bytes) image_bytes: O conteúdo binário da imagem (JPEG, PNG, ...).
+    :param (uuid.UUID) user_id: O ID do utilizador autenticado, dono da sessão de análise.
+    :param (str) session_id: O identificador da sessão de análise enviado pelo cliente.
+    :param (str) profile: O perfil do modelo de pose pedido pelo cliente (ex.: 'lite').
+    :param (int) seq: Número de sequência do frame; as repetições de um 'seq' não avançam o rastreador.
+    :raises ValueError: Se o tipo de exercício ou o perfil não forem suportados ou se a imagem for inválida.
+    :return (dict): Um dicionário contendo os dados da análise ou uma mensagem de erro.
+    """
+    if not tracker_registry.supports(exercise_type):
+        raise ValueError("Exercício não suportado")
+    profile = select_profile(profile)
+    if not image_bytes:
+        raise ValueError("O corpo da requisição não contém nenhuma imagem.")
+
+    session = tracker_registry.get_session(user_id, session_id)
+    analyze = functools.partial(_analyze_image_frame, exercise_type, lambda: image_bytes, session, profile)
+    return _analyze_sequenced(session, seq, analyze)
+
+def analyze_exercise_landmarks(exercise_type: str, landmarks, user_id, session_id: str = "default", seq=None):
+    """Analisa um frame cujos marcos de pose foram detetados no próprio dispositivo do cliente.
+
+    Dispensa a decodificação da imagem, a conversão de cores e a inferência do
+    MediaPipe: os marcos seguem diretamente para o rastreador da sessão.
+
+    :param (str) exercise_type: O tipo de exercício a ser analisado ('squat', 'push_up', 'hammer_curl').
+    :param (list) landmarks: As coordenadas [x, y, z, visibility] dos 33 marcos, na ordem do MediaPipe.
+    :param (uuid.UUID) user_id: O ID do utilizador autenticado, dono da sessão de análise.
+    :param (str) session_id: O identificador da sessão de análise enviado pelo cliente.
+    :param (int) seq: Número de sequência do frame; as repetições de um 'seq' não avançam o rastreador.
+    :raises ValueError: Se o tipo de exercício não for suportado ou os marcos forem inválidos.
+    :return (dict): Um dicionário contendo os dados da análise.
+    """
+    if not tracker_registry.supports(exercise_type):
+        raise ValueError("Exercício não suportado")
+
+    points = landmarks_from_list(landmarks)
+    session = tracker_registry.get_session(user_id, session_id)
+    return _analyze_sequenced(session, seq, functools.partial(track_landmarks, exercise_type, points, None, session))
+
+def analyze_stream_frame(exercise_type: str, data, user_id, session_id: str, estimator: PoseEstimator):
+    """Analisa um frame recebido por uma ligação de streaming (WebSocket).
+
+    Aceita mensagens binárias (os bytes da imagem), mensagens de texto com a imagem
+    em base64 e mensagens JSON {"landmarks": [...]} com os marcos já detetados no
+    cliente; as imagens são processadas com o estimador dedicado da ligação.
+
+    :param (str) exercise_type: O tipo de exercício a ser analisado.
+    :param (bytes | str) data: A imagem em bytes, em base64 ou um objeto JSON com os marcos.
+    :param (uuid.UUID) user_id: O ID do utilizador autenticado na ligação.
+    :param (str) session_id: O identificador da sessão de análise.
+    :param (PoseEstimator) estimator: O estimador de pose reservado para a ligação.
+    :raises ValueError: Se a imagem for inválida.
+    :return (dict): Um dicionário contendo os dados da análise ou uma mensagem de erro.
+    """
+    if isinstance(data, str) and data.startswith("{"):
+        try:
+            landmarks = json.loads(data)["landmarks"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Mensagem JSON inválida: é esperado o campo 'landmarks'.")
+        return analyze_exercise_landmarks(exercise_type, landmarks, user_id, session_id)
+
+    session = tracker_registry.get_session(user_id, session_id)
+    skipped = analyze_without_inference(exercise_type, session)
+    if skipped is not None:
+        return skipped
+
+    if isinstance(data, str):
+        try:
+            data = base64.b64decode(data)
+        except Exception:
+            raise ValueError("Imagem inválida ou corrompida.")
+
+    return analyze_image(exercise_type, data, session, estimator=estimator)
@@ -0,0 +1,216 @@
+"""
+@file pose_scheduler.py
+@brief Agrupa em micro-lotes os frames de várias sessões antes de os enviar ao pool de estimadores.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from exercises.estimation import PoseEstimatorPool, PoseEstimatorPoolFull
+
+
+def _set_result(future: Future, value):
+    """Entrega o resultado de um frame, ignorando os futures já cancelados ou com erro."""
+    try:
+        future.set_result(value)
+    except InvalidStateError:
+        pass
+
+
+def _set_exception(future: Future, error: BaseException):
+    """Entrega o erro de um frame, ignorando os futures já cancelados ou com resultado."""
+    try:
+        future.set_exception(error)
+    except InvalidStateError:
+        pass
+
+
+class PoseBatchScheduler:
+    """Escalonador de micro-lotes para a inferência de pose.
+
+    Os frames que chegam dentro de uma janela curta (ex.: 5 a 10 ms), vindos de
+    sessões diferentes, são agrupados num lote. O lote é dividido entre os
+    estimadores do pool e cada estimador processa a sua parte de seguida, com uma
+    única reserva no pool; o resultado de cada frame é entregue a quem o submeteu.
+
+    O MediaPipe Pose não aceita tensores em lote, por isso o ganho vem de amortizar
+    a reserva de estimadores e a troca de contexto entre threads por vários frames,
+    mantendo todos os grafos ocupados. A janela limita a latência extra de cada frame.
+    Os frames de um lote são separados por perfil do modelo antes do despacho.
+
+    Attributes:
+        pool (PoseEstimatorPool): O pool de estimadores que executa a inferência.
+        window_ms (float): Duração da janela de agrupamento; 0 desativa o agrupamento.
+        max_batch (int): Número máximo de frames por lote (despacha antes do fim da janela).
+        batches (int): Número de lotes despachados desde o arranque.
+        frames (int): Número de frames processados em lotes desde o arranque.
+    """
+    def __init__(self, pool: PoseEstimatorPool, window_ms: float = 0, max_batch: int = 8):
+        """Inicializa o escalonador; a thread de despacho só arranca no primeiro frame.
+
+        :param (PoseEstimatorPool) pool: O pool de estimadores.
+        :param (float) window_ms: Duração da janela de agrupamento, em milissegundos.
+        :param (int) max_batch: Número máximo de frames por lote.
+        """
+        self.pool = pool
+        self.window_ms = window_ms
+        self.max_batch = max(1, max_batch)
+        self.batches = 0
+        self.frames = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._workers = ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="pose-batch")
+        self._dispatcher = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def enabled(self) -> bool:
+        """Indica se o agrupamento em micro-lotes está ativo."""
+        return self.window_ms > 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Número de frames à espera de serem agrupados num lote."""
+        return self._queue.qsize()
+
+    def estimate_pose(self, frame, profile=None):
+        """Submete um frame ao próximo lote e espera pelo seu resultado.
+
+        Tem a mesma interface do `PoseEstimatorPool`; com a janela a 0 o frame é
+        enviado diretamente ao pool.
+
+        :param (numpy.ndarray) frame: O quadro da imagem no formato BGR a ser processado.
+        :param (str) profile: O perfil do modelo; por omissão, o perfil padrão do pool.
+        :raises PoseEstimatorPoolFull: Se o pool estiver sobrecarregado.
+        :return (object): O objeto de resultados do MediaPipe contendo os marcos da pose detectados.
+        """
+        if not self.enabled or self._closed:
+            return self.pool.estimate_pose(frame, profile)
+
+        future: Future = Future()
+        self._ensure_dispatcher()
+        self._queue.put((frame, profile or self.pool.default_profile, future))
+        # O frame espera no máximo pela janela, por um estimador (`acquire_timeout`)
+        # e por outro tanto para a inferência da sua parte do lote; assim, um lote
+        # perdido (ex.: no encerramento) não bloqueia o pedido para sempre.
+        timeout = self.window_ms / 1000.0 + 2 * self.pool.acquire_timeout
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PoseEstimatorPoolFull("Tempo de espera pelo serviço de análise de pose esgotado.")
+
+    def close(self):
+        """Para a thread de despacho e as threads de trabalho do escalonador.
+
+        Os frames que ainda esperavam por um lote recebem PoseEstimatorPoolFull.
+
+        :return: None
+        """
+        self._closed = True
+        self._fail_pending(PoseEstimatorPoolFull("O serviço de análise de pose foi encerrado."))
+        self._queue.put(None)
+        self._workers.shutdown(wait=False)
+
+    def _fail_pending(self, error: BaseException):
+        """Esvazia a fila, entregando o erro a todos os frames que esperavam por um lote."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                _set_exception(item[2], error)
+
+    def _ensure_dispatcher(self):
+        """Arranca a thread de despacho, caso ainda não esteja a correr."""
+        if self._dispatcher is not None:
+            return
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._run, name="pose-batch-dispatcher", daemon=True)
+                self._dispatcher.start()
+
+    def _run(self):
+        """Ciclo da thread de despacho: recolhe um lote por janela e despacha-o."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.window_ms / 1000.0
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._safe_dispatch(batch)
+                    return
+                batch.append(item)
+            self._safe_dispatch(batch)
+
+    def _safe_dispatch(self, batch):
+        """Despacha um lote; se o despacho falhar, os frames do lote recebem o erro.
+
+        Sem esta proteção uma exceção (ex.: submeter ao executor já encerrado por
+        `close`) terminaria a thread de despacho, e os frames seguintes ficariam à
+        espera de um lote que nunca chega.
+
+        :param (list) batch: Lista de tuplos (frame, perfil, future).
+        :return: None
+        """
+        try:
+            self._dispatch(batch)
+        except Exception as e:
+            for _, _, future in batch:
+                _set_exception(future, e)
+
+    def _dispatch(self, batch):
+        """Divide o lote por perfil e entre os estimadores do pool e submete cada parte.
+
+        :param (list) batch: Lista de tuplos (frame, perfil, future).
+        :return: None
+        """
+        self.batches += 1
+        self.frames += len(batch)
+        by_profile = {}
+        for frame, profile, future in batch:
+            by_profile.setdefault(profile, []).append((frame, future))
+        for profile, items in by_profile.items():
+            parts = min(self.pool.size, len(items))
+            for i in range(parts):
+                self._workers.submit(self._run_chunk, profile, items[i::parts])
+
+    def _run_chunk(self, profile, chunk):
+        """Processa uma parte do lote com um único estimador reservado do pool.
+
+        :param (str) profile: O perfil do modelo dos frames da parte.
+        :param (list) chunk: Lista de pares (frame, future).
+        :return: None
+        """
+        try:
+            with self.pool.estimator(profile) as estimator:
+                for frame, future in chunk:
+                    if future.done():
+                        # Quem submeteu o frame desistiu de esperar: salta a inferência.
+                        continue
+                    try:
+                        _set_result(future, estimator.estimate_pose(frame))
+                    except Exception as e:
+                        _set_exception(future, e)
+        except Exception as e:
+            # Falha ao reservar o estimador: todos os frames da parte recebem o erro.
+            for _, future in chunk:
+                _set_exception(future, e)
@@ -0,0 +1,190 @@
+"""
+@file result_encoding.py
+@brief Codifica os resultados da análise de frames em JSON ou num formato binário compacto, com modo delta.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import json
+import struct
+
+from exercises.definitions import EXERCISES
+
+JSON_MEDIA_TYPE = "application/json"
+# Formato binário de layout fixo (little-endian), sem dependências externas:
+#
+#   cabeçalho   u8 versão, u16 campos presentes (FIELD_* e FLAG_*)
+#   counter     u32
+#   stage       u8 comprimento + UTF-8
+#   feedback    u16 comprimento + UTF-8
+#   progress    f32
+#   landmarks   u8 número de pontos + (u8 índice do MediaPipe, f32 x, f32 y) por ponto
+#   dropped     u32 frames descartados ('dropped_frames')
+#   error       u16 comprimento + UTF-8
+#
+# Os campos presentes surgem por esta ordem. INTERPOLATED, DROPPED e DUPLICATE são apenas
+# bits do cabeçalho. Com FLAG_DELTA, um campo ausente mantém o valor da mensagem
+# anterior da mesma ligação.
+BINARY_MEDIA_TYPE = "application/vnd.fitai.pose"
+BINARY_VERSION = 1
+
+FIELD_COUNTER = 1 << 0
+FIELD_STAGE = 1 << 1
+FIELD_FEEDBACK = 1 << 2
+FIELD_PROGRESS = 1 << 3
+FIELD_LANDMARKS = 1 << 4
+FIELD_DROPPED_FRAMES = 1 << 5
+FIELD_ERROR = 1 << 6
+FLAG_INTERPOLATED = 1 << 7
+FLAG_DROPPED = 1 << 8
+FLAG_DUPLICATE = 1 << 9
+FLAG_DELTA = 1 << 15
+
+# Formatos que o cliente pode pedir por nome (ex.: no parâmetro de um WebSocket).
+FORMATS = {"json": JSON_MEDIA_TYPE, "binary": BINARY_MEDIA_TYPE}
+
+# Campos com estado, omitidos no modo delta quando não mudam. 'error',
+# 'interpolated', 'dropped' e 'duplicate' dizem respeito a um único frame e seguem sempre.
+DELTA_FIELDS = ("counter", "stage", "feedback", "progress", "landmarks", "dropped_frames")
+
+_HEADER = struct.Struct("<BH")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_F32 = struct.Struct("<f")
+_POINT = struct.Struct("<Bff")
+
+
+def negotiate_format(accept):
+    """Escolhe o formato da resposta a partir do cabeçalho Accept.
+
+    Entre os tipos suportados, prevalece o de maior 'q'. Sem nenhum tipo
+    suportado, a resposta é JSON, como antes da negociação existir. O modo delta
+    não é negociado aqui: só existe no WebSocket (parâmetro 'delta'), porque
+    cada resposta HTTP é independente e leva sempre todos os campos.
+
+    :param (str | None) accept: O valor do cabeçalho Accept.
+    :return (str): O tipo de media escolhido.
+    """
+    best, best_q = JSON_MEDIA_TYPE, -1.0
+    for item in (accept or "").split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        media_type = media_type.lower()
+        if media_type not in (JSON_MEDIA_TYPE, BINARY_MEDIA_TYPE):
+            continue
+        options = dict(param.partition("=")[::2] for param in params)
+        try:
+            q = float(options.get("q", 1.0))
+        except ValueError:
+            continue
+        if q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def _pack_text(length, text):
+    """Codifica um texto em UTF-8 precedido do seu comprimento, truncado ao máximo do campo.
+
+    O corte é feito num limite de carácter, para não partir um carácter acentuado
+    em dois e deixar a mensagem inválida para o cliente.
+    """
+    data = text.encode("utf-8")
+    limit = (1 << (8 * length.size)) - 1
+    if len(data) > limit:
+        data = data[:limit].decode("utf-8", "ignore").encode("utf-8")
+    return length.pack(len(data)) + data
+
+
+class ResultEncoder:
+    """Codificador dos resultados de análise de um exercício.
+
+    No modo delta o codificador guarda os últimos valores enviados e omite os
+    campos que não mudaram, por isso deve existir um por ligação, com as
+    mensagens entregues por ordem (ex.: um WebSocket).
+
+    Attributes:
+        media_type (str): O tipo de media das mensagens produzidas.
+        delta (bool): Indica se os campos inalterados são omitidos.
+        binary (bool): Indica se as mensagens são bytes (formato binário) ou texto (JSON).
+    """
+    def __init__(self, exercise_type: str, media_type: str = JSON_MEDIA_TYPE, delta: bool = False):
+        """Inicializa o codificador sem mensagens anteriores.
+
+        :param (str) exercise_type: O exercício analisado, que define os índices dos pontos a desenhar.
+        :param (str) media_type: JSON_MEDIA_TYPE ou BINARY_MEDIA_TYPE.
+        :param (bool) delta: Ativa o modo delta.
+        :raises ValueError: Se o tipo de media não for suportado.
+        """
+        if media_type not in (JSON_MEDIA_TYPE, BINARY_MEDIA_TYPE):
+            raise ValueError(f"Formato de resposta não suportado: {media_type}")
+        self.media_type = media_type
+        self.delta = delta
+        self.binary = media_type == BINARY_MEDIA_TYPE
+        exercise = EXERCISES.get(exercise_type)
+        self._point_index = dict(zip(exercise.draw_names, exercise.draw_index.tolist())) if exercise else {}
+        self._previous = {}
+
+    def encode(self, result: dict):
+        """Codifica o resultado de um frame.
+
+        :param (dict) result: O resultado devolvido pelo serviço de estimativa de pose.
+        :return (bytes | str): A mensagem binária ou o texto JSON.
+        """
+        if self.delta:
+            result = self._changed(result)
+        if self.binary:
+            return self._encode_binary(result)
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+
+    def _changed(self, result: dict) -> dict:
+        """Remove do resultado os campos com o mesmo valor da mensagem anterior."""
+        changed = dict(result)
+        previous = self._previous
+        for key in DELTA_FIELDS:
+            if key in result:
+                value = result[key]
+                if key in previous and previous[key] == value:
+                    del changed[key]
+                else:
+                    previous[key] = value
+        return changed
+
+    def _encode_binary(self, result: dict) -> bytes:
+        """Codifica o resultado no formato binário de layout fixo."""
+        flags = FLAG_DELTA if self.delta else 0
+        parts = [b""]
+        if "counter" in result:
+            flags |= FIELD_COUNTER
+            parts.append(_U32.pack(result["counter"]))
+        if "stage" in result:
+            flags |= FIELD_STAGE
+            parts.append(_pack_text(_U8, result["stage"] or ""))
+        if "feedback" in result:
+            flags |= FIELD_FEEDBACK
+            parts.append(_pack_text(_U16, result["feedback"] or ""))
+        if "progress" in result:
+            flags |= FIELD_PROGRESS
+            parts.append(_F32.pack(result["progress"]))
+        if "landmarks" in result:
+            flags |= FIELD_LANDMARKS
+            landmarks = result["landmarks"]
+            parts.append(_U8.pack(len(landmarks)))
+            index = self._point_index
+            parts.extend(_POINT.pack(index[name], x, y) for name, (x, y) in landmarks.items())
+        if "dropped_frames" in result:
+            flags |= FIELD_DROPPED_FRAMES
+            parts.append(_U32.pack(result["dropped_frames"]))
+        if "error" in result:
+            flags |= FIELD_ERROR
+            parts.append(_pack_text(_U16, result["error"]))
+        if result.get("interpolated"):
+            flags |= FLAG_INTERPOLATED
+        if result.get("dropped"):
+            flags |= FLAG_DROPPED
+        if result.get("duplicate"):
+            flags |= FLAG_DUPLICATE
+        parts[0] = _HEADER.pack(BINARY_VERSION, flags)
+        return b"".join(parts)
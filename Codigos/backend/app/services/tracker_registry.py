@@ -0,0 +1,142 @@
+"""
+@file tracker_registry.py
+@brief Mantém os rastreadores de exercício isolados por utilizador e por sessão de análise.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.core.lru_cache import LRUCache
+
+
+class AnalysisSession:
+    """Estado de uma sessão de análise de um utilizador.
+
+    Guarda os rastreadores de exercício (contador, estágio, feedback) de uma única
+    sessão, criados sob demanda na primeira vez que cada exercício é analisado.
+
+    Attributes:
+        user_id (Hashable): O ID do utilizador dono da sessão.
+        session_id (str): O identificador da sessão de análise enviado pelo cliente.
+        trackers (dict): Os rastreadores instanciados, indexados pelo tipo de exercício.
+        lock (threading.Lock): Serializa os frames de uma mesma sessão processados em paralelo.
+        last_seen (float): Instante (relógio monotónico) do último acesso à sessão.
+        roi (tuple | None): Caixa (x0, y0, x1, y1) do corpo no último frame, usada para recortar o seguinte.
+        samplers (dict): Os amostradores adaptativos da inferência, indexados pelo tipo de exercício.
+        frame_cond (threading.Condition): Sinaliza a chegada e a conclusão dos frames da sessão.
+        latest_frame (int): Número de sequência do frame mais recente recebido na sessão.
+        frames_in_flight (int): Número de frames da sessão em análise neste momento.
+        frames_dropped (int): Número de frames da sessão descartados por terem chegado outros mais recentes.
+        last_seq (int): Maior número de sequência ('seq') enviado pelo cliente na sessão, ou -1.
+        seq_results (OrderedDict): Os resultados dos últimos 'seq' analisados, devolvidos às repetições
+            (None enquanto o frame está em análise).
+    """
+    def __init__(self, user_id: Hashable, session_id: str, tracker_factories: Dict[str, Callable[[], Any]]):
+        """Inicializa uma sessão de análise vazia.
+
+        :param (Hashable) user_id: O ID do utilizador dono da sessão.
+        :param (str) session_id: O identificador da sessão de análise.
+        :param (dict) tracker_factories: Mapeia cada tipo de exercício para a classe do seu rastreador.
+        """
+        self.user_id = user_id
+        self.session_id = session_id
+        self.trackers: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+        self.roi = None
+        self.samplers: Dict[str, Any] = {}
+        self.frame_cond = threading.Condition()
+        self.latest_frame = 0
+        self.frames_in_flight = 0
+        self.frames_dropped = 0
+        self.last_seq = -1
+        self.seq_results: "OrderedDict[int, Any]" = OrderedDict()
+        self._tracker_factories = tracker_factories
+
+    def get_tracker(self, exercise_type: str):
+        """Obtém o rastreador de um exercício, criando-o no primeiro uso.
+
+        :param (str) exercise_type: O tipo de exercício ('squat', 'push_up', 'hammer_curl').
+        :raises ValueError: Se o tipo de exercício não for suportado.
+        :return (object): O rastreador do exercício para esta sessão.
+        """
+        tracker = self.trackers.get(exercise_type)
+        if tracker is None:
+            factory = self._tracker_factories.get(exercise_type)
+            if factory is None:
+                raise ValueError("Exercício não suportado")
+            tracker = self.trackers[exercise_type] = factory()
+        return tracker
+
+
+class TrackerRegistry:
+    """Registo das sessões de análise ativas, com expiração por inatividade.
+
+    As sessões ficam num `LRUCache`: cada acesso renova a sessão e descarta as
+    inativas há mais de `ttl_seconds` e as menos usadas acima de `max_sessions`.
+
+    Attributes:
+        ttl_seconds (float): Tempo de inatividade após o qual uma sessão é descartada.
+        max_sessions (int): Número máximo de sessões mantidas em memória.
+    """
+    def __init__(self, tracker_factories: Dict[str, Callable[[], Any]], ttl_seconds: float = 300, max_sessions: int = 5000):
+        """Inicializa o registo de sessões.
+
+        :param (dict) tracker_factories: Mapeia cada tipo de exercício para a classe do seu rastreador.
+        :param (float) ttl_seconds: Tempo de inatividade, em segundos, antes de uma sessão expirar.
+        :param (int) max_sessions: Número máximo de sessões em memória.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._tracker_factories = tracker_factories
+        self._sessions = LRUCache(max_sessions, ttl_seconds)
+        self._lock = threading.Lock()
+
+    def supports(self, exercise_type: str) -> bool:
+        """Indica se existe um rastreador para o tipo de exercício.
+
+        :param (str) exercise_type: O tipo de exercício a verificar.
+        :return (bool): True se o exercício for suportado.
+        """
+        return exercise_type in self._tracker_factories
+
+    def get_session(self, user_id: Hashable, session_id: str) -> AnalysisSession:
+        """Obtém a sessão de análise de um utilizador, criando-a se necessário.
+
+        Cada acesso renova o TTL da sessão e aproveita para descartar as sessões
+        expiradas ou excedentes; uma sessão expirada é substituída por uma nova.
+
+        :param (Hashable) user_id: O ID do utilizador autenticado.
+        :param (str) session_id: O identificador da sessão de análise.
+        :return (AnalysisSession): A sessão de análise correspondente.
+        """
+        key = (user_id, session_id)
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(key, now=now)
+            if session is None:
+                session = AnalysisSession(user_id, session_id, self._tracker_factories)
+            session.last_seen = now
+            self._sessions.put(key, session, now)
+        return session
+
+    def discard(self, user_id: Hashable, session_id: str) -> Optional[AnalysisSession]:
+        """Remove explicitamente uma sessão de análise (ex.: fim do treino).
+
+        :param (Hashable) user_id: O ID do utilizador.
+        :param (str) session_id: O identificador da sessão de análise.
+        :return (AnalysisSession | None): A sessão removida ou None se não existir.
+        """
+        with self._lock:
+            return self._sessions.pop((user_id, session_id), None)
+
+    def __len__(self) -> int:
+        """Retorna o número de sessões de análise em memória."""
+        return len(self._sessions)
@@ -0,0 +1,392 @@
+"""
+@file video_analysis_service.py
+@brief Analisa vídeos gravados de treinos em segundo plano, frame a frame, com acompanhamento do progresso.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from exercises.angle_calculation import JOINTS, calculate_angles
+from app.services.pose_estimation_service import (
+    create_pose_estimator, estimate_landmarks, exercise_trackers, select_profile, track_landmarks
+)
+from app.services.tracker_registry import AnalysisSession
+
+
+class VideoQueueFull(RuntimeError):
+    """Levantada quando a fila de análises de vídeo, global ou do utilizador, está cheia.
+
+    Attributes:
+        per_user (bool): True se o limite atingido foi o do utilizador, False se foi o global.
+    """
+    def __init__(self, message: str, per_user: bool):
+        """Cria a exceção.
+
+        :param (str) message: A mensagem de erro.
+        :param (bool) per_user: Indica se o limite atingido foi o do utilizador.
+        """
+        super().__init__(message)
+        self.per_user = per_user
+
+
+class VideoAnalysisJob:
+    """Estado de uma análise de vídeo submetida por um utilizador.
+
+    Attributes:
+        job_id (str): O identificador único do trabalho.
+        user_id (uuid.UUID): O ID do utilizador que submeteu o vídeo.
+        exercise_type (str): O tipo de exercício a ser analisado.
+        stride (int): Analisa apenas um em cada `stride` frames.
+        status (str): 'queued', 'running', 'done' ou 'failed'.
+        progress (float): Fração do vídeo já processada, de 0 a 1.
+        counter (int): Número de repetições contadas até ao momento.
+        reps (list): Linha do tempo das repetições, com o frame e o instante de cada uma.
+        frames_analyzed (int): Número de frames que passaram pela estimativa de pose.
+        frames_without_body (int): Número de frames analisados sem nenhum corpo detetado.
+        angle_min (numpy.ndarray | None): Menor ângulo, em graus, de cada articulação de `JOINTS` no vídeo.
+        angle_max (numpy.ndarray | None): Maior ângulo, em graus, de cada articulação de `JOINTS` no vídeo.
+        angle_sum (numpy.ndarray | None): Soma dos ângulos de cada articulação, para a média.
+        angle_frames (int): Número de frames somados em `angle_sum`.
+        lock (threading.Lock): Protege os ângulos acumulados, atualizados pelo worker enquanto o
+            endpoint consulta o trabalho.
+        error (str | None): A mensagem de erro, caso a análise falhe.
+    """
+    def __init__(self, user_id, exercise_type: str, path: str, stride: int):
+        """Cria um trabalho na fila.
+
+        :param (uuid.UUID) user_id: O ID do utilizador que submeteu o vídeo.
+        :param (str) exercise_type: O tipo de exercício a ser analisado.
+        :param (str) path: O caminho do ficheiro temporário com o vídeo.
+        :param (int) stride: Analisa apenas um em cada `stride` frames.
+        """
+        self.job_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.exercise_type = exercise_type
+        self.path = path
+        self.stride = stride
+        self.status = "queued"
+        self.progress = 0.0
+        self.counter = 0
+        self.reps = []
+        self.frames_analyzed = 0
+        self.frames_without_body = 0
+        self.angle_min = None
+        self.angle_max = None
+        self.angle_sum = None
+        self.angle_frames = 0
+        self.lock = threading.Lock()
+        self.duration_s = None
+        self.error = None
+        self.finished_at = None
+
+    def to_dict(self) -> dict:
+        """Serializa o estado do trabalho para a resposta da API.
+
+        :return (dict): O estado, o progresso, os totais, a linha do tempo das repetições e
+            a amplitude (mínimo, máximo e média, em graus) de cada articulação.
+        """
+        return {
+            "job_id": self.job_id,
+            "exercise_type": self.exercise_type,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "total_reps": self.counter,
+            "reps": list(self.reps),
+            "frames_analyzed": self.frames_analyzed,
+            "frames_without_body": self.frames_without_body,
+            "joint_angles": self.joint_angles(),
+            "duration_s": self.duration_s,
+            "error": self.error,
+        }
+
+    def joint_angles(self) -> dict:
+        """Resume os ângulos das articulações nos frames com um corpo detetado.
+
+        :return (dict): Para cada articulação de `JOINTS`, o ângulo mínimo, máximo e médio em graus
+            (vazio enquanto nenhum frame tiver um corpo).
+        """
+        with self.lock:
+            if self.angle_sum is None:
+                return {}
+            angle_min = self.angle_min.tolist()
+            angle_max = self.angle_max.tolist()
+            angle_mean = (self.angle_sum / self.angle_frames).tolist()
+        return {
+            name: {
+                "min": round(angle_min[i], 1),
+                "max": round(angle_max[i], 1),
+                "mean": round(angle_mean[i], 1),
+            }
+            for i, name in enumerate(JOINTS)
+        }
+
+    def add_angles(self, angles):
+        """Acumula os ângulos das articulações de um frame.
+
+        :param (numpy.ndarray) angles: Os ângulos de `JOINTS` no frame, em graus.
+        :return: None
+        """
+        with self.lock:
+            self.angle_frames += 1
+            if self.angle_sum is None:
+                self.angle_min = angles.copy()
+                self.angle_max = angles.copy()
+                self.angle_sum = angles.copy()
+                return
+            np.minimum(self.angle_min, angles, out=self.angle_min)
+            np.maximum(self.angle_max, angles, out=self.angle_max)
+            self.angle_sum += angles
+
+
+class VideoAnalysisService:
+    """Executa as análises de vídeo num pool de workers próprio, fora dos workers HTTP.
+
+    O vídeo é lido frame a frame com `cv2.VideoCapture`, sem ser carregado inteiro
+    em memória. Cada trabalho usa um estimador de pose exclusivo, porque o modo de
+    rastreamento do MediaPipe depende da continuidade entre frames consecutivos, e
+    os trabalhos terminados são descartados após um tempo de retenção.
+
+    Cada vídeo à espera ocupa um ficheiro temporário de até POSE_VIDEO_MAX_BYTES,
+    por isso o número de vídeos por analisar é limitado, no total e por
+    utilizador. O endpoint reserva o lugar (`reserve`) antes de gravar o vídeo em
+    disco, e a reserva passa para o trabalho em `submit`.
+
+    Attributes:
+        job_ttl_seconds (float): Tempo durante o qual um trabalho terminado pode ser consultado.
+        max_pending (int): Número máximo de vídeos por analisar (reservados, na fila ou em análise).
+        max_pending_per_user (int): Número máximo de vídeos por analisar de um mesmo utilizador.
+    """
+    def __init__(self, workers: int = 1, job_ttl_seconds: float = 3600, estimator_factory=create_pose_estimator,
+                 max_pending: int = 8, max_pending_per_user: int = 2):
+        """Inicializa o serviço sem nenhum trabalho.
+
+        :param (int) workers: Número de vídeos analisados em simultâneo.
+        :param (float) job_ttl_seconds: Tempo de retenção dos trabalhos terminados, em segundos.
+        :param (callable) estimator_factory: Função que cria o estimador de pose de cada trabalho a partir do perfil.
+        :param (int) max_pending: Número máximo de vídeos por analisar.
+        :param (int) max_pending_per_user: Número máximo de vídeos por analisar de um mesmo utilizador.
+        """
+        self.job_ttl_seconds = job_ttl_seconds
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self._estimator_factory = estimator_factory
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pose-video")
+        self._jobs = {}
+        self._futures = {}
+        self._reserved = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, user_id):
+        """Reserva um lugar na fila para um vídeo que ainda vai ser recebido.
+
+        Deve ser seguida de `submit(..., reserved=True)` ou, se o vídeo não chegar a
+        ser submetido, de `release`.
+
+        :param (uuid.UUID) user_id: O ID do utilizador que vai submeter o vídeo.
+        :raises VideoQueueFull: Se a fila do utilizador ou a fila global estiverem cheias.
+        :return: None
+        """
+        with self._lock:
+            user_pending = self._reserved.get(user_id, 0)
+            total_pending = sum(self._reserved.values())
+            for job in self._jobs.values():
+                if job.finished_at is None:
+                    total_pending += 1
+                    user_pending += job.user_id == user_id
+            if user_pending >= self.max_pending_per_user:
+                raise VideoQueueFull("Já tem o número máximo de vídeos à espera de análise.", per_user=True)
+            if total_pending >= self.max_pending:
+                raise VideoQueueFull("A fila de análise de vídeos está cheia.", per_user=False)
+            self._reserved[user_id] = self._reserved.get(user_id, 0) + 1
+
+    def release(self, user_id):
+        """Liberta um lugar reservado com `reserve` cujo vídeo não foi submetido.
+
+        :param (uuid.UUID) user_id: O ID do utilizador da reserva.
+        :return: None
+        """
+        with self._lock:
+            self._release(user_id)
+
+    def _release(self, user_id):
+        """Liberta uma reserva; deve ser chamada com o lock adquirido."""
+        remaining = self._reserved.get(user_id, 0) - 1
+        if remaining > 0:
+            self._reserved[user_id] = remaining
+        else:
+            self._reserved.pop(user_id, None)
+
+    def submit(self, user_id, exercise_type: str, path: str, stride: int = 1, reserved: bool = False) -> VideoAnalysisJob:
+        """Coloca um vídeo na fila de análise.
+
+        O serviço passa a ser dono do ficheiro, que é apagado no fim da análise
+        (ou aqui, se o vídeo for rejeitado).
+
+        :param (uuid.UUID) user_id: O ID do utilizador que submeteu o vídeo.
+        :param (str) exercise_type: O tipo de exercício a ser analisado.
+        :param (str) path: O caminho do ficheiro temporário com o vídeo.
+        :param (int) stride: Analisa apenas um em cada `stride` frames.
+        :param (bool) reserved: Indica se o lugar na fila já foi reservado com `reserve`.
+        :raises ValueError: Se o tipo de exercício não for suportado.
+        :raises VideoQueueFull: Se o lugar não estiver reservado e a fila estiver cheia.
+        :return (VideoAnalysisJob): O trabalho criado.
+        """
+        try:
+            if not reserved:
+                self.reserve(user_id)
+        except VideoQueueFull:
+            os.remove(path)
+            raise
+        if exercise_type not in exercise_trackers:
+            self.release(user_id)
+            os.remove(path)
+            raise ValueError("Exercício não suportado")
+
+        job = VideoAnalysisJob(user_id, exercise_type, path, max(1, stride))
+        with self._lock:
+            self._purge_finished()
+            self._release(user_id)
+            self._jobs[job.job_id] = job
+            self._futures[job.job_id] = self._executor.submit(self._run, job)
+        return job
+
+    def get_job(self, user_id, job_id: str):
+        """Obtém um trabalho do utilizador.
+
+        :param (uuid.UUID) user_id: O ID do utilizador autenticado.
+        :param (str) job_id: O identificador do trabalho.
+        :return (VideoAnalysisJob | None): O trabalho, ou None se não existir ou pertencer a outro utilizador.
+        """
+        with self._lock:
+            self._purge_finished()
+            job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    def shutdown(self):
+        """Encerra o pool de workers sem esperar pelos vídeos em curso.
+
+        Os trabalhos ainda na fila são cancelados e os seus ficheiros temporários
+        apagados; os que estão em análise apagam o seu no fim.
+
+        :return: None
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            cancelled = [self._jobs[job_id] for job_id, future in self._futures.items() if future.cancelled()]
+        for job in cancelled:
+            job.status = "failed"
+            job.error = "A análise foi cancelada com o encerramento do servidor."
+            job.finished_at = time.monotonic()
+            try:
+                os.remove(job.path)
+            except OSError:
+                pass
+
+    def _purge_finished(self):
+        """Remove os trabalhos terminados há mais tempo do que a retenção configurada."""
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.job_ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _run(self, job: VideoAnalysisJob):
+        """Processa o vídeo de um trabalho, atualizando o seu progresso.
+
+        :param (VideoAnalysisJob) job: O trabalho a processar.
+        :return: None
+        """
+        job.status = "running"
+        capture = cv2.VideoCapture(job.path)
+        estimator = None
+        try:
+            if not capture.isOpened():
+                raise ValueError("Não foi possível abrir o vídeo.")
+            fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+            total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            session = AnalysisSession(job.user_id, job.job_id, exercise_trackers)
+            estimator = self._estimator_factory(select_profile(dedicated=True))
+
+            index = 0
+            while True:
+                if index % job.stride:
+                    # Frames saltados são apenas avançados, sem decodificação.
+                    if not capture.grab():
+                        break
+                else:
+                    ok, frame = capture.read()
+                    if not ok:
+                        break
+                    self._analyze_frame(job, session, estimator, frame, index, fps)
+                index += 1
+                if total_frames > 0:
+                    job.progress = min(index / total_frames, 1.0)
+
+            job.duration_s = round(index / fps, 3)
+            job.progress = 1.0
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            if estimator is not None:
+                estimator.close()
+            capture.release()
+            try:
+                os.remove(job.path)
+            except OSError:
+                pass
+            job.finished_at = time.monotonic()
+            with self._lock:
+                self._futures.pop(job.job_id, None)
+
+    def _analyze_frame(self, job: VideoAnalysisJob, session: AnalysisSession, estimator, frame, index: int, fps: float):
+        """Executa a pose e o rastreador num frame do vídeo e regista novas repetições e os ângulos.
+
+        :param (VideoAnalysisJob) job: O trabalho em curso.
+        :param (AnalysisSession) session: A sessão de análise própria do trabalho.
+        :param (PoseEstimator) estimator: O estimador de pose do trabalho.
+        :param (numpy.ndarray) frame: O frame no formato BGR.
+        :param (int) index: A posição do frame no vídeo.
+        :param (float) fps: A taxa de frames do vídeo.
+        :return: None
+        """
+        job.frames_analyzed += 1
+        landmarks = estimate_landmarks(frame, session, estimator)
+        if landmarks is None:
+            job.frames_without_body += 1
+            return
+        # Os marcos estão normalizados ao frame: passam a pixels para que os ângulos não sejam
+        # distorcidos pela proporção de um vídeo não quadrado.
+        job.add_angles(calculate_angles(landmarks[:, :2] * (frame.shape[1], frame.shape[0])))
+
+        # A suavização usa o instante do frame no vídeo, que é analisado mais depressa do que o tempo real.
+        result = track_landmarks(job.exercise_type, landmarks, frame.shape, session, timestamp=index / fps)
+        if result["counter"] > job.counter:
+            job.counter = result["counter"]
+            job.reps.append({"rep": job.counter, "frame": index, "time_s": round(index / fps, 3)})
+
+
+# Instância única do serviço, partilhada pelos endpoints.
+video_analysis_service = VideoAnalysisService(
+    workers=settings.POSE_VIDEO_WORKERS,
+    job_ttl_seconds=settings.POSE_VIDEO_JOB_TTL_SECONDS,
+    max_pending=settings.POSE_VIDEO_MAX_PENDING,
+    max_pending_per_user=settings.POSE_VIDEO_MAX_PENDING_PER_USER,
+)
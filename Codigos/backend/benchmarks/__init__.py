@@ -0,0 +1,9 @@
+"""
+@file __init__.py
+@brief Benchmarks do pipeline de pose, para medir o desempenho e detetar regressões entre commits.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
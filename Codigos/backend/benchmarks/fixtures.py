@@ -0,0 +1,171 @@
+"""
+@file fixtures.py
+@brief Sequências de marcos e frames (sintéticos ou gravados) usadas nos benchmarks do pipeline de pose.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+from exercises.definitions import EXERCISES
+from exercises.landmarks import NUM_LANDMARKS, VISIBILITY, X, Y, empty_landmarks
+
+# Pose neutra, de pé e de frente para a câmara, em coordenadas normalizadas do
+# frame. Só os marcos usados pelos exercícios têm posições realistas; os da face
+# ficam agrupados em torno do nariz.
+_NEUTRAL_POSE = {
+    0: (0.50, 0.12),
+    11: (0.42, 0.25), 12: (0.58, 0.25),
+    13: (0.38, 0.38), 14: (0.62, 0.38),
+    15: (0.36, 0.50), 16: (0.64, 0.50),
+    23: (0.45, 0.52), 24: (0.55, 0.52),
+    25: (0.45, 0.70), 26: (0.55, 0.70),
+    27: (0.45, 0.88), 28: (0.55, 0.88),
+}
+
+# Segmentos desenhados nos frames sintéticos.
+_SKELETON = ((11, 12), (11, 13), (13, 15), (12, 14), (14, 16), (11, 23), (12, 24), (23, 24),
+             (23, 25), (25, 27), (24, 26), (26, 28))
+
+# Tamanho, em frações do frame, dos segmentos da articulação principal.
+_SEGMENT = 0.18
+
+
+def neutral_pose() -> np.ndarray:
+    """Cria o array de marcos da pose neutra.
+
+    :return (numpy.ndarray): O array float32 (33, 4) com todos os marcos visíveis.
+    """
+    points = empty_landmarks()
+    points[:] = (0.5, 0.12, 0.0, 1.0)
+    for index, (x, y) in _NEUTRAL_POSE.items():
+        points[index, X] = x
+        points[index, Y] = y
+    return points
+
+
+def synthetic_landmarks(exercise_type: str, frames: int = 300, fps: float = 30.0, rep_seconds: float = 2.0,
+                        noise: float = 0.002, seed: int = 0) -> np.ndarray:
+    """Gera uma sequência de marcos de um exercício com repetições regulares.
+
+    O ângulo da articulação principal oscila entre 10 graus acima de `angle_max`
+    e 10 graus abaixo de `angle_min` do exercício, com ruído gaussiano nos marcos
+    como o do MediaPipe. Com a mesma semente a sequência é sempre a mesma, para
+    que os resultados sejam comparáveis entre commits.
+
+    :param (str) exercise_type: O exercício ('squat', 'push_up', 'hammer_curl').
+    :param (int) frames: O número de frames da sequência.
+    :param (float) fps: A taxa de frames simulada.
+    :param (float) rep_seconds: A duração de cada repetição, em segundos.
+    :param (float) noise: O desvio padrão do ruído das coordenadas, em frações do frame.
+    :param (int) seed: A semente do gerador de ruído.
+    :return (numpy.ndarray): O array float32 (frames, 33, 4) de marcos.
+    """
+    exercise = EXERCISES[exercise_type]
+    a, b, c = exercise.angle
+    high = min(exercise.angle_max + 10.0, 180.0)
+    low = max(exercise.angle_min - 10.0, 0.0)
+    rng = np.random.default_rng(seed)
+    base = neutral_pose()
+    sequence = np.repeat(base[np.newaxis], frames, axis=0)
+    for index in range(frames):
+        phase = 2.0 * math.pi * index / (fps * rep_seconds)
+        angle = math.radians(low + (high - low) * (1.0 + math.cos(phase)) / 2.0)
+        points = sequence[index]
+        # O segmento a-b fica fixo (na vertical, com 'a' acima do vértice) e o
+        # segmento b-c roda até formar o ângulo pretendido.
+        bx, by = points[b, X], points[b, Y]
+        points[a, X], points[a, Y] = bx, by - _SEGMENT
+        points[c, X], points[c, Y] = bx + _SEGMENT * math.sin(angle), by - _SEGMENT * math.cos(angle)
+    sequence[:, :, :VISIBILITY] += rng.normal(0.0, noise, size=(frames, NUM_LANDMARKS, VISIBILITY)).astype(np.float32)
+    return sequence
+
+
+def render_frame(points: np.ndarray, width: int = 640, height: int = 480, seed: int = 0) -> np.ndarray:
+    """Desenha uma pose como um boneco de traços sobre um fundo com ruído.
+
+    Os frames sintéticos servem para medir a decodificação, a conversão de cores
+    e o custo da inferência; para medir também a qualidade da deteção, use frames
+    gravados (`load_recording`).
+
+    :param (numpy.ndarray) points: O array (33, 4) de marcos a desenhar.
+    :param (int) width: A largura do frame, em píxeis.
+    :param (int) height: A altura do frame, em píxeis.
+    :param (int) seed: A semente do ruído do fundo.
+    :return (numpy.ndarray): O frame BGR.
+    """
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(90, 140, size=(height, width, 3), dtype=np.uint8)
+    pixels = [(int(x * width), int(y * height)) for x, y in points[:, :2].tolist()]
+    thickness = max(width // 60, 2)
+    for start, end in _SKELETON:
+        cv2.line(frame, pixels[start], pixels[end], (40, 60, 200), thickness)
+    cv2.circle(frame, pixels[0], thickness * 3, (60, 140, 220), -1)
+    return frame
+
+
+def encode_frames(sequence: np.ndarray, width: int = 640, height: int = 480, quality: int = 80) -> list:
+    """Desenha e codifica em JPEG cada pose de uma sequência.
+
+    :param (numpy.ndarray) sequence: O array (frames, 33, 4) de marcos.
+    :param (int) width: A largura dos frames, em píxeis.
+    :param (int) height: A altura dos frames, em píxeis.
+    :param (int) quality: A qualidade JPEG (0 a 100).
+    :return (list): Os bytes JPEG de cada frame.
+    """
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+    encoded = []
+    for index, points in enumerate(sequence):
+        ok, buffer = cv2.imencode(".jpg", render_frame(points, width, height, seed=index), params)
+        if not ok:
+            raise ValueError("Não foi possível codificar o frame sintético.")
+        encoded.append(buffer.tobytes())
+    return encoded
+
+
+def save_recording(path: str, exercise_type: str, frames: list, landmarks: np.ndarray, fps: float):
+    """Grava uma sequência de frames JPEG e dos respetivos marcos num ficheiro .npz.
+
+    Os frames são guardados concatenados, com os seus deslocamentos, para que o
+    ficheiro não precise de pickle.
+
+    :param (str) path: O caminho do ficheiro a criar.
+    :param (str) exercise_type: O exercício gravado.
+    :param (list) frames: Os bytes JPEG de cada frame.
+    :param (numpy.ndarray) landmarks: O array (frames, 33, 4) de marcos; NaN nos frames sem corpo.
+    :param (float) fps: A taxa de frames da gravação.
+    :return: None
+    """
+    offsets = np.cumsum([0] + [len(frame) for frame in frames], dtype=np.int64)
+    np.savez_compressed(
+        path,
+        exercise_type=np.array(exercise_type),
+        fps=np.array(fps),
+        jpeg=np.frombuffer(b"".join(frames), dtype=np.uint8),
+        offsets=offsets,
+        landmarks=landmarks.astype(np.float32),
+    )
+
+
+def load_recording(path: str) -> dict:
+    """Lê uma gravação criada por `save_recording`.
+
+    :param (str) path: O caminho do ficheiro .npz.
+    :return (dict): O exercício ('exercise_type'), a taxa de frames ('fps'), os bytes JPEG de cada
+        frame ('frames') e o array de marcos ('landmarks').
+    """
+    with np.load(path) as data:
+        jpeg = data["jpeg"].tobytes()
+        offsets = data["offsets"].tolist()
+        return {
+            "exercise_type": str(data["exercise_type"]),
+            "fps": float(data["fps"]),
+            "frames": [jpeg[start:end] for start, end in zip(offsets, offsets[1:])],
+            "landmarks": data["landmarks"],
+        }
@@ -0,0 +1,485 @@
+"""
+@file pose_pipeline.py
+@brief Benchmark do pipeline de pose: tempos por etapa, débito com 1..N workers, percentis de latência e
+       custo de precisão da amostragem adaptativa.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+
+Uso (a partir de Codigos/backend):
+
+    python -m benchmarks.pose_pipeline run --output base.json
+    python -m benchmarks.pose_pipeline run --fixture squat.npz --workers 1,2,4 --output novo.json
+    python -m benchmarks.pose_pipeline compare base.json novo.json --threshold 0.10
+    python -m benchmarks.pose_pipeline record --video treino.mp4 --exercise squat --output squat.npz
+
+O 'compare' termina com código 1 quando alguma etapa, o débito ou a amostragem
+adaptativa (fração de frames inferidos e erro do ângulo) piora mais do que o
+limiar, para poder ser usado num pipeline de CI.
+"""
+
+import argparse
+import base64
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+EXERCISE_TYPES = ("squat", "push_up", "hammer_curl")
+
+# Janela de recorte usada na etapa de conversão dos marcos, para medir também o
+# remapeamento para as coordenadas do frame completo.
+_BENCH_WINDOW = (0.1, 0.1, 0.8, 0.8)
+
+
+def _configure_environment(workers):
+    """Ajusta as configurações do serviço de pose para o benchmark, antes de o importar.
+
+    O pool tem um estimador por worker, e a cache de resultados e o controlador
+    de carga ficam desativados, para que os tempos meçam sempre o pipeline
+    completo. Variáveis de ambiente já definidas prevalecem.
+
+    :param (list) workers: Os números de workers a medir.
+    :return: None
+    """
+    os.environ.setdefault("POSE_POOL_SIZE", str(max(workers)))
+    os.environ.setdefault("POSE_CACHE_SIZE", "0")
+    os.environ.setdefault("POSE_LOAD_SHEDDING", "false")
+
+
+def summarize(samples) -> dict:
+    """Resume uma lista de durações.
+
+    :param (list) samples: As durações, em segundos.
+    :return (dict): O número de amostras e a média e os percentis 50, 95 e 99, em microssegundos.
+    """
+    values = np.asarray(samples, dtype=np.float64) * 1e6
+    p50, p95, p99 = np.percentile(values, (50, 95, 99)).tolist()
+    return {"n": len(samples), "mean_us": float(values.mean()), "p50_us": p50, "p95_us": p95, "p99_us": p99}
+
+
+def time_each(func, items, warmup: int = 0) -> list:
+    """Mede a duração de uma função aplicada a cada item.
+
+    :param (callable) func: A função a medir, com um único argumento.
+    :param (list) items: Os argumentos de cada chamada.
+    :param (int) warmup: O número de chamadas iniciais não medidas.
+    :return (list): A duração de cada chamada, em segundos.
+    """
+    for item in items[:warmup]:
+        func(item)
+    clock = time.perf_counter
+    durations = []
+    for item in items:
+        started = clock()
+        func(item)
+        durations.append(clock() - started)
+    return durations
+
+
+def load_fixtures(args) -> dict:
+    """Carrega os frames e as sequências de marcos do benchmark.
+
+    Com `--fixture`, os frames e os marcos do exercício gravado vêm do ficheiro;
+    os restantes exercícios usam sempre sequências sintéticas.
+
+    :param (argparse.Namespace) args: Os argumentos da linha de comandos.
+    :return (dict): O exercício dos frames ('exercise_type'), a taxa de frames ('fps'), os bytes JPEG
+        ('frames') e as sequências de marcos por exercício ('landmarks').
+    """
+    from benchmarks import fixtures
+
+    landmarks = {
+        exercise_type: fixtures.synthetic_landmarks(exercise_type, frames=args.frames, seed=args.seed)
+        for exercise_type in EXERCISE_TYPES
+    }
+    if args.fixture:
+        recording = fixtures.load_recording(args.fixture)
+        recorded = recording["landmarks"]
+        landmarks[recording["exercise_type"]] = recorded[~np.isnan(recorded).any(axis=(1, 2))]
+        return {
+            "source": os.path.basename(args.fixture),
+            "exercise_type": recording["exercise_type"],
+            "fps": recording["fps"],
+            "frames": recording["frames"],
+            "landmarks": landmarks,
+        }
+    return {
+        "source": f"synthetic {args.width}x{args.height} seed={args.seed}",
+        "exercise_type": args.exercise,
+        "fps": 30.0,
+        "frames": fixtures.encode_frames(landmarks[args.exercise], args.width, args.height),
+        "landmarks": landmarks,
+    }
+
+
+def bench_stages(data: dict, args) -> dict:
+    """Mede cada etapa do pipeline isoladamente.
+
+    :param (dict) data: Os dados devolvidos por `load_fixtures`.
+    :param (argparse.Namespace) args: Os argumentos da linha de comandos.
+    :return (dict): O resumo (`summarize`) de cada etapa, indexado pelo nome da etapa.
+    """
+    from app.services import pose_estimation_service as service
+    from app.services.result_encoding import BINARY_MEDIA_TYPE, JSON_MEDIA_TYPE, ResultEncoder
+    from exercises.definitions import EXERCISES
+    from exercises.landmarks import Landmark, empty_landmarks, landmarks_to_array
+
+    stages = {}
+    frames = data["frames"]
+    encoded = [base64.b64encode(frame).decode("ascii") for frame in frames]
+    stages["b64_decode"] = time_each(base64.b64decode, encoded, args.warmup)
+    stages["imdecode"] = time_each(service.decode_frame, frames, args.warmup)
+
+    decoded = [service.decode_frame(frame) for frame in frames]
+    stages["preprocess"] = time_each(lambda frame: service.frame_preprocessor.prepare(frame), decoded, args.warmup)
+    images = [service.frame_preprocessor.prepare(frame)[0] for frame in decoded]
+    stages["cvtColor"] = time_each(lambda image: cv2.cvtColor(image, cv2.COLOR_BGR2RGB), images, args.warmup)
+
+    if not args.skip_model:
+        estimator = service.create_pose_estimator(service.select_profile(args.profile, dedicated=True))
+        try:
+            rgb_images = [cv2.cvtColor(image, cv2.COLOR_BGR2RGB) for image in images]
+            stages["mediapipe"] = time_each(estimator.pose.process, rgb_images, args.warmup)
+        finally:
+            estimator.close()
+
+    # Os marcos do MediaPipe chegam como objetos com atributos: a etapa mede a
+    # conversão para o array compacto, o remapeamento do recorte e a caixa do corpo.
+    buffer = empty_landmarks()
+    mediapipe_like = [[Landmark(*row) for row in points.tolist()] for points in data["landmarks"][data["exercise_type"]]]
+
+    def convert(landmarks):
+        points = landmarks_to_array(landmarks, out=buffer)
+        service.frame_preprocessor.to_frame_coords(points, _BENCH_WINDOW)
+        service.frame_preprocessor.bounding_box(points)
+
+    stages["landmarks"] = time_each(convert, mediapipe_like, args.warmup)
+
+    def tracking_closure(tracker, results):
+        """Cria a função medida de um rastreador, que guarda em `results` o resultado de cada frame."""
+        timestamps = itertools.count()
+
+        def track(points):
+            counter, _, stage, feedback, landmarks_to_draw, progress = tracker.track(points, None, next(timestamps) / data["fps"])
+            results.append({
+                "counter": counter, "stage": stage, "feedback": feedback,
+                "landmarks": landmarks_to_draw, "progress": progress, "dropped_frames": 0,
+            })
+
+        return track
+
+    for exercise_type in EXERCISE_TYPES:
+        sequence = list(data["landmarks"][exercise_type])
+        # O aquecimento usa um rastreador descartável: a passagem medida começa com
+        # um rastreador novo e só os seus resultados são serializados.
+        warmup_track = tracking_closure(service.create_tracker(EXERCISES[exercise_type]), [])
+        for points in sequence[:args.warmup]:
+            warmup_track(points)
+        results = []
+        track = tracking_closure(service.create_tracker(EXERCISES[exercise_type]), results)
+        stages[f"tracking.{exercise_type}"] = time_each(track, sequence)
+        for name, media_type in (("json", JSON_MEDIA_TYPE), ("binary", BINARY_MEDIA_TYPE)):
+            encoder = ResultEncoder(exercise_type, media_type)
+            stages[f"serialize_{name}.{exercise_type}"] = time_each(encoder.encode, results, args.warmup)
+
+    return {name: summarize(samples) for name, samples in stages.items()}
+
+
+def bench_adaptive(data: dict) -> dict:
+    """Mede o que a amostragem adaptativa poupa e o que custa em precisão, por exercício.
+
+    Cada sequência de marcos é reproduzida com `compare_with_full_rate`, com os
+    parâmetros POSE_ADAPTIVE_* do servidor: a fração de frames inferidos é a
+    poupança no MediaPipe, e o erro do ângulo e as contagens dos dois modos são
+    o seu custo.
+
+    :param (dict) data: Os dados devolvidos por `load_fixtures`.
+    :return (dict): O resultado de `compare_with_full_rate`, indexado pelo tipo de exercício.
+    """
+    from app.core.config import settings
+    from app.services import pose_estimation_service as service
+    from exercises.adaptive_sampling import compare_with_full_rate
+    from exercises.definitions import EXERCISES
+
+    results = {}
+    for exercise_type in EXERCISE_TYPES:
+        sequence = data["landmarks"][exercise_type]
+        results[exercise_type] = compare_with_full_rate(
+            list(sequence),
+            [index / data["fps"] for index in range(len(sequence))],
+            lambda: service.create_tracker(EXERCISES[exercise_type]),
+            velocity_threshold=settings.POSE_ADAPTIVE_VELOCITY_THRESHOLD,
+            threshold_margin=settings.POSE_ADAPTIVE_THRESHOLD_MARGIN,
+            max_skip=settings.POSE_ADAPTIVE_MAX_SKIP,
+        )
+    return results
+
+
+def bench_throughput(data: dict, workers: int, args) -> dict:
+    """Mede o débito e a latência de `analyze_exercise_frame` com vários workers em paralelo.
+
+    Cada worker envia os frames por ordem para a sua própria sessão, como um
+    cliente, e todas as chamadas passam pelo pipeline completo (base64,
+    decodificação, pré-processamento, MediaPipe, rastreamento).
+
+    :param (dict) data: Os dados devolvidos por `load_fixtures`.
+    :param (int) workers: O número de workers em paralelo.
+    :param (argparse.Namespace) args: Os argumentos da linha de comandos.
+    :return (dict): O número de workers, os frames por segundo e os percentis da latência.
+    """
+    from app.services import pose_estimation_service as service
+
+    encoded = [base64.b64encode(frame).decode("ascii") for frame in data["frames"]]
+    exercise_type = data["exercise_type"]
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(workers + 1)
+
+    def client(worker):
+        session_id = f"bench-{workers}-{worker}"
+        own = []
+        for index in range(args.warmup):
+            service.analyze_exercise_frame(exercise_type, encoded[index % len(encoded)], "benchmark", session_id, args.profile)
+        barrier.wait()
+        for index in range(args.frames_per_worker):
+            started = time.perf_counter()
+            service.analyze_exercise_frame(exercise_type, encoded[index % len(encoded)], "benchmark", session_id, args.profile)
+            own.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(own)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(client, worker) for worker in range(workers)]
+        barrier.wait()
+        started = time.perf_counter()
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+
+    summary = summarize(latencies)
+    return {
+        "workers": workers,
+        "fps": len(latencies) / elapsed,
+        "p50_ms": summary["p50_us"] / 1000.0,
+        "p95_ms": summary["p95_us"] / 1000.0,
+        "p99_ms": summary["p99_us"] / 1000.0,
+    }
+
+
+def _git_commit() -> str:
+    """Obtém o commit atual do repositório, marcado com '+' se houver alterações por gravar."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return commit + ("+" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def _metadata(data: dict, args) -> dict:
+    """Descreve o ambiente e as configurações do benchmark, para comparar execuções."""
+    from app.core.config import settings
+
+    try:
+        import mediapipe
+        mediapipe_version = mediapipe.__version__
+    except ImportError:
+        mediapipe_version = None
+    return {
+        "commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "mediapipe": mediapipe_version,
+        "fixture": data["source"],
+        "exercise_type": data["exercise_type"],
+        "frames": len(data["frames"]),
+        "profile": args.profile or settings.POSE_MODEL_PROFILE,
+        "max_input_side": settings.POSE_MAX_INPUT_SIDE,
+        "pool_size": settings.POSE_POOL_SIZE,
+        "smoothing": settings.POSE_SMOOTHING,
+        "adaptive_velocity_threshold": settings.POSE_ADAPTIVE_VELOCITY_THRESHOLD,
+        "adaptive_threshold_margin": settings.POSE_ADAPTIVE_THRESHOLD_MARGIN,
+        "adaptive_max_skip": settings.POSE_ADAPTIVE_MAX_SKIP,
+    }
+
+
+def print_report(report: dict):
+    """Mostra um relatório do benchmark em forma de tabela."""
+    meta = report["meta"]
+    print(f"commit {meta['commit']}  python {meta['python']}  cpus {meta['cpu_count']}  fixture {meta['fixture']}")
+    print(f"{'etapa':<28}{'n':>7}{'média us':>12}{'p50 us':>12}{'p95 us':>12}{'p99 us':>12}")
+    for name, stage in report["stages"].items():
+        print(f"{name:<28}{stage['n']:>7}{stage['mean_us']:>12.1f}{stage['p50_us']:>12.1f}"
+              f"{stage['p95_us']:>12.1f}{stage['p99_us']:>12.1f}")
+    print(f"\n{'amostragem adaptativa':<28}{'inferidos':>12}{'erro médio':>12}{'erro máx.':>12}{'reps':>12}")
+    for exercise_type, row in report["adaptive"].items():
+        reps = f"{row['adaptive_count']}/{row['full_rate_count']}"
+        print(f"{exercise_type:<28}{row['inference_ratio']:>12.1%}{row['mean_angle_error']:>12.2f}"
+              f"{row['max_angle_error']:>12.2f}{reps:>12}")
+    if report["throughput"]:
+        print(f"\n{'workers':<28}{'fps':>12}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+        for row in report["throughput"]:
+            print(f"{row['workers']:<28}{row['fps']:>12.1f}{row['p50_ms']:>12.2f}{row['p95_ms']:>12.2f}{row['p99_ms']:>12.2f}")
+
+
+def run(args) -> int:
+    """Executa o benchmark e grava o relatório em JSON, se pedido."""
+    _configure_environment(args.workers)
+    data = load_fixtures(args)
+    report = {
+        "meta": _metadata(data, args),
+        "stages": bench_stages(data, args),
+        "adaptive": bench_adaptive(data),
+        "throughput": [],
+    }
+    if not args.skip_model:
+        report["throughput"] = [bench_throughput(data, workers, args) for workers in args.workers]
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+    return 0
+
+
+def compare(args) -> int:
+    """Compara dois relatórios e assinala as regressões acima do limiar.
+
+    Nas etapas compara o p50 e o p95 (maior é pior); no débito compara os frames
+    por segundo (menor é pior) para cada número de workers presente nos dois; na
+    amostragem adaptativa compara a fração de frames inferidos, o erro médio e
+    máximo do ângulo e a diferença entre as contagens (maior é pior).
+
+    :return (int): 1 se houver regressões, 0 caso contrário.
+    """
+    with open(args.base, encoding="utf-8") as base_file, open(args.new, encoding="utf-8") as new_file:
+        base, new = json.load(base_file), json.load(new_file)
+    print(f"base {base['meta']['commit']}  novo {new['meta']['commit']}  limiar {args.threshold:.0%}")
+    rows = []
+    for name in base["stages"].keys() & new["stages"].keys():
+        for metric in ("p50_us", "p95_us"):
+            rows.append((f"{name} {metric}", base["stages"][name][metric], new["stages"][name][metric], False))
+    base_rows = {row["workers"]: row for row in base["throughput"]}
+    for row in new["throughput"]:
+        if row["workers"] in base_rows:
+            rows.append((f"throughput x{row['workers']} fps", base_rows[row["workers"]]["fps"], row["fps"], True))
+    base_adaptive, new_adaptive = base.get("adaptive", {}), new.get("adaptive", {})
+    for exercise_type in base_adaptive.keys() & new_adaptive.keys():
+        old_row, new_row = base_adaptive[exercise_type], new_adaptive[exercise_type]
+        for metric in ("inference_ratio", "mean_angle_error", "max_angle_error"):
+            rows.append((f"adaptive.{exercise_type} {metric}", old_row[metric], new_row[metric], False))
+        rows.append((
+            f"adaptive.{exercise_type} count_error",
+            abs(old_row["adaptive_count"] - old_row["full_rate_count"]),
+            abs(new_row["adaptive_count"] - new_row["full_rate_count"]),
+            False,
+        ))
+
+    regressions = 0
+    print(f"{'métrica':<40}{'base':>12}{'novo':>12}{'variação':>10}")
+    for name, old, value, higher_is_better in sorted(rows):
+        if old:
+            change = (value - old) / old
+        else:
+            # Sem valor de base (ex.: nenhuma repetição perdida), qualquer piora é uma regressão.
+            change = float("inf") if value > old else 0.0
+        regressed = (-change if higher_is_better else change) > args.threshold
+        regressions += regressed
+        print(f"{name:<40}{old:>12.1f}{value:>12.1f}{change:>+10.1%}{'  REGRESSÃO' if regressed else ''}")
+    print(f"\n{regressions} regressões acima de {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def record(args) -> int:
+    """Grava um vídeo como fixture: os frames em JPEG e os marcos detetados pelo MediaPipe."""
+    from benchmarks import fixtures
+    from exercises.estimation import PoseEstimator
+    from exercises.landmarks import empty_landmarks, landmarks_to_array
+
+    capture = cv2.VideoCapture(args.video)
+    if not capture.isOpened():
+        print(f"Não foi possível abrir o vídeo: {args.video}", file=sys.stderr)
+        return 1
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    estimator = PoseEstimator(args.profile or "full")
+    frames, landmarks = [], []
+    try:
+        while len(frames) < args.max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+            frames.append(buffer.tobytes())
+            results = estimator.estimate_pose(frame)
+            points = empty_landmarks()
+            if results.pose_landmarks:
+                landmarks_to_array(results.pose_landmarks.landmark, out=points)
+            else:
+                points[:] = np.nan
+            landmarks.append(points)
+    finally:
+        capture.release()
+        estimator.close()
+    if not frames:
+        print("O vídeo não tem frames.", file=sys.stderr)
+        return 1
+    fixtures.save_recording(args.output, args.exercise, frames, np.stack(landmarks), fps)
+    print(f"{len(frames)} frames gravados em {args.output}")
+    return 0
+
+
+def main(argv=None) -> int:
+    """Interpreta a linha de comandos e executa o subcomando pedido."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.pose_pipeline", description="Benchmark do pipeline de pose.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="executa o benchmark")
+    run_parser.add_argument("--fixture", help="gravação .npz criada com 'record'; por omissão, frames sintéticos")
+    run_parser.add_argument("--exercise", choices=EXERCISE_TYPES, default="squat", help="exercício dos frames sintéticos")
+    run_parser.add_argument("--frames", type=int, default=300, help="frames das sequências sintéticas")
+    run_parser.add_argument("--width", type=int, default=640)
+    run_parser.add_argument("--height", type=int, default=480)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--profile", help="perfil do modelo de pose; por omissão, POSE_MODEL_PROFILE")
+    run_parser.add_argument("--workers", type=lambda value: [int(n) for n in value.split(",")], default=[1, 2, 4],
+                            help="números de workers do teste de débito, separados por vírgulas")
+    run_parser.add_argument("--frames-per-worker", type=int, default=100)
+    run_parser.add_argument("--warmup", type=int, default=10, help="chamadas iniciais não medidas em cada etapa")
+    run_parser.add_argument("--skip-model", action="store_true", help="não mede o MediaPipe nem o débito")
+    run_parser.add_argument("--output", help="ficheiro JSON onde gravar o relatório")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="compara dois relatórios")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="variação máxima aceite (0.10 = 10%%)")
+    compare_parser.set_defaults(handler=compare)
+
+    record_parser = commands.add_parser("record", help="grava um vídeo como fixture")
+    record_parser.add_argument("--video", required=True)
+    record_parser.add_argument("--exercise", choices=EXERCISE_TYPES, required=True)
+    record_parser.add_argument("--output", required=True)
+    record_parser.add_argument("--max-frames", type=int, default=600)
+    record_parser.add_argument("--profile")
+    record_parser.set_defaults(handler=record)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+@file adaptive_sampling.py
+@brief Decide quando a inferência de pose pode ser saltada, extrapolando os marcos entre inferências.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+import numpy as np
+
+from .landmarks import empty_landmarks, landmarks_to_array
+
+
+class AdaptiveSampler:
+    """Amostragem adaptativa da inferência de pose para o rastreamento de repetições.
+
+    A contagem só precisa de um sinal de ângulo suave. Enquanto o ângulo da
+    articulação muda devagar e está longe dos limiares `angle_min`/`angle_max`
+    do rastreador, os marcos do frame são extrapolados linearmente a partir das
+    duas últimas inferências, em vez de executar o MediaPipe. A inferência volta
+    a correr sempre que o movimento acelera, o ângulo se aproxima de um limiar,
+    foram saltados `max_skip` frames seguidos ou a última inferência é antiga.
+
+    Attributes:
+        velocity_threshold (float): Velocidade angular (graus/s) a partir da qual todos os frames são inferidos.
+        threshold_margin (float): Distância (graus) a um limiar dentro da qual todos os frames são inferidos.
+        max_skip (int): Número máximo de frames seguidos sem inferência.
+        max_horizon (float): Tempo máximo (s) de extrapolação desde a última inferência.
+        inferred (int): Número de frames com inferência.
+        interpolated (int): Número de frames com marcos extrapolados.
+    """
+    def __init__(self, velocity_threshold: float = 120.0, threshold_margin: float = 10.0, max_skip: int = 2, max_horizon: float = 0.3):
+        """Inicializa o amostrador sem histórico (o primeiro frame é sempre inferido).
+
+        :param (float) velocity_threshold: Velocidade angular, em graus/s, que obriga à inferência.
+        :param (float) threshold_margin: Distância a um limiar, em graus, que obriga à inferência.
+        :param (int) max_skip: Número máximo de frames seguidos sem inferência.
+        :param (float) max_horizon: Tempo máximo de extrapolação, em segundos.
+        """
+        self.velocity_threshold = velocity_threshold
+        self.threshold_margin = threshold_margin
+        self.max_skip = max_skip
+        self.max_horizon = max_horizon
+        self.inferred = 0
+        self.interpolated = 0
+        self._previous = None
+        self._last = None
+        self._angle = None
+        self._velocity = 0.0
+        self._skipped = 0
+
+    def should_infer(self, now: float, angle_min: float, angle_max: float) -> bool:
+        """Indica se o frame que chega em `now` precisa de inferência.
+
+        :param (float) now: O instante de chegada do frame, em segundos.
+        :param (float) angle_min: O limiar inferior do rastreador.
+        :param (float) angle_max: O limiar superior do rastreador.
+        :return (bool): True se o MediaPipe deve ser executado neste frame.
+        """
+        if self._previous is None or self._angle is None:
+            return True
+        if self._skipped >= self.max_skip:
+            return True
+        last_time = self._last[0]
+        if now - last_time > self.max_horizon or now <= last_time:
+            return True
+        if abs(self._velocity) >= self.velocity_threshold:
+            return True
+        predicted = self._angle + self._velocity * (now - last_time)
+        return min(abs(predicted - angle_min), abs(predicted - angle_max)) <= self.threshold_margin
+
+    def observe(self, now: float, landmarks, angle: float):
+        """Regista os marcos e o ângulo de um frame inferido.
+
+        Os marcos são copiados para o array do histórico que deixou de ser
+        necessário, sem novas alocações depois das duas primeiras inferências.
+
+        :param (float) now: O instante do frame, em segundos.
+        :param (numpy.ndarray) landmarks: O array (33, 4) de marcos detetados no frame.
+        :param (float) angle: O ângulo principal calculado pelo rastreador.
+        :return: None
+        """
+        if self._last is not None and self._angle is not None and now > self._last[0]:
+            self._velocity = (angle - self._angle) / (now - self._last[0])
+        buffer = self._previous[1] if self._previous is not None else empty_landmarks()
+        np.copyto(buffer, landmarks_to_array(landmarks))
+        self._previous = self._last
+        self._last = (now, buffer)
+        self._angle = angle
+        self._skipped = 0
+        self.inferred += 1
+
+    def extrapolate(self, now: float):
+        """Estima os marcos no instante `now` a partir das duas últimas inferências.
+
+        :param (float) now: O instante do frame sem inferência, em segundos.
+        :return (numpy.ndarray): O array (33, 4) de marcos extrapolados.
+        """
+        (t0, points0), (t1, points1) = self._previous, self._last
+        factor = (now - t1) / (t1 - t0) if t1 > t0 else 0.0
+        self._skipped += 1
+        self.interpolated += 1
+        points = np.subtract(points1, points0)
+        points *= factor
+        points += points1
+        return points
+
+    def reset(self):
+        """Descarta o histórico, por exemplo quando o corpo deixa de ser detetado.
+
+        :return: None
+        """
+        self._previous = None
+        self._last = None
+        self._angle = None
+        self._velocity = 0.0
+        self._skipped = 0
+
+
+def compare_with_full_rate(landmark_frames, timestamps, tracker_factory, **sampler_options):
+    """Mede a precisão da amostragem adaptativa contra o processamento de todos os frames.
+
+    Reproduz uma sequência gravada de marcos duas vezes, cada uma com o seu
+    rastreador: uma com todos os frames e outra com o `AdaptiveSampler`, usando
+    os marcos gravados nos frames que seriam inferidos e os extrapolados nos
+    restantes. Ambos os rastreadores recebem o instante de cada frame, para que
+    a suavização veja o mesmo tempo que na gravação.
+
+    :param (list) landmark_frames: Os marcos (arrays (33, 4) ou listas de marcos) de cada frame da gravação.
+    :param (list) timestamps: O instante, em segundos, de cada frame.
+    :param (callable) tracker_factory: Função sem argumentos que cria um `ExerciseTracker`
+        (ex.: `lambda: create_tracker(EXERCISES["squat"])`).
+    :param sampler_options: Parâmetros repassados ao `AdaptiveSampler`.
+    :return (dict): As contagens de ambos os modos, a fração de frames inferidos e o
+        erro absoluto médio e máximo do ângulo, em graus.
+    """
+    full_tracker, adaptive_tracker = tracker_factory(), tracker_factory()
+    sampler = AdaptiveSampler(**sampler_options)
+    errors = []
+    for landmarks, now in zip(landmark_frames, timestamps):
+        landmarks = landmarks_to_array(landmarks)
+        full_angle = full_tracker.track(landmarks, None, now)[1]
+        if sampler.should_infer(now, adaptive_tracker.angle_min, adaptive_tracker.angle_max):
+            angle = adaptive_tracker.track(landmarks, None, now)[1]
+            sampler.observe(now, landmarks, angle)
+        else:
+            angle = adaptive_tracker.track(sampler.extrapolate(now), None, now)[1]
+        errors.append(abs(angle - full_angle))
+
+    total = max(len(errors), 1)
+    return {
+        "full_rate_count": full_tracker.counter,
+        "adaptive_count": adaptive_tracker.counter,
+        "inference_ratio": sampler.inferred / total,
+        "mean_angle_error": float(np.mean(errors)) if errors else 0.0,
+        "max_angle_error": float(np.max(errors)) if errors else 0.0,
+    }
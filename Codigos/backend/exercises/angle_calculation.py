@@ -1,6 +1,6 @@
 """
 @file angle_calculation.py
-@brief Fornece uma função para calcular o ângulo entre três pontos 2D.
+@brief Fornece funções para calcular ângulos entre três pontos 2D, individualmente ou em lote.
 @author André Luis Aguiar do Nascimento
 @author Hugo Samuel de Lima Oliveira
 @author Leonardo Sampaio Serra
@@ -9,6 +9,21 @@
 """
 import math
 
+import numpy as np
+
+# Articulações mais usadas, definidas como trios de índices dos marcos do MediaPipe
+# (ponto A, vértice B, ponto C). Os lados seguem a convenção do MediaPipe.
+JOINTS = {
+    "left_elbow": (11, 13, 15),
+    "right_elbow": (12, 14, 16),
+    "left_shoulder": (13, 11, 23),
+    "right_shoulder": (14, 12, 24),
+    "left_hip": (11, 23, 25),
+    "right_hip": (12, 24, 26),
+    "left_knee": (23, 25, 27),
+    "right_knee": (24, 26, 28),
+}
+
 def calculate_angle(a, b, c):
     """Calcula o ângulo formado por três pontos (a, b, c), com 'b' sendo o vértice.
 
@@ -45,3 +60,40 @@ def calculate_angle(a, b, c):
     # Converte o ângulo de radianos para graus
     angle = math.degrees(math.acos(cosine_angle))
     return angle
+
+
+def calculate_angles(points, joints=None):
+    """Calcula vários ângulos de uma só vez a partir de um array de marcos.
+
+    Versão vetorizada de `calculate_angle`, com as mesmas operações em float64.
+    Os resultados coincidem com os da versão escalar a menos do último bit do
+    arco-cosseno (diferenças da ordem de 1e-11 graus entre o `np.arccos` e o
+    `math.acos`). Serve tanto para todas as articulações de um frame, com `points`
+    de forma (33, 2), como para uma gravação inteira, com `points` de forma (N, 33, 2).
+
+    :param (numpy.ndarray) points: As coordenadas [x, y] dos marcos, com forma (..., 33, 2).
+    :param (list) joints: Trios de índices (a, b, c), com 'b' como vértice; por omissão, todos os de `JOINTS`.
+    :return (numpy.ndarray): Os ângulos em graus, com forma (..., len(joints)). Vale 0 quando um dos vetores é nulo.
+    """
+    if joints is None:
+        joints = list(JOINTS.values())
+    pts = np.asarray(points, dtype=np.float64)
+    idx = np.asarray(joints, dtype=np.intp).reshape(-1, 3)
+
+    # Vetores BA e BC de cada articulação, com forma (..., J, 2).
+    b = pts[..., idx[:, 1], :]
+    ba = pts[..., idx[:, 0], :] - b
+    bc = pts[..., idx[:, 2], :] - b
+
+    dot_product = ba[..., 0] * bc[..., 0] + ba[..., 1] * bc[..., 1]
+    magnitude_ba = np.sqrt(ba[..., 0] ** 2 + ba[..., 1] ** 2)
+    magnitude_bc = np.sqrt(bc[..., 0] ** 2 + bc[..., 1] ** 2)
+
+    degenerate = (magnitude_ba == 0) | (magnitude_bc == 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cosine_angle = dot_product / (magnitude_ba * magnitude_bc)
+    np.clip(cosine_angle, -1.0, 1.0, out=cosine_angle)
+
+    angles = np.degrees(np.arccos(cosine_angle))
+    angles[degenerate] = 0.0
+    return angles
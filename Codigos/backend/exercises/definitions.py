@@ -0,0 +1,69 @@
+"""
+@file definitions.py
+@brief Definições declarativas dos exercícios suportados, compiladas para o motor de exercícios.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+from .engine import CompiledExercise
+
+# Cada exercício é descrito apenas por dados:
+#   points: nome -> índice do marco do MediaPipe.
+#   angle: os três pontos (a, vértice, c) da articulação principal.
+#   angle_min / angle_max: limiares do estágio ativo e do estágio de repouso.
+#   stages: (estágio de repouso, estágio ativo); a repetição conta ao entrar no ativo.
+#   initial_stage / initial_feedback: estado de um rastreador novo.
+#   reset_feedback: limpa o feedback no início de cada frame.
+#   count_feedback / return_feedback: feedback ao contar e ao voltar ao repouso.
+#   rules: regras de feedback avaliadas por ordem (a última que se aplica prevalece),
+#       com 'joint' opcional (por omissão, o ângulo principal), 'above'/'below' e 'stage'.
+#   idle_feedback: feedback por estágio quando nenhum outro foi dado no frame.
+#   framing_feedback: feedback quando faltam marcos no frame.
+#   draw: pontos devolvidos para desenho (por omissão, todos os de 'points').
+EXERCISE_DEFINITIONS = {
+    "squat": {
+        "points": {"hip": 23, "knee": 25, "ankle": 27, "shoulder": 11},
+        "angle": ("hip", "knee", "ankle"),
+        "angle_min": 90,
+        "angle_max": 160,
+        "stages": ("up", "down"),
+        "reset_feedback": True,
+        "count_feedback": "Repetição completa!",
+        "rules": [
+            {"stage": "down", "above": 100, "feedback": "Desça mais para um agachamento completo."},
+            {"joint": ("shoulder", "hip", "knee"), "below": 70, "feedback": "Mantenha o peito aberto e as costas retas."},
+        ],
+        "idle_feedback": {"up": "Inicie o movimento", "down": "Suba com força!"},
+        "framing_feedback": "Enquadramento ruim! Posicione a câmera para que seu corpo inteiro (dos ombros aos pés) apareça.",
+    },
+    "push_up": {
+        "points": {
+            "shoulder_left": 11, "elbow_left": 13, "wrist_left": 15,
+            "shoulder_right": 12, "elbow_right": 14, "wrist_right": 16,
+        },
+        "angle": ("shoulder_left", "elbow_left", "wrist_left"),
+        "angle_min": 70,
+        "angle_max": 160,
+        "stages": ("up", "down"),
+        "initial_feedback": "Posição inicial",
+        "count_feedback": "Suba com força!",
+        "return_feedback": "Excelente! Prepare para a próxima.",
+    },
+    "hammer_curl": {
+        "points": {
+            "shoulder_left": 12, "elbow_left": 14, "wrist_left": 16,
+            "shoulder_right": 11, "elbow_right": 13, "wrist_right": 15,
+        },
+        "angle": ("shoulder_right", "elbow_right", "wrist_right"),
+        "angle_min": 30,
+        "angle_max": 160,
+        "stages": ("down", "up"),
+        "initial_feedback": "Inicie o movimento",
+        "count_feedback": "Desça de forma controlada",
+    },
+}
+
+# Definições compiladas uma única vez, no arranque.
+EXERCISES = {name: CompiledExercise(name, definition) for name, definition in EXERCISE_DEFINITIONS.items()}
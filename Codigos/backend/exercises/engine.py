@@ -0,0 +1,216 @@
+"""
+@file engine.py
+@brief Motor de exercícios declarativos: compila as definições e executa o rastreamento de repetições.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .angle_calculation import calculate_angle
+from .landmarks import X, Y, landmarks_to_array
+
+# Mensagem usada quando os marcos necessários não estão disponíveis no frame.
+DEFAULT_FRAMING_FEEDBACK = "Enquadramento ruim! Posicione a câmera para que seu corpo inteiro apareça."
+
+# Regra de feedback compilada: ângulo a avaliar (None para o ângulo principal),
+# limites opcionais, estágio em que se aplica e a mensagem.
+FeedbackRule = namedtuple("FeedbackRule", ["joint", "above", "below", "stage", "feedback"])
+
+# Casas decimais das coordenadas devolvidas para desenho (1e-5 do frame é
+# inferior a um píxel mesmo em 4K) e que mantêm o JSON curto.
+COORDINATE_DECIMALS = 5
+
+
+def _joint_angle(points, joint):
+    """Calcula o ângulo de uma articulação compilada a partir do array de marcos.
+
+    :param (numpy.ndarray) points: O array (33, 4) de marcos.
+    :param (tuple) joint: Os índices (a, b, c), com 'b' como vértice.
+    :return (float): O ângulo em graus.
+    """
+    a, b, c = joint
+    item = points.item
+    return calculate_angle((item(a, X), item(a, Y)), (item(b, X), item(b, Y)), (item(c, X), item(c, Y)))
+
+
+class CompiledExercise:
+    """Definição de exercício validada e convertida em índices de marcos.
+
+    A compilação ocorre uma única vez: os nomes dos pontos são resolvidos para
+    os índices do MediaPipe e as regras para tuplos, de modo que o rastreamento
+    de cada frame se limite a consultas por índice e comparações.
+
+    Attributes:
+        name (str): O identificador do exercício (ex.: 'squat').
+        angle (tuple): Os índices (a, b, c) da articulação principal, com 'b' como vértice.
+        angle_min (float): Ângulo abaixo do qual o movimento chega ao estágio ativo (conta uma repetição).
+        angle_max (float): Ângulo acima do qual o movimento volta ao estágio de repouso.
+        rest_stage (str): O estágio com o ângulo acima de `angle_max`.
+        active_stage (str): O estágio com o ângulo abaixo de `angle_min`.
+        initial_stage (str): O estágio de um rastreador novo.
+        initial_feedback (str): O feedback de um rastreador novo.
+        reset_feedback (bool): Limpa o feedback no início de cada frame.
+        count_feedback (str | None): Feedback ao contar uma repetição.
+        return_feedback (str | None): Feedback ao voltar do estágio ativo ao de repouso.
+        rules (tuple): As regras de feedback (`FeedbackRule`), avaliadas por ordem.
+        idle_feedback (dict): Feedback por estágio quando nenhum outro foi dado no frame.
+        framing_feedback (str): Feedback quando faltam marcos no frame.
+        draw_names (tuple): Os nomes dos pontos devolvidos para desenho.
+        draw_index (numpy.ndarray): Os índices dos marcos desses pontos.
+    """
+    def __init__(self, name: str, definition: dict):
+        """Valida e compila uma definição declarativa de exercício.
+
+        :param (str) name: O identificador do exercício.
+        :param (dict) definition: A definição, com os campos descritos em `exercises/definitions.py`.
+        :raises ValueError: Se a definição referir pontos inexistentes ou limites incoerentes.
+        """
+        points = definition["points"]
+
+        def resolve(joint):
+            try:
+                return tuple(points[point] for point in joint)
+            except KeyError as e:
+                raise ValueError(f"Exercício '{name}': ponto desconhecido {e}.")
+
+        self.name = name
+        self.angle = resolve(definition["angle"])
+        self.angle_min = definition["angle_min"]
+        self.angle_max = definition["angle_max"]
+        if self.angle_min >= self.angle_max:
+            raise ValueError(f"Exercício '{name}': angle_min deve ser menor do que angle_max.")
+        self.rest_stage, self.active_stage = definition["stages"]
+        self.initial_stage = definition.get("initial_stage", self.rest_stage)
+        self.initial_feedback = definition.get("initial_feedback", "")
+        self.reset_feedback = definition.get("reset_feedback", False)
+        self.count_feedback = definition.get("count_feedback")
+        self.return_feedback = definition.get("return_feedback")
+        self.rules = tuple(
+            FeedbackRule(
+                resolve(rule["joint"]) if "joint" in rule else None,
+                rule.get("above"),
+                rule.get("below"),
+                rule.get("stage"),
+                rule["feedback"],
+            )
+            for rule in definition.get("rules", ())
+        )
+        self.idle_feedback = dict(definition.get("idle_feedback", {}))
+        self.framing_feedback = definition.get("framing_feedback", DEFAULT_FRAMING_FEEDBACK)
+        self.draw_names = tuple(definition.get("draw", points))
+        self.draw_index = np.array([points[point] for point in self.draw_names], dtype=np.intp)
+        # Interpolação do progresso (100 em angle_min, 0 em angle_max), com as
+        # mesmas operações do `np.interp`.
+        self._slope = (0.0 - 100.0) / (self.angle_max - self.angle_min)
+
+    def progress(self, angle: float) -> float:
+        """Converte o ângulo principal na percentagem de progresso da repetição.
+
+        :param (float) angle: O ângulo principal, em graus.
+        :return (float): 100 em `angle_min` (ou abaixo) e 0 em `angle_max` (ou acima).
+        """
+        if angle <= self.angle_min:
+            return 100.0
+        if angle >= self.angle_max:
+            return 0.0
+        return self._slope * (angle - self.angle_min) + 100.0
+
+
+class ExerciseTracker:
+    """Rastreador de repetições de um exercício compilado, com o estado de uma sessão.
+
+    Executa a máquina de dois estágios comum a todos os exercícios: acima de
+    `angle_max` o movimento está no estágio de repouso; abaixo de `angle_min`,
+    vindo do repouso, passa ao estágio ativo e conta uma repetição. Depois aplica
+    as regras de feedback da definição.
+
+    Com um filtro de suavização, o ângulo principal é suavizado antes da máquina
+    de estágios, para que o ruído dos marcos junto aos limiares não faça o
+    estágio oscilar. A histerese alarga a banda entre os limiares: para mudar de
+    estágio, o ângulo tem de ultrapassar o limiar pela margem configurada.
+
+    Attributes:
+        exercise (CompiledExercise): A definição compilada do exercício.
+        smoother (OneEuroFilter | EmaFilter | None): O filtro do ângulo principal.
+        hysteresis (float): Margem, em graus, para além dos limiares exigida na mudança de estágio.
+        stage (str): O estágio atual do movimento.
+        counter (int): Contador de repetições completas.
+        feedback (str): Mensagem de texto para orientar o usuário.
+        angle_min (float): Ângulo mínimo da articulação principal (estágio ativo).
+        angle_max (float): Ângulo máximo da articulação principal (estágio de repouso).
+    """
+    def __init__(self, exercise: CompiledExercise, smoother=None, hysteresis: float = 0.0):
+        """Inicializa o rastreador no estágio e com o feedback iniciais do exercício.
+
+        :param (CompiledExercise) exercise: A definição compilada do exercício.
+        :param (object) smoother: Filtro com o método `filter(valor, instante)`; None desativa a suavização.
+        :param (float) hysteresis: Margem de histerese dos limiares, em graus.
+        """
+        self.exercise = exercise
+        self.smoother = smoother
+        self.hysteresis = hysteresis
+        self.stage = exercise.initial_stage
+        self.counter = 0
+        self.feedback = exercise.initial_feedback
+        self.angle_min = exercise.angle_min
+        self.angle_max = exercise.angle_max
+
+    def track(self, landmarks, frame_shape=None, timestamp=None):
+        """Processa os marcos de pose de um frame e atualiza a contagem e o feedback.
+
+        :param (numpy.ndarray) landmarks: O array (33, 4) de marcos; listas de marcos do MediaPipe
+            ou `Landmark` são convertidas.
+        :param (tuple) frame_shape: A forma do quadro (não utilizado).
+        :param (float) timestamp: O instante do frame, em segundos, usado pela suavização;
+            por omissão, o relógio monotónico.
+        :return (tuple): Uma tupla contendo (contador, ângulo, estágio, feedback, marcos, progresso).
+        """
+        exercise = self.exercise
+        if exercise.reset_feedback:
+            self.feedback = ""
+
+        try:
+            points = landmarks_to_array(landmarks)
+            angle = _joint_angle(points, exercise.angle)
+        except (IndexError, AttributeError, ValueError):
+            self.feedback = exercise.framing_feedback
+            return self.counter, 0, self.stage, self.feedback, {}, 0
+
+        if self.smoother is not None:
+            angle = self.smoother.filter(angle, time.monotonic() if timestamp is None else timestamp)
+
+        # Máquina de estágios: a repetição conta ao chegar ao estágio ativo.
+        if angle > self.angle_max + self.hysteresis:
+            if self.stage == exercise.active_stage and exercise.return_feedback:
+                self.feedback = exercise.return_feedback
+            self.stage = exercise.rest_stage
+        elif angle < self.angle_min - self.hysteresis and self.stage == exercise.rest_stage:
+            self.stage = exercise.active_stage
+            self.counter += 1
+            if exercise.count_feedback:
+                self.feedback = exercise.count_feedback
+
+        for rule in exercise.rules:
+            if rule.stage is not None and rule.stage != self.stage:
+                continue
+            value = angle if rule.joint is None else _joint_angle(points, rule.joint)
+            if rule.above is not None and not value > rule.above:
+                continue
+            if rule.below is not None and not value < rule.below:
+                continue
+            self.feedback = rule.feedback
+
+        if not self.feedback:
+            self.feedback = exercise.idle_feedback.get(self.stage, "")
+
+        # Só os pontos do exercício são serializados, numa única conversão do array.
+        coordinates = points[exercise.draw_index, :2].astype(np.float64).round(COORDINATE_DECIMALS).tolist()
+        landmarks_to_draw = dict(zip(exercise.draw_names, coordinates))
+
+        return self.counter, angle, self.stage, self.feedback, landmarks_to_draw, exercise.progress(angle)
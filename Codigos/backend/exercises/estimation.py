@@ -1,15 +1,78 @@
 """
 @file estimation.py
-@brief Contém a classe PoseEstimator para detectar marcos de pose em uma imagem.
+@brief Contém a classe PoseEstimator para detectar marcos de pose em uma imagem e um pool de estimadores.
 @author André Luis Aguiar do Nascimento
 @author Hugo Samuel de Lima Oliveira
 @author Leonardo Sampaio Serra
 @author Lucas Emanoel Amaral Gomes
 @author Wesley dos Santos Gatinho
 """
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
 import cv2
 import mediapipe as mp
 
+# Configuração do grafo do MediaPipe Pose: complexidade do modelo (0 = lite,
+# 1 = full, 2 = heavy) e modo de imagem estática (deteção em cada frame, sem
+# rastreamento entre frames consecutivos).
+PoseProfile = namedtuple("PoseProfile", ["model_complexity", "static_image_mode"])
+
+# Perfis selecionáveis por pedido ou pela política do servidor. Os perfis "lite"
+# trocam precisão por débito; os "_static" servem frames soltos ou de sessões
+# diferentes, em que o rastreamento entre frames não se aplica. Os estimadores
+# partilhados (o pool e o escalonador de micro-lotes) usam sempre um perfil
+# "_static": em modo de rastreamento, a região do corpo de um frame de um
+# utilizador serviria de ponto de partida ao frame seguinte, de outro utilizador.
+POSE_PROFILES = {
+    "lite": PoseProfile(0, False),
+    "full": PoseProfile(1, False),
+    "heavy": PoseProfile(2, False),
+    "lite_static": PoseProfile(0, True),
+    "full_static": PoseProfile(1, True),
+    "heavy_static": PoseProfile(2, True),
+}
+DEFAULT_PROFILE = "full"
+
+
+def static_profile(profile: str) -> str:
+    """Obtém a variante em modo de imagem estática de um perfil, com a mesma complexidade.
+
+    :param (str) profile: O nome do perfil.
+    :raises ValueError: Se o perfil não existir.
+    :return (str): O perfil "_static" equivalente (o próprio, se já o for).
+    """
+    if profile not in POSE_PROFILES:
+        raise ValueError("Perfil do modelo de pose não suportado.")
+    wanted = PoseProfile(POSE_PROFILES[profile].model_complexity, True)
+    for name, candidate in POSE_PROFILES.items():
+        if candidate == wanted:
+            return name
+    return profile
+
+
+def limit_profile(profile: str, max_complexity: int) -> str:
+    """Limita a complexidade de um perfil, mantendo o seu modo de imagem estática.
+
+    :param (str) profile: O nome do perfil pedido.
+    :param (int) max_complexity: A complexidade máxima permitida (0, 1 ou 2).
+    :raises ValueError: Se o perfil não existir.
+    :return (str): O perfil pedido, ou o equivalente mais leve permitido.
+    """
+    if profile not in POSE_PROFILES:
+        raise ValueError("Perfil do modelo de pose não suportado.")
+    requested = POSE_PROFILES[profile]
+    if requested.model_complexity <= max_complexity:
+        return profile
+    limit = max(max_complexity, 0)
+    for name, candidate in POSE_PROFILES.items():
+        if candidate == PoseProfile(limit, requested.static_image_mode):
+            return name
+    return profile
+
+
 class PoseEstimator:
     """Encapsula a funcionalidade de detecção de pose do MediaPipe.
 
@@ -18,18 +81,35 @@ class PoseEstimator:
 
     Attributes:
         mp_pose: Referência estática para o módulo mp.solutions.pose.
+        profile (str): O nome do perfil (complexidade e modo) do grafo.
         pose (mp.solutions.pose.Pose): A instância do objeto de detecção de pose.
+        timer (callable | None): Função chamada com (etapa, segundos) após a conversão de cores
+            ('color_convert') e a inferência ('inference') de cada frame.
     """
-    def __init__(self):
+    def __init__(self, profile: str = DEFAULT_PROFILE, min_detection_confidence: float = 0.5, min_tracking_confidence: float = 0.5,
+                 timer=None):
         """Inicializa o estimador de pose.
 
-        Configura o detector de pose do MediaPipe com confiança mínima de
-        detecção e rastreamento de 0.5.
+        Configura o detector de pose do MediaPipe com a complexidade e o modo do
+        perfil e com as confianças mínimas de detecção e rastreamento.
+
+        :param (str) profile: O nome do perfil em `POSE_PROFILES`.
+        :param (float) min_detection_confidence: Confiança mínima para considerar uma pose detectada.
+        :param (float) min_tracking_confidence: Confiança mínima para manter o rastreamento entre frames.
+        :param (callable) timer: Função que recebe a duração de cada etapa (ex.: para métricas); None não mede.
+        :raises ValueError: Se o perfil não existir.
         """
+        if profile not in POSE_PROFILES:
+            raise ValueError("Perfil do modelo de pose não suportado.")
+        config = POSE_PROFILES[profile]
         self.mp_pose = mp.solutions.pose
+        self.profile = profile
+        self.timer = timer
         self.pose = self.mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
+            static_image_mode=config.static_image_mode,
+            model_complexity=config.model_complexity,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
         )
 
     def estimate_pose(self, frame):
@@ -41,13 +121,21 @@ class PoseEstimator:
         :param (numpy.ndarray) frame: O quadro da imagem no formato BGR a ser processado.
         :return (object): O objeto de resultados do MediaPipe contendo os marcos da pose detectados.
         """
+        timer = self.timer
+        if timer is not None:
+            started = time.perf_counter()
         # Converte a imagem de BGR para RGB para o processamento do MediaPipe
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         # Otimização: marca a imagem como não gravável para passar por referência
         rgb_frame.flags.writeable = False
+        if timer is not None:
+            converted = time.perf_counter()
+            timer("color_convert", converted - started)
 
         # Executa a estimativa de pose
         results = self.pose.process(rgb_frame)
+        if timer is not None:
+            timer("inference", time.perf_counter() - converted)
         
         # Reverte a flag para que a imagem possa ser desenhada posteriormente
         rgb_frame.flags.writeable = True
@@ -63,3 +151,162 @@ class PoseEstimator:
         :return: None
         """
         self.pose.close()
+
+
+class PoseEstimatorPoolFull(RuntimeError):
+    """Levantada quando o pool de estimadores não aceita mais frames em espera."""
+
+
+class PoseEstimatorPool:
+    """Pool de estimadores de pose, cada um com o seu próprio grafo do MediaPipe.
+
+    Um grafo do MediaPipe não pode ser usado por várias threads ao mesmo tempo,
+    por isso cada frame reserva um estimador exclusivo durante a inferência. Os
+    estimadores são criados sob demanda até ao tamanho do pool; quando todos estão
+    ocupados, os pedidos esperam numa fila limitada e, se a fila estiver cheia
+    ou a espera exceder o tempo limite, são rejeitados com `PoseEstimatorPoolFull`.
+
+    Cada estimador pertence a um perfil de `POSE_PROFILES`. O tamanho do pool
+    limita o total de grafos: quando um perfil não tem estimadores livres e o
+    pool está completo, um estimador livre de outro perfil é substituído.
+
+    Attributes:
+        size (int): Número máximo de estimadores (grafos do MediaPipe) no pool.
+        max_queue (int): Número máximo de pedidos à espera de um estimador livre.
+        acquire_timeout (float): Tempo máximo, em segundos, de espera por um estimador.
+        default_profile (str): O perfil usado quando o pedido não indica nenhum.
+    """
+    def __init__(self, size=1, max_queue=8, acquire_timeout=2.0, factory=PoseEstimator,
+                 default_profile=static_profile(DEFAULT_PROFILE)):
+        """Inicializa o pool sem criar nenhum estimador.
+
+        :param (int) size: Número máximo de estimadores no pool.
+        :param (int) max_queue: Número máximo de pedidos em espera.
+        :param (float) acquire_timeout: Tempo máximo de espera por um estimador, em segundos.
+        :param (callable) factory: Função que cria um novo estimador a partir do nome do perfil.
+        :param (str) default_profile: O perfil usado quando o pedido não indica nenhum.
+        """
+        self.size = size
+        self.max_queue = max_queue
+        self.acquire_timeout = acquire_timeout
+        self.default_profile = default_profile
+        self._factory = factory
+        self._idle = {}
+        self._idle_count = 0
+        self._created = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    @property
+    def queue_depth(self):
+        """Número de pedidos à espera de um estimador livre."""
+        return self._waiting
+
+    @property
+    def in_use(self):
+        """Número de estimadores atualmente reservados."""
+        return self._created - self._idle_count
+
+    def acquire(self, profile=None):
+        """Reserva um estimador livre do perfil, criando-o se o pool ainda não estiver completo.
+
+        :param (str) profile: O perfil pretendido; por omissão, `default_profile`.
+        :raises ValueError: Se o perfil não existir.
+        :raises PoseEstimatorPoolFull: Se a fila de espera estiver cheia ou o tempo limite expirar.
+        :return (PoseEstimator): O estimador reservado, que deve ser devolvido com `release`.
+        """
+        profile = profile or self.default_profile
+        if profile not in POSE_PROFILES:
+            raise ValueError("Perfil do modelo de pose não suportado.")
+
+        replaced = None
+        with self._cond:
+            if not self._available():
+                if self._waiting >= self.max_queue:
+                    raise PoseEstimatorPoolFull("O serviço de análise de pose está sobrecarregado.")
+                self._waiting += 1
+                try:
+                    if not self._cond.wait_for(self._available, timeout=self.acquire_timeout):
+                        raise PoseEstimatorPoolFull("Tempo de espera pelo serviço de análise de pose esgotado.")
+                finally:
+                    self._waiting -= 1
+            if self._idle.get(profile):
+                self._idle_count -= 1
+                return self._idle[profile].pop()
+            if self._created >= self.size:
+                # Pool completo: o grafo livre de outro perfil dá lugar ao pedido.
+                replaced = self._pop_idle()
+            else:
+                self._created += 1
+
+        # A criação do grafo é lenta, por isso ocorre fora do lock.
+        if replaced is not None:
+            replaced.close()
+        try:
+            return self._factory(profile)
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, estimator):
+        """Devolve um estimador ao pool e acorda um pedido em espera.
+
+        :param (PoseEstimator) estimator: O estimador obtido com `acquire`.
+        :return: None
+        """
+        profile = getattr(estimator, "profile", self.default_profile)
+        with self._cond:
+            self._idle.setdefault(profile, []).append(estimator)
+            self._idle_count += 1
+            self._cond.notify()
+
+    @contextmanager
+    def estimator(self, profile=None):
+        """Gestor de contexto que reserva um estimador e o devolve no final.
+
+        :param (str) profile: O perfil pretendido; por omissão, `default_profile`.
+        :return (Generator): Um gerador que fornece o estimador reservado.
+        """
+        estimator = self.acquire(profile)
+        try:
+            yield estimator
+        finally:
+            self.release(estimator)
+
+    def estimate_pose(self, frame, profile=None):
+        """Processa um frame com o primeiro estimador livre do perfil.
+
+        :param (numpy.ndarray) frame: O quadro da imagem no formato BGR a ser processado.
+        :param (str) profile: O perfil pretendido; por omissão, `default_profile`.
+        :raises PoseEstimatorPoolFull: Se o pool estiver sobrecarregado.
+        :return (object): O objeto de resultados do MediaPipe contendo os marcos da pose detectados.
+        """
+        with self.estimator(profile) as estimator:
+            return estimator.estimate_pose(frame)
+
+    def close(self):
+        """Libera os recursos de todos os estimadores livres do pool.
+
+        :return: None
+        """
+        with self._cond:
+            idle = [estimator for estimators in self._idle.values() for estimator in estimators]
+            self._idle = {}
+            self._idle_count = 0
+            self._created -= len(idle)
+        for estimator in idle:
+            estimator.close()
+
+    def _available(self):
+        """Indica se um pedido pode ser servido já. Deve ser chamado com o lock adquirido."""
+        return self._idle_count > 0 or self._created < self.size
+
+    def _pop_idle(self):
+        """Retira um estimador livre de qualquer perfil. Deve ser chamado com o lock adquirido."""
+        for estimators in self._idle.values():
+            if estimators:
+                self._idle_count -= 1
+                return estimators.pop()
+        return None
@@ -0,0 +1,73 @@
+"""
+@file landmarks.py
+@brief Representação compacta (array float32) dos marcos de pose usada em todo o pipeline.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+from collections import namedtuple
+
+import numpy as np
+
+# Número de marcos do modelo de pose do MediaPipe (BlazePose).
+NUM_LANDMARKS = 33
+
+# Representação compacta dos marcos usada em todo o pipeline: um array float32 de
+# forma (33, 4) com as colunas x, y, z e visibility, na ordem do MediaPipe.
+LANDMARK_DTYPE = np.float32
+X, Y, Z, VISIBILITY = range(4)
+
+# Marco de pose com os mesmos atributos dos marcos do MediaPipe, para código que
+# ainda trabalha com objetos em vez de arrays.
+Landmark = namedtuple("Landmark", ["x", "y", "z", "visibility"], defaults=[0.0, 1.0])
+
+
+def empty_landmarks():
+    """Cria um array de marcos por preencher.
+
+    :return (numpy.ndarray): Array float32 de forma (33, 4).
+    """
+    return np.empty((NUM_LANDMARKS, 4), dtype=LANDMARK_DTYPE)
+
+
+def landmarks_to_array(landmarks, out=None):
+    """Converte os marcos do MediaPipe (ou `Landmark`) no array compacto, uma única vez por frame.
+
+    :param (list) landmarks: Os marcos com os atributos x, y, z e visibility.
+    :param (numpy.ndarray) out: Array (33, 4) pré-alocado a preencher; por omissão, um novo.
+    :return (numpy.ndarray): O array float32 (33, 4) com os marcos.
+    """
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    if out is None:
+        out = empty_landmarks()
+    # Uma única atribuição ao array é mais rápida do que preencher cada posição.
+    out[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks]
+    return out
+
+
+def landmarks_from_list(values):
+    """Converte a lista de coordenadas enviada pelo cliente no array de marcos.
+
+    Cada marco é uma sequência [x, y], [x, y, z] ou [x, y, z, visibility], com as
+    coordenadas normalizadas como no MediaPipe (0 a 1 em relação ao frame).
+
+    :param (list) values: Lista com as coordenadas dos 33 marcos, na ordem do MediaPipe.
+    :raises ValueError: Se o número de marcos ou de coordenadas for inválido.
+    :return (numpy.ndarray): O array float32 (33, 4) compatível com os rastreadores de exercício.
+    """
+    if len(values) != NUM_LANDMARKS:
+        raise ValueError(f"São esperados {NUM_LANDMARKS} marcos de pose, recebidos {len(values)}.")
+    points = empty_landmarks()
+    points[:, Z] = 0.0
+    points[:, VISIBILITY] = 1.0
+    try:
+        for row, point in zip(points, values):
+            if not 2 <= len(point) <= 4:
+                raise ValueError
+            row[:len(point)] = point
+    except (TypeError, ValueError):
+        raise ValueError("Cada marco deve ter entre 2 e 4 coordenadas numéricas (x, y, z, visibility).")
+    return points
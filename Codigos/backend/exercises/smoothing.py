@@ -0,0 +1,138 @@
+"""
+@file smoothing.py
+@brief Filtros temporais (One-Euro e EMA) que suavizam o ângulo das articulações antes da contagem.
+@author André Luis Aguiar do Nascimento
+@author Hugo Samuel de Lima Oliveira
+@author Leonardo Sampaio Serra
+@author Lucas Emanoel Amaral Gomes
+@author Wesley dos Santos Gatinho
+"""
+import math
+
+
+class EmaFilter:
+    """Média móvel exponencial de um sinal escalar, frame a frame.
+
+    Attributes:
+        alpha (float): Peso da nova amostra (1 desativa a suavização).
+    """
+    def __init__(self, alpha: float = 0.5):
+        """Inicializa o filtro sem histórico.
+
+        :param (float) alpha: Peso da nova amostra, entre 0 (exclusivo) e 1.
+        """
+        self.alpha = alpha
+        self._value = None
+
+    def filter(self, value: float, timestamp=None) -> float:
+        """Suaviza uma nova amostra.
+
+        :param (float) value: A amostra do frame.
+        :param (float) timestamp: O instante do frame (não utilizado).
+        :return (float): O valor suavizado.
+        """
+        if self._value is None:
+            self._value = value
+        else:
+            self._value = self.alpha * value + (1.0 - self.alpha) * self._value
+        return self._value
+
+    def reset(self):
+        """Descarta o histórico do filtro.
+
+        :return: None
+        """
+        self._value = None
+
+
+class OneEuroFilter:
+    """Filtro One-Euro (Casiez et al., 2012) de um sinal escalar.
+
+    É um passa-baixo cuja frequência de corte sobe com a velocidade do sinal:
+    parado, o ruído dos marcos é fortemente atenuado; em movimento rápido, o
+    atraso introduzido é pequeno. O estado são apenas alguns floats, sem listas
+    nem arrays, para poder correr em todos os frames.
+
+    Attributes:
+        min_cutoff (float): Frequência de corte mínima, em Hz (menor = mais suave em repouso).
+        beta (float): Aumento da frequência de corte por grau/s de velocidade (maior = menos atraso).
+        d_cutoff (float): Frequência de corte, em Hz, da estimativa da velocidade.
+        max_gap (float): Intervalo, em segundos, sem amostras a partir do qual o histórico é descartado.
+    """
+    def __init__(self, min_cutoff: float = 1.5, beta: float = 0.02, d_cutoff: float = 1.0, max_gap: float = 1.0):
+        """Inicializa o filtro sem histórico.
+
+        :param (float) min_cutoff: Frequência de corte mínima, em Hz.
+        :param (float) beta: Coeficiente de velocidade da frequência de corte.
+        :param (float) d_cutoff: Frequência de corte da velocidade, em Hz.
+        :param (float) max_gap: Intervalo máximo entre amostras antes de reiniciar, em segundos.
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.max_gap = max_gap
+        self._value = None
+        self._velocity = 0.0
+        self._timestamp = None
+        self._dt = 1.0 / 30.0
+
+    @staticmethod
+    def _alpha(cutoff: float, dt: float) -> float:
+        """Calcula o peso da nova amostra de um passa-baixo de primeira ordem."""
+        tau = 1.0 / (2.0 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def filter(self, value: float, timestamp: float) -> float:
+        """Suaviza uma nova amostra.
+
+        :param (float) value: A amostra do frame.
+        :param (float) timestamp: O instante do frame, em segundos.
+        :return (float): O valor suavizado.
+        """
+        if self._value is not None and timestamp - self._timestamp > self.max_gap:
+            self.reset()
+        if self._value is None:
+            self._value = value
+            self._timestamp = timestamp
+            return value
+
+        dt = timestamp - self._timestamp
+        if dt <= 0:
+            # Frames com o mesmo instante: usa o último intervalo conhecido.
+            dt = self._dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        self._velocity = a_d * (value - self._value) / dt + (1.0 - a_d) * self._velocity
+        a = self._alpha(self.min_cutoff + self.beta * abs(self._velocity), dt)
+        self._value = a * value + (1.0 - a) * self._value
+        self._timestamp = max(timestamp, self._timestamp)
+        self._dt = dt
+        return self._value
+
+    def reset(self):
+        """Descarta o histórico do filtro.
+
+        :return: None
+        """
+        self._value = None
+        self._velocity = 0.0
+        self._timestamp = None
+
+
+def create_smoother(kind: str, min_cutoff: float = 1.5, beta: float = 0.02, d_cutoff: float = 1.0, alpha: float = 0.5):
+    """Cria o filtro de suavização configurado.
+
+    :param (str) kind: 'one_euro', 'ema' ou 'none'.
+    :param (float) min_cutoff: Frequência de corte mínima do One-Euro, em Hz.
+    :param (float) beta: Coeficiente de velocidade do One-Euro.
+    :param (float) d_cutoff: Frequência de corte da velocidade do One-Euro, em Hz.
+    :param (float) alpha: Peso da nova amostra da EMA.
+    :raises ValueError: Se o tipo de filtro for desconhecido.
+    :return (OneEuroFilter | EmaFilter | None): O filtro, ou None sem suavização.
+    """
+    if kind == "one_euro":
+        return OneEuroFilter(min_cutoff=min_cutoff, beta=beta, d_cutoff=d_cutoff)
+    if kind == "ema":
+        return EmaFilter(alpha=alpha)
+    if kind == "none":
+        return None
+    raise ValueError(f"Filtro de suavização desconhecido: {kind}")